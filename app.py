@@ -1,15 +1,21 @@
-from flask import Flask, redirect, request, session, jsonify, render_template
+from flask import Flask, Response, redirect, request, session, jsonify, render_template, stream_with_context
 from google_auth_oauthlib.flow import Flow
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
 from datetime import datetime
 import os
 import json
+import time
 import uuid
 
 from config import *
+from services.credential_store import account_user_id, credential_store
+from services.event_store import event_store
+from services.log import get_logger, get_request_id, reset_request_id, set_request_id
+from services.state_store import oauth_state_store
+from services.warmup import WARMUP_ON_START, readiness, start_warmup
 
 
+logger = get_logger(__name__)
+
 app = Flask(__name__)
 app.secret_key = "calendar_chatbot_secret_key_123"
 
@@ -26,49 +32,49 @@ app.config.update(
 
 os.environ["OAUTHLIB_INSECURE_TRANSPORT"] = "1"
 
-# File-based state storage for OAuth
-STATE_FILE = "oauth_state.json"
+# Refresh stored tokens before they expire so requests don't block on it
+credential_store.start_background_refresh()
+
+# Optionally load the router, Gemini clients and RAG index in the background
+if WARMUP_ON_START:
+    start_warmup()
 
+# OAuth state lives in a TTL store shared by all workers (see services/state_store.py)
 def save_oauth_data(state, data):
     """Save OAuth data indexed by state"""
     try:
-        states = {}
-        if os.path.exists(STATE_FILE):
-            with open(STATE_FILE, 'r') as f:
-                states = json.load(f)
-        states[state] = data
-        with open(STATE_FILE, 'w') as f:
-            json.dump(states, f)
-        print(f"[STATE] Saved data for state: {state}")
+        oauth_state_store.put(state, data)
+        logger.debug("Saved OAuth data for state %s", state)
     except Exception as e:
-        print(f"[STATE] Error saving data: {e}")
+        logger.error("Error saving OAuth data: %s", e)
 
 def get_oauth_data(state):
-    """Retrieve OAuth data from file"""
+    """Retrieve OAuth data (None if unknown or expired)"""
+    try:
+        data = oauth_state_store.get(state)
+        logger.debug("Retrieved OAuth data for state %s", state)
+        return data
+    except Exception as e:
+        logger.error("Error retrieving OAuth data: %s", e)
+    return None
+
+def pop_oauth_data(state):
+    """Retrieve and delete OAuth data in one step, so a state is only ever used once"""
     try:
-        if os.path.exists(STATE_FILE):
-            with open(STATE_FILE, 'r') as f:
-                states = json.load(f)
-            data = states.get(state)
-            print(f"[STATE] Retrieved data for state: {state}")
-            return data
+        data = oauth_state_store.pop(state)
+        logger.debug("Consumed OAuth data for state %s", state)
+        return data
     except Exception as e:
-        print(f"[STATE] Error retrieving data: {e}")
+        logger.error("Error consuming OAuth data: %s", e)
     return None
 
 def clear_oauth_data(state):
-    """Clear OAuth data from file"""
+    """Clear OAuth data"""
     try:
-        if os.path.exists(STATE_FILE):
-            with open(STATE_FILE, 'r') as f:
-                states = json.load(f)
-            if state in states:
-                del states[state]
-                with open(STATE_FILE, 'w') as f:
-                    json.dump(states, f)
-            print(f"[STATE] Cleared data for state: {state}")
+        oauth_state_store.delete(state)
+        logger.debug("Cleared OAuth data for state %s", state)
     except Exception as e:
-        print(f"[STATE] Error clearing data: {e}")
+        logger.error("Error clearing OAuth data: %s", e)
 
 SCOPES = [
     "https://www.googleapis.com/auth/calendar",
@@ -85,26 +91,29 @@ CLIENT_CONFIG = {
     }
 }
 
-# ---------------- GOOGLE CALENDAR UTILS ----------------
-def get_calendar_service(credentials_dict):
-    credentials = Credentials(
-        token=credentials_dict['token'],
-        refresh_token=credentials_dict.get('refresh_token'),
-        token_uri=credentials_dict['token_uri'],
-        client_id=credentials_dict['client_id'],
-        client_secret=credentials_dict['client_secret'],
-        scopes=credentials_dict.get('scopes')
-    )
-    return build("calendar", "v3", credentials=credentials)
+# Every log record of a request carries its id (taken from X-Request-ID when
+# a proxy sets one), and the response hands it back for correlation
+@app.before_request
+def bind_request_id():
+    request.environ["app.request_id_token"] = set_request_id(request.headers.get("X-Request-ID"))
+
+
+@app.after_request
+def add_request_id_header(response):
+    response.headers["X-Request-ID"] = get_request_id()
+    return response
+
+
+@app.teardown_request
+def unbind_request_id(exc=None):
+    token = request.environ.pop("app.request_id_token", None)
+    if token is not None:
+        reset_request_id(token)
 
 
 # ---------------- AUTH ROUTES ----------------
 @app.route("/")
 def home():
-    print("[HOME] Session contents:")
-    print(f"[HOME] Session keys: {list(session.keys())}")
-    print(f"[HOME] Has credentials: {'credentials' in session}")
-
     # Render a user-facing homepage with accessible UI and chat
     authenticated = 'credentials' in session
     return render_template('index.html', authenticated=authenticated)
@@ -123,14 +132,12 @@ def login():
         include_granted_scopes="true"
     )
 
-    # Save the state to file (indexed by state itself)
     save_oauth_data(state, {
         "state": state,
         "timestamp": datetime.now().isoformat()
     })
     
-    print(f"[LOGIN] OAuth state: {state}")
-    print(f"[LOGIN] Auth URL: {auth_url}")
+    logger.debug("OAuth state %s, auth URL %s", state, auth_url)
     
     return redirect(auth_url)
 
@@ -140,22 +147,20 @@ def oauth2callback():
     # Get state from request parameters (returned by Google)
     request_state = request.args.get("state")
     
-    print(f"[CALLBACK] Request state: {request_state}")
-    print(f"[CALLBACK] Request URL: {request.url}")
+    logger.debug("OAuth callback for state %s", request_state)
     
     if not request_state:
-        print("[CALLBACK] ERROR: No state in request")
+        logger.warning("OAuth callback without a state parameter")
         return "Missing state parameter", 400
     
-    # Retrieve saved OAuth data using state
-    oauth_data = get_oauth_data(request_state)
+    # Consume the saved OAuth data before the token exchange: a replayed or
+    # concurrent callback with the same state finds nothing
+    oauth_data = pop_oauth_data(request_state)
     
     if not oauth_data:
-        print("[CALLBACK] ERROR: No saved OAuth data found for state")
+        logger.warning("No saved OAuth data for state %s", request_state)
         return "Session expired. Please login again.", 400
     
-    print("[CALLBACK] State validation passed!")
-    
     # Create flow with correct state for token exchange
     flow = Flow.from_client_config(
         CLIENT_CONFIG,
@@ -165,50 +170,64 @@ def oauth2callback():
     )
 
     try:
-        print("[CALLBACK] Fetching token...")
         flow.fetch_token(authorization_response=request.url)
-        print("[CALLBACK] Token fetched successfully")
     except Exception as e:
-        print(f"[CALLBACK] ERROR fetching token: {str(e)}")
-        clear_oauth_data(request_state)
+        logger.error("Error fetching OAuth token: %s", e)
         return f"Authentication error: {str(e)}", 400
 
     creds = flow.credentials
 
-    # Store credentials in session
-    session.permanent = True
-    session["credentials"] = {
+    credentials_dict = {
         "token": creds.token,
         "refresh_token": creds.refresh_token,
         "token_uri": creds.token_uri,
         "client_id": creds.client_id,
         "client_secret": creds.client_secret,
-        "scopes": creds.scopes
+        "scopes": creds.scopes,
+        "expiry": creds.expiry.isoformat() if creds.expiry else None
     }
+
+    # A known account keeps its user id (and stored row) across logins
+    try:
+        from services.calendar_service import primary_calendar_id
+
+        user_id = account_user_id(creds.client_id, primary_calendar_id(credentials_dict))
+    except Exception as e:
+        logger.warning("Could not identify the account, keeping the session's user: %s", e)
+        user_id = session.get("user_id") or uuid.uuid4().hex
+
+    # Store credentials in the per-user credential store and in the session
+    session.permanent = True
+    session["user_id"] = user_id
+    session["credentials"] = credential_store.save(user_id, credentials_dict)
     session.modified = True
-    
-    print(f"[CALLBACK] Credentials stored in session")
-    print(f"[CALLBACK] Session now has: {list(session.keys())}")
-    
-    # Clear the saved state after successful authentication
-    clear_oauth_data(request_state)
 
-    with open("token.json", "w") as f:
-        f.write(creds.to_json())
 
-    print("[CALLBACK] Authentication successful, redirecting to /")
+    # token.json is only for the local test scripts - never shared between users
+    if os.getenv("WRITE_TOKEN_JSON") == "1":
+        with open("token.json", "w") as f:
+            f.write(creds.to_json())
+
+    logger.info("User %s authenticated", session["user_id"])
     return redirect("/")
 
 
 @app.route("/logout")
 def logout():
+    if session.get("user_id"):
+        credential_store.delete(session["user_id"])
+        event_store.forget(session["user_id"])
     session.clear()
     return redirect("/")
 
 
 # ---------------- CHAT ROUTE ----------------
 @app.route("/chat", methods=["POST"])
-def chat():
+async def chat():
+    # Async view (needs flask[async]): the Gemini and Calendar calls of one
+    # request are awaited together instead of one after another. The web UI
+    # uses /chat/stream; this plain JSON endpoint is kept for API clients and
+    # the scripted checks that post to it.
     try:
         if "credentials" not in session:
             return jsonify({"error": "Not authenticated"}), 401
@@ -217,19 +236,96 @@ def chat():
         user_message = data.get("message")
 
         # Import routing lazily to avoid heavy/optional deps at startup
-        from router import route_message
-        response = route_message(
+        from router import route_message_async
+        response = await route_message_async(
             user_message=user_message,
             session=session
         )
 
         return jsonify(response)
     except Exception as e:
-        import traceback
-        err_msg = str(e)
-        err_trace = traceback.format_exc()
-        print(f"[CHAT ERROR] {err_msg}\n{err_trace}")
-        return jsonify({"error": f"Server error: {err_msg}"}), 500
+        logger.exception("Chat request failed")
+        return jsonify({"error": f"Server error: {e}"}), 500
+
+
+@app.route("/chat/stream", methods=["POST"])
+async def chat_stream():
+    """
+    Server-sent events variant of /chat
+
+    Routed through route_message_async like /chat. RAG answers are streamed
+    as {"type": "token"} frames; every request ends with one
+    {"type": "final"} frame carrying the full response and timings.
+    """
+    if "credentials" not in session:
+        return jsonify({"error": "Not authenticated"}), 401
+
+    data = request.get_json()
+    user_message = data.get("message")
+    start = time.monotonic()
+
+    try:
+        from router import route_message_stream
+        frames = await route_message_stream(user_message=user_message, session=session)
+    except Exception as e:
+        logger.exception("Chat stream failed to start")
+        return jsonify({"error": f"Server error: {e}"}), 500
+
+    def generate():
+        try:
+            for frame in frames:
+                if frame.get("type") == "final":
+                    frame.setdefault("metrics", {})
+                    frame["metrics"]["request_ms"] = round((time.monotonic() - start) * 1000, 1)
+                yield f"data: {json.dumps(frame)}\n\n"
+        except Exception as e:
+            logger.error("Chat stream failed: %s", e)
+            yield f"data: {json.dumps({'type': 'final', 'error': f'Server error: {e}'})}\n\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.route("/metrics")
+def metrics_view():
+    # Imported lazily like router - these pull in the LLM stack
+    from services import metrics, llm_gateway, executor
+    from services.cache import response_cache
+    from intent_detector import get_intent_stats
+    from gemini_parser import get_parser_stats
+    from rag.rag_store import get_index_info
+    from rag.rag_pipeline import get_ingest_stats
+    from rag.retrieval_cache import retrieval_cache
+
+    return jsonify({
+        "llm": llm_gateway.get_stats(),
+        "response_cache": response_cache.get_stats(),
+        "intent": get_intent_stats(),
+        "credentials": credential_store.get_stats(),
+        "event_parser": get_parser_stats(),
+        "events": event_store.get_stats(),
+        "oauth_state": oauth_state_store.get_stats(),
+        "rag_index": get_index_info(),
+        "rag_ingest": get_ingest_stats(),
+        "rag_cache": retrieval_cache.get_stats(),
+        "stages": executor.get_stats(),
+        "all": metrics.snapshot(),
+    })
+
+
+@app.route("/healthz")
+def healthz():
+    return jsonify({"status": "ok"})
+
+
+@app.route("/healthz/ready")
+def healthz_ready():
+    # 503 until the warm-up has finished, so the load balancer skips cold workers
+    state = readiness()
+    return jsonify(state), (200 if state["ready"] else 503)
 
 
 @app.route("/test-chat")
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Benchmark: "delete and create" as sequential calls vs one batched request.
+
+Runs against FakeCalendarService with a simulated round-trip latency, so the
+numbers show the round-trip saving rather than Google's server time.
+"""
+import sys
+import time
+
+from services.calendar_service import create_event, delete_event, replace_events
+from services.fake_calendar import FakeCalendarService
+
+LATENCY_SECONDS = 0.08
+CONFLICT_COUNTS = (1, 3, 10)
+START, END = "2030-01-01T10:00:00", "2030-01-01T11:00:00"
+
+
+def _setup(conflicts):
+    service = FakeCalendarService(latency=LATENCY_SECONDS)
+    ids = [service.add_event(f"Conflict {i}", START + "Z", END + "Z")["id"] for i in range(conflicts)]
+    return service, ids
+
+
+def sequential(conflicts):
+    service, ids = _setup(conflicts)
+    start = time.perf_counter()
+    for event_id in ids:
+        delete_event(service, event_id)
+    create_event(service, "New", START, END)
+    return (time.perf_counter() - start) * 1000, service.api_calls
+
+
+def batched(conflicts):
+    service, ids = _setup(conflicts)
+    start = time.perf_counter()
+    replace_events(service, ids, "New", START, END)
+    return (time.perf_counter() - start) * 1000, service.api_calls
+
+
+if __name__ == "__main__":
+    counts = [int(arg) for arg in sys.argv[1:]] or CONFLICT_COUNTS
+
+    print("=" * 60)
+    print(f"Delete-and-create Benchmark ({LATENCY_SECONDS * 1000:.0f} ms simulated RTT)")
+    print("=" * 60)
+
+    for conflicts in counts:
+        seq_ms, seq_calls = sequential(conflicts)
+        batch_ms, batch_calls = batched(conflicts)
+        print(f"{conflicts:3} conflict(s): sequential {seq_ms:7.0f} ms ({seq_calls} calls)"
+              f" | batched {batch_ms:6.0f} ms ({batch_calls} call)"
+              f" | {seq_ms / batch_ms:4.1f}x")
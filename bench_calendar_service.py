@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: googleapiclient build() vs the cached calendar service.
+
+Runs offline with dummy credentials - nothing is sent to Google.
+"""
+import time
+
+from google.oauth2.credentials import Credentials
+from googleapiclient.discovery import build
+
+from services.calendar_service import (
+    build_calendar_service,
+    clear_service_cache,
+    get_calendar_service,
+)
+
+ROUNDS = 50
+
+CREDENTIALS = {
+    "token": "dummy-token",
+    "refresh_token": "dummy-refresh",
+    "token_uri": "https://oauth2.googleapis.com/token",
+    "client_id": "dummy-client",
+    "client_secret": "dummy-secret",
+    "scopes": ["https://www.googleapis.com/auth/calendar"],
+}
+
+
+def timed(label, fn, rounds=ROUNDS):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    per_call_ms = (time.perf_counter() - start) / rounds * 1000
+    print(f"{label:42} {per_call_ms:9.3f} ms/call")
+    return per_call_ms
+
+
+if __name__ == "__main__":
+    credentials = Credentials(token="dummy-token")
+
+    print("=" * 60)
+    print("Calendar Service Construction Benchmark")
+    print("=" * 60)
+
+    baseline = timed(
+        "build('calendar', 'v3') every request",
+        lambda: build("calendar", "v3", credentials=credentials, static_discovery=True),
+    )
+    timed("build from cached discovery document", lambda: build_calendar_service(credentials))
+
+    clear_service_cache()
+    get_calendar_service(CREDENTIALS)
+    cached = timed("get_calendar_service (cache hit)", lambda: get_calendar_service(CREDENTIALS), rounds=10000)
+
+    print("-" * 60)
+    print(f"Speedup per request: {baseline / cached:,.0f}x")
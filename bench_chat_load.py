@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Load benchmark: route_message on worker threads vs route_message_async on
+one event loop.
+
+Gemini is replaced by a runnable that sleeps LLM_LATENCY and the Calendar
+API by FakeCalendarService, so the numbers show how many requests one
+worker keeps in flight - not real model latency.
+
+    python bench_chat_load.py [requests] [threads] [async_concurrency]
+"""
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("LLM_CACHE_ENABLED", "0")
+
+from langchain_core.runnables import RunnableLambda
+
+import intent_detector
+import router
+from handlers import calendar_create
+from services.event_store import event_store
+from services.fake_calendar import FakeCalendarService
+
+LLM_LATENCY = 0.3
+CALENDAR_LATENCY = 0.1
+
+_calendars = {}
+
+
+def _fake_unified(inputs):
+    time.sleep(LLM_LATENCY)
+    n = int(inputs["input"].rsplit(" ", 1)[1])
+    hour = 8 + n % 10
+    return {
+        "intent": "create_event",
+        "event": {"title": f"Sync {n}", "start": f"2030-01-01T{hour:02d}:00:00", "end": f"2030-01-01T{hour:02d}:30:00"},
+    }
+
+
+def _fake_service(session):
+    return _calendars.setdefault(session["user_id"], FakeCalendarService(latency=CALENDAR_LATENCY))
+
+
+def _fake_service_for_user(user_id, credentials):
+    return _calendars.setdefault(user_id, FakeCalendarService(latency=CALENDAR_LATENCY)), credentials
+
+
+def _install_fakes():
+    intent_detector.get_unified_chain = lambda: RunnableLambda(_fake_unified)
+    router.get_service_for_session = _fake_service
+    router.get_service_for_user = _fake_service_for_user
+    calendar_create.get_service_for_session = _fake_service
+
+
+def _session(n):
+    return {"credentials": {"token": "x"}, "user_id": f"user-{n}"}
+
+
+def _message(n):
+    return f"plan the quarterly thing {n}"
+
+
+def run_threads(requests, threads):
+    latencies = []
+
+    def one(n):
+        start = time.perf_counter()
+        result = router.route_message(_message(n), _session(n))
+        latencies.append(time.perf_counter() - start)
+        assert "event_created" in result, result
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(one, range(requests)))
+    return time.perf_counter() - start, sorted(latencies)
+
+
+def run_async(requests, concurrency):
+    latencies = []
+
+    async def main():
+        gate = asyncio.Semaphore(concurrency)
+
+        async def one(n):
+            async with gate:
+                start = time.perf_counter()
+                result = await router.route_message_async(_message(n), _session(n))
+                latencies.append(time.perf_counter() - start)
+                assert "event_created" in result, result
+
+        await asyncio.gather(*(one(n) for n in range(requests)))
+
+    start = time.perf_counter()
+    asyncio.run(main())
+    return time.perf_counter() - start, sorted(latencies)
+
+
+def report(label, wall, latencies):
+    p50 = latencies[len(latencies) // 2] * 1000
+    p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000
+    print(f"{label:40} {len(latencies) / wall:6.1f} req/s   p50 {p50:5.0f} ms   p95 {p95:5.0f} ms")
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    requests = args[0] if len(args) > 0 else 64
+    threads = args[1] if len(args) > 1 else 4
+    concurrency = args[2] if len(args) > 2 else 32
+
+    _install_fakes()
+    from services.executor import IO_POOL_SIZE
+    from services.llm_gateway import LLM_MAX_CONCURRENCY
+
+    print("=" * 72)
+    print(f"/chat load: {requests} create requests, LLM {LLM_LATENCY * 1000:.0f} ms,"
+          f" Calendar {CALENDAR_LATENCY * 1000:.0f} ms per call")
+    print(f"LLM_MAX_CONCURRENCY={LLM_MAX_CONCURRENCY}  IO_POOL_SIZE={IO_POOL_SIZE}")
+    print("=" * 72)
+
+    report(f"sync, 1 worker x {threads} threads", *run_threads(requests, threads))
+    _calendars.clear()
+    event_store.clear()
+    report(f"async, 1 worker x 1 loop ({concurrency} in flight)", *run_async(requests, concurrency))
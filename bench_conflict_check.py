@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark: conflict checks through events().list vs freebusy.query.
+
+Runs against FakeCalendarService with a simulated round-trip latency. Response
+sizes are the JSON the fake would send; the transfer column adds what those
+bytes cost on a slow link, which the fake does not simulate by itself.
+
+    list (full)    the previous check_conflicts: full event resources
+    list (masked)  check_conflicts(mode="list"): one field-masked listing per calendar
+    freebusy       check_conflicts(mode="freebusy"): one busy-interval query,
+                   then masked listings (one batch) only for busy calendars
+"""
+import contextlib
+import io
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from services.calendar_service import blocks_time, check_conflicts, iter_events
+from services.event_time import event_bounds, to_epoch
+from services.fake_calendar import FakeCalendarService
+
+LATENCY_SECONDS = 0.08
+LINK_BYTES_PER_SECOND = 1_000_000 / 8  # 1 Mbit/s mobile link
+CALENDARS = ["primary", "team@example.com", "holidays@example.com"]
+BASE = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) + timedelta(days=1)
+
+
+def _iso(hours):
+    return (BASE + timedelta(hours=hours)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def calendar(events_per_calendar=300, seed=0):
+    rng = random.Random(seed)
+    service = FakeCalendarService(latency=LATENCY_SECONDS)
+    for calendar_id in CALENDARS:
+        for i in range(events_per_calendar):
+            # Mostly working hours, about five events a day
+            start = rng.randrange(0, 60) * 24 + rng.randrange(16, 36) / 2
+            service.add_event(
+                f"Meeting {i}", _iso(start), _iso(start + rng.choice([0.5, 1])),
+                calendar_id=calendar_id,
+                description="Agenda: " + "walk through the open items. " * rng.randrange(5, 30),
+                attendees=[{"email": f"p{j}@example.com", "responseStatus": "accepted"}
+                           for j in range(rng.randrange(2, 12))],
+                conferenceData={"entryPoints": [{"entryPointType": "video", "uri": f"https://meet.example.com/{i}"}]},
+            )
+    return service
+
+
+def old_list_conflicts(service, start, end, calendars):
+    """The previous events().list check: one unmasked listing per calendar"""
+    start_ts, end_ts = to_epoch(start), to_epoch(end)
+    conflicts = []
+    for calendar_id in calendars:
+        for event in iter_events(service, fields=None, calendar_id=calendar_id, timeMin=start, timeMax=end):
+            bounds = event_bounds(event)
+            if blocks_time(event) and bounds and bounds[0] < end_ts and bounds[1] > start_ts:
+                conflicts.append(event)
+    return conflicts
+
+
+def run(service, check, slots):
+    service.api_calls = service.response_bytes = 0
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        found = sum(len(check(service, a, b)) for a, b in slots)
+    elapsed = (time.perf_counter() - start) * 1000 / len(slots)
+    transfer = service.response_bytes / LINK_BYTES_PER_SECOND * 1000 / len(slots)
+    return elapsed, transfer, service.api_calls / len(slots), service.response_bytes / len(slots), found
+
+
+if __name__ == "__main__":
+    service = calendar()
+    rng = random.Random(1)
+    approaches = {
+        "list (full)": lambda calendars: lambda s, a, b: old_list_conflicts(s, a, b, calendars),
+        "list (masked)": lambda calendars: lambda s, a, b: check_conflicts(s, a, b, calendars=calendars, mode="list"),
+        "freebusy": lambda calendars: lambda s, a, b: check_conflicts(s, a, b, calendars=calendars, mode="freebusy"),
+    }
+
+    print("=" * 86)
+    print(f"Conflict Check Benchmark ({LATENCY_SECONDS * 1000:.0f} ms simulated RTT, "
+          f"{len(CALENDARS)} x 300 events, transfer at 1 Mbit/s)")
+    print("=" * 86)
+    for calendars in (CALENDARS[:1], CALENDARS):
+        for hours in (1, 48):
+            starts = [rng.randrange(0, 28) * 24 + rng.randrange(8, 18) for _ in range(20)]
+            slots = [(_iso(h), _iso(h + hours)) for h in starts]
+            print(f"\n{len(calendars)} calendar(s), {hours}h slot")
+            print(f"  {'approach':<14} {'ms/check':>9} {'+transfer':>10} {'calls':>6} {'bytes/check':>12} {'conflicts':>10}")
+            for name, make in approaches.items():
+                ms, transfer, calls, size, found = run(service, make(calendars), slots)
+                print(f"  {name:<14} {ms:>9.0f} {transfer:>10.0f} {calls:>6.1f} {size:>12,.0f} {found:>10}")
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark: FAISS.from_documents over every chunk at once (the old
+build_index) vs the streaming embed pipeline at different batch sizes.
+
+Each configuration runs in its own subprocess so ru_maxrss is its own peak
+RSS. Uses FastEmbed by default; pass --fake for deterministic fake
+embeddings when the model can't be downloaded.
+"""
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+DOCUMENTS = 2000
+BATCH_SIZES = [16, 64, 256]
+
+
+def _embeddings(fake):
+    if fake:
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+
+        return DeterministicFakeEmbedding(size=384)
+    from rag.rag_store import get_embeddings
+
+    return get_embeddings()
+
+
+def _write_corpus(directory):
+    paths = []
+    for i in range(DOCUMENTS):
+        path = os.path.join(directory, f"doc_{i:05d}.txt")
+        with open(path, "w") as f:
+            f.write(f"Document {i} talks about calendars, meetings and reminders. " * 30)
+        paths.append(path)
+    return paths
+
+
+def run_one(mode, batch_size, corpus, fake):
+    from rag.embed_pipeline import EMBED_WORKERS, embed_chunks, iter_chunks
+    from rag.rag_store import CHUNK_OVERLAP, CHUNK_SIZE
+
+    paths = sorted(os.path.join(corpus, name) for name in os.listdir(corpus))
+    embeddings = _embeddings(fake)
+    embeddings.embed_documents(["warm-up"])
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    start = time.perf_counter()
+    if mode == "all-at-once":
+        from langchain_community.vectorstores import FAISS
+
+        store = FAISS.from_documents(list(iter_chunks(paths, CHUNK_SIZE, CHUNK_OVERLAP)), embeddings)
+    else:
+        store = embed_chunks(iter_chunks(paths, CHUNK_SIZE, CHUNK_OVERLAP), embeddings,
+                             batch_size=batch_size, workers=EMBED_WORKERS)
+    elapsed = time.perf_counter() - start
+
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    label = mode if mode == "all-at-once" else f"batch {batch_size}"
+    print(f"{label:14} {DOCUMENTS / elapsed:10,.0f} docs/s {store.index.ntotal / elapsed:10,.0f} chunks/s"
+          f" {peak_kb / 1024:9.1f} MB peak ({(peak_kb - baseline_kb) / 1024:+.1f} MB)")
+
+
+if __name__ == "__main__":
+    fake = "--fake" in sys.argv
+    if "--run" in sys.argv:
+        _, _, mode, batch_size, corpus = sys.argv[:5]
+        run_one(mode, int(batch_size), corpus, fake)
+        sys.exit(0)
+
+    print("=" * 72)
+    print(f"Embedding Pipeline Benchmark ({DOCUMENTS} documents, {'fake' if fake else 'FastEmbed'} embeddings)")
+    print("=" * 72)
+    with tempfile.TemporaryDirectory() as corpus:
+        _write_corpus(corpus)
+        configs = [("all-at-once", 0)] + [("pipeline", size) for size in BATCH_SIZES]
+        for mode, batch_size in configs:
+            subprocess.run(
+                [sys.executable, __file__, "--run", mode, str(batch_size), corpus] + (["--fake"] if fake else []),
+                check=True,
+                env=dict(os.environ, PYTHONPATH=os.path.dirname(os.path.abspath(__file__))),
+            )
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark: the old linear delete matching (substring title + "T15:" string
+checks over raw event dicts) vs the EventMatcher index, on calendars with
+thousands of events.
+
+The index is built once per calendar version (the mirror caches it), so the
+per-request cost is the query alone; the build time is shown separately.
+"""
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from services.event_matcher import EventMatcher
+
+WORDS = ("design review standup sync planning lunch retro demo hiring interview budget roadmap customer "
+         "call offsite training dentist gym focus onboarding quarterly board investor product marketing sales "
+         "pipeline forecast hackathon workshop webinar launch migration incident postmortem security audit "
+         "compliance legal contract vendor partner recruiting candidate screening panel feedback coaching "
+         "mentoring townhall allhands kickoff handover deployment release sprint backlog grooming estimation "
+         "architecture infra database frontend backend mobile analytics metrics okr strategy offsite dinner "
+         "birthday farewell welcome coffee walk yoga doctor school pickup groceries flight hotel visa").split()
+# Recurring meetings make up a good share of a real calendar
+RECURRING = ["Daily standup", "Weekly sync", "Sprint planning", "Team retro", "Design review", "1:1 with manager"]
+QUERIES = [
+    {"event_title": "roadmap review", "time_reference": "", "time": ""},
+    {"event_title": "", "time_reference": "tomorrow", "time": "3pm"},
+    {"event_title": "custmer call", "time_reference": "", "time": ""},  # typo
+    {"event_title": "standup", "time_reference": "today", "time": "10am"},
+]
+
+
+def calendar(n, seed=0):
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    events = []
+    for i in range(n):
+        start = now + timedelta(hours=rng.randrange(-24 * 30, 24 * 60))
+        if rng.random() < 0.3:
+            title = rng.choice(RECURRING)
+        else:
+            title = " ".join(rng.sample(WORDS, rng.choice([2, 3]))).title()
+        events.append({
+            "id": f"e{i}",
+            "summary": title,
+            "start": {"dateTime": start.strftime("%Y-%m-%dT%H:%M:%SZ")},
+            "end": {"dateTime": (start + timedelta(minutes=30)).strftime("%Y-%m-%dT%H:%M:%SZ")},
+        })
+    return events
+
+
+def linear_match(events, info):
+    """The previous handle_delete_event loop, minus its per-event prints"""
+    title = info["event_title"].lower()
+    time_ref = info["time_reference"].lower()
+    time_str = info["time"].lower()
+    today = datetime.now().date().isoformat()
+    tomorrow = (datetime.now() + timedelta(days=1)).date().isoformat()
+    matches = []
+    for event in events:
+        summary = event.get("summary", "").lower()
+        start = event.get("start", {}).get("dateTime", "")
+        if title and title not in summary:
+            continue
+        if time_str:
+            clean = time_str.replace("pm", "").replace("am", "").replace(":", "").strip()
+            hour = int(clean) if clean.isdigit() else 0
+            if "pm" in time_str and hour < 12:
+                hour += 12
+            if f"T{hour:02d}:" not in start:
+                continue
+        if time_ref:
+            day = start.split("T")[0]
+            if ("today" in time_ref and day != today) or ("tomorrow" in time_ref and day != tomorrow):
+                continue
+        matches.append(event)
+    return matches
+
+
+def per_query_us(fn, rounds=20):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for info in QUERIES:
+            fn(info)
+    return (time.perf_counter() - start) / (rounds * len(QUERIES)) * 1e6
+
+
+if __name__ == "__main__":
+    print("=" * 78)
+    print("Delete Matching Benchmark (4 query shapes, incl. one typo)")
+    print("=" * 78)
+    print(f"{'events':>8} {'linear us/q':>12} {'first 50 only':>14} {'index us/q':>11} {'build ms':>9} {'typo found':>11}")
+    for n in [1000, 5000, 20000]:
+        events = calendar(n)
+        linear = per_query_us(lambda info: linear_match(events, info))
+        first_50 = per_query_us(lambda info: linear_match(events[:50], info))
+
+        start = time.perf_counter()
+        matcher = EventMatcher(events)
+        build_ms = (time.perf_counter() - start) * 1000
+        indexed = per_query_us(lambda info: matcher.match(info["event_title"], info["time_reference"], info["time"]))
+
+        typo = QUERIES[2]
+        found = (len(linear_match(events, typo)), len(matcher.match(typo["event_title"])))
+        print(f"{n:>8} {linear:>12.0f} {first_50:>14.0f} {indexed:>11.0f} {build_ms:>9.1f} {str(found):>11}")
+    print("-" * 78)
+    print("typo found = (linear, index) candidates for 'custmer call'")
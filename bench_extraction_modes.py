@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Compare latency of the unified (one LLM call) and two-step extraction modes.
+
+Needs a working Gemini key. By default the local intent fast path is turned
+off so every message pays the LLM cost; pass --with-local to keep it on.
+Pass --full to also route through the handlers with credentials from
+token.json (this creates and deletes real events).
+"""
+import json
+import os
+import sys
+import time
+
+if "--with-local" not in sys.argv:
+    os.environ["LOCAL_INTENT_THRESHOLD"] = "2"
+    os.environ["LOCAL_DELETE_THRESHOLD"] = "2"
+
+from router import extract_intent
+from gemini_parser import parse_event
+from gemini_delete_parser import parse_delete_request
+
+MESSAGES = [
+    "create a meeting tomorrow 9pm",
+    "tomorrow at 2pm meeting with john",
+    "Kal 5 baje project meeting 1 ghante ki",
+    "Delete my 3pm event today",
+    "delete the meeting tomorrow",
+    "Delete group discussion meet",
+]
+
+
+def run_extraction(mode):
+    """Time intent + payload extraction the way route_message does it"""
+    timings = []
+    for message in MESSAGES:
+        start = time.perf_counter()
+        intent, payload = extract_intent(message, mode=mode)
+        if payload is None and intent == "create_event":
+            payload = parse_event(message)
+        elif payload is None and intent == "delete_event":
+            payload = parse_delete_request(message)
+        timings.append((time.perf_counter() - start) * 1000)
+        print(f"  [{mode:8}] {timings[-1]:7.0f} ms  {intent:13} {json.dumps(payload)[:60]}")
+    return timings
+
+
+def run_full(mode):
+    import router
+
+    with open("token.json") as f:
+        creds = json.load(f)
+    session = {"credentials": creds}
+
+    router.EXTRACTION_MODE = mode
+    timings = []
+    for message in MESSAGES:
+        start = time.perf_counter()
+        router.route_message(message, session)
+        session.pop("pending_event", None)
+        session.pop("conflicts", None)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def summary(label, timings):
+    ordered = sorted(timings)
+    print(f"{label:10} p50={ordered[len(ordered) // 2]:.0f} ms  "
+          f"mean={sum(ordered) / len(ordered):.0f} ms  max={ordered[-1]:.0f} ms")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Extraction Mode Benchmark")
+    print("=" * 60)
+
+    results = {}
+    for mode in ("two_step", "unified"):
+        results[mode] = run_full(mode) if "--full" in sys.argv else run_extraction(mode)
+
+    print("-" * 60)
+    for mode, timings in results.items():
+        summary(mode, timings)
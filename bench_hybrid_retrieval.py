@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark: dense-only retrieval vs the lexical-first router (BM25, falling
+back to FAISS + reciprocal rank fusion) on a help-centre style corpus.
+
+Reports hit@k (the expected passage is among the k results), the share of
+queries that never reach the embedding model, latency and CPU time per
+query. Uses FastEmbed by default; pass --fake for deterministic fake
+embeddings when the model can't be downloaded (dense quality numbers are
+then meaningless, the lexical ones are not).
+"""
+import sys
+import time
+
+from langchain_community.vectorstores import FAISS
+
+from rag.rag_pipeline import LockedRetriever
+from rag.rag_store import build_lexical_index, get_embeddings
+from services import metrics
+
+K = 4
+
+PASSAGES = {
+    "oauth": "Sign-in uses Google OAuth. Tokens are stored per user and refreshed in the background before they expire.",
+    "timezone": "All times are interpreted in the Asia/Kolkata timezone unless the message names another one.",
+    "duration": "When a message gives only a start time, the event is created with a default duration of one hour.",
+    "conflict": "Before creating an event the assistant checks the calendar for overlapping events and warns about conflicts.",
+    "delete": "Deleting an event always needs explicit confirmation; the assistant lists matching events first.",
+    "allday": "All-day events block the whole day unless they are marked as free (transparent).",
+    "recurring": "Recurring events are expanded into single instances when the calendar is listed.",
+    "stream": "Answers to knowledge questions are streamed to the browser over server-sent events (SSE).",
+    "cache": "Repeated questions are answered from a response cache; answers about today expire at midnight.",
+    "sync": "Calendar events are mirrored locally and kept fresh with incremental syncToken requests.",
+    "logout": "Logging out deletes the stored credentials and the local copy of the calendar.",
+    "morning": "Morning means 10:00 AM, afternoon 2:00 PM, evening 6:00 PM and night 9:00 PM.",
+    "reschedule": "Phrases like move, reschedule or update change the time of an existing event.",
+    "list": "Asking to show or list meetings returns the next upcoming events on the primary calendar.",
+    "privacy": "Event details are only sent to the language model to parse the request and are never stored by it.",
+    "quota": "Calendar API calls are batched so that resolving ten conflicts costs a single HTTP round trip.",
+}
+# Padding so the index isn't trivially small
+FILLER = [f"Release note {i}: minor fixes to the interface, wording and performance of screen {i}." for i in range(300)]
+
+QUERIES = [
+    ("OAuth", "oauth"), ("timezone", "timezone"), ("SSE", "stream"), ("syncToken", "sync"),
+    ("logout", "logout"), ("recurring events", "recurring"), ("default duration", "duration"),
+    ("all-day events", "allday"), ("conflicts", "conflict"), ("response cache", "cache"),
+    ("batched API calls", "quota"), ("reschedule", "reschedule"),
+    ("how do I sign in with my google account", "oauth"),
+    ("which time zone do you assume for my meetings", "timezone"),
+    ("how long is a meeting if I only say when it starts", "duration"),
+    ("will you tell me if two meetings overlap", "conflict"),
+    ("can you remove an event without asking me first", "delete"),
+    ("what time is the evening", "morning"),
+    ("does a holiday that lasts the whole day block my calendar", "allday"),
+    ("what happens to my data when I log out", "logout"),
+    ("how do I push a meeting to a later time", "reschedule"),
+    ("show me what is coming up this week", "list"),
+    ("is my event information kept by the AI", "privacy"),
+    ("why is the second answer to the same question faster", "cache"),
+]
+
+
+def run(label, retriever):
+    metrics.reset()
+    hits, wall, cpu = 0, 0.0, 0.0
+    for query, key in QUERIES:
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        docs = retriever.invoke(query)
+        wall += time.perf_counter() - wall_start
+        cpu += time.process_time() - cpu_start
+        hits += any(d.page_content == PASSAGES[key] for d in docs)
+
+    paths = {name.rsplit(".", 1)[1]: h["count"] for name, h in metrics.snapshot("rag.retrieve.")["latency"].items()}
+    n = len(QUERIES)
+    print(f"{label:14} hit@{K} {hits / n:6.2f}   {wall / n * 1000:7.2f} ms/query   "
+          f"{cpu / n * 1000:7.2f} ms CPU/query   paths {paths or {'dense': n}}")
+    return cpu
+
+
+if __name__ == "__main__":
+    if "--fake" in sys.argv:
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+
+        embeddings, model = DeterministicFakeEmbedding(size=384), "fake-384"
+    else:
+        embeddings, model = get_embeddings(), "FastEmbed"
+
+    store = FAISS.from_texts(list(PASSAGES.values()) + FILLER, embeddings)
+    lexical = build_lexical_index(store)
+
+    print("=" * 90)
+    print(f"Hybrid Retrieval Benchmark ({model}, {store.index.ntotal} chunks, {len(QUERIES)} queries)")
+    print("=" * 90)
+    dense_cpu = run("dense only", LockedRetriever(vectorstore=store, k=K))
+    routed_cpu = run("lexical-first", LockedRetriever(vectorstore=store, k=K, lexical=lexical))
+    print("-" * 90)
+    print(f"CPU saved by the router: {(1 - routed_cpu / dense_cpu) * 100:.0f}%")
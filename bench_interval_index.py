@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: interval index vs the old linear ISO-string scan.
+
+Generates a synthetic calendar (one event every ~30 minutes plus some
+all-day and multi-day events) and times single and batch overlap queries.
+"""
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from services.interval_index import IntervalIndex
+
+EVENT_COUNTS = (1_000, 10_000, 50_000)
+QUERIES = 500
+
+
+def make_events(count, rng):
+    base = datetime(2030, 1, 1, tzinfo=timezone.utc)
+    events = []
+    for i in range(count):
+        start = base + timedelta(minutes=30 * i + rng.randint(0, 20))
+        if i % 50 == 0:
+            day = start.date()
+            events.append({"id": str(i), "start": {"date": day.isoformat()},
+                           "end": {"date": (day + timedelta(days=rng.randint(1, 4))).isoformat()}})
+            continue
+        end = start + timedelta(minutes=rng.choice([15, 30, 60, 90]))
+        events.append({"id": str(i), "start": {"dateTime": start.isoformat().replace("+00:00", "Z")},
+                       "end": {"dateTime": end.isoformat().replace("+00:00", "Z")}})
+    return events, base
+
+
+def linear_scan(events, start_str, end_str):
+    """What check_conflicts used to do (and it skipped all-day events)"""
+    found = []
+    for event in events:
+        event_start = event.get("start", {}).get("dateTime")
+        event_end = event.get("end", {}).get("dateTime")
+        if not event_start or not event_end:
+            continue
+        if event_start < end_str and event_end > start_str:
+            found.append(event)
+    return found
+
+
+def timed(label, fn, rounds):
+    start = time.perf_counter()
+    for i in range(rounds):
+        fn(i)
+    per_call_us = (time.perf_counter() - start) / rounds * 1e6
+    print(f"  {label:34} {per_call_us:10.1f} µs/query")
+    return per_call_us
+
+
+if __name__ == "__main__":
+    counts = [int(arg) for arg in sys.argv[1:]] or EVENT_COUNTS
+    rng = random.Random(42)
+
+    print("=" * 60)
+    print("Conflict Index Benchmark")
+    print("=" * 60)
+
+    for count in counts:
+        events, base = make_events(count, rng)
+        span_minutes = 30 * count
+        slots = []
+        for _ in range(QUERIES):
+            slot_start = base + timedelta(minutes=rng.randint(0, span_minutes))
+            slots.append((slot_start, slot_start + timedelta(hours=1)))
+        slot_strings = [(s.isoformat().replace("+00:00", "Z"), e.isoformat().replace("+00:00", "Z")) for s, e in slots]
+        slot_epochs = [(s.timestamp(), e.timestamp()) for s, e in slots]
+
+        build_start = time.perf_counter()
+        index = IntervalIndex.from_events(events)
+        build_ms = (time.perf_counter() - build_start) * 1000
+
+        print(f"\n{count:,} events (index build {build_ms:.1f} ms)")
+        linear = timed("linear string scan", lambda i: linear_scan(events, *slot_strings[i]), QUERIES)
+        indexed = timed("interval index", lambda i: index.overlaps(*slot_epochs[i]), QUERIES)
+        batch_start = time.perf_counter()
+        index.overlaps_many(slot_epochs)
+        batch_us = (time.perf_counter() - batch_start) / QUERIES * 1e6
+        print(f"  {'interval index, batch of ' + str(QUERIES):34} {batch_us:10.1f} µs/query")
+        print(f"  speedup: {linear / indexed:,.0f}x")
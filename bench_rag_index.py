@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cold start (chunk + embed + build) vs warm start (load the saved
+FAISS index) for the RAG knowledge base.
+
+Uses FastEmbed by default; pass --fake to use deterministic fake embeddings
+when the model can't be downloaded (the warm path is the same either way,
+the cold path is then much cheaper than in production).
+"""
+import sys
+import tempfile
+import time
+
+from rag.rag_store import EMBEDDING_MODEL, SOURCE_FILES, get_embeddings, load_rag
+
+ROUNDS = 5
+
+
+def timed(label, fn, rounds=ROUNDS):
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    best = min(samples)
+    print(f"{label:44} {best:10.1f} ms (best of {rounds})")
+    return best
+
+
+if __name__ == "__main__":
+    if "--fake" in sys.argv:
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+
+        embeddings, model = DeterministicFakeEmbedding(size=384), "fake-384"
+    else:
+        embeddings, model = get_embeddings(), EMBEDDING_MODEL
+
+    print("=" * 60)
+    print(f"RAG Index Start-up Benchmark ({model}, {len(SOURCE_FILES)} file(s))")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as index_dir:
+        cold = timed(
+            "cold: chunk + embed + build (no saved index)",
+            lambda: load_rag(index_dir=None, embeddings=embeddings, embedding_model=model),
+        )
+        load_rag(index_dir=index_dir, embeddings=embeddings, embedding_model=model)
+        warm = timed(
+            "warm: load saved index",
+            lambda: load_rag(index_dir=index_dir, embeddings=embeddings, embedding_model=model),
+        )
+
+    print("-" * 60)
+    print(f"Speedup: {cold / warm:,.0f}x")
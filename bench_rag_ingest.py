@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Benchmark: re-embedding the whole knowledge directory vs incremental ingestion
+of one changed document.
+
+Uses FastEmbed by default; pass --fake to use deterministic fake embeddings
+when the model can't be downloaded.
+"""
+import os
+import sys
+import tempfile
+import time
+
+from langchain_community.vectorstores import FAISS
+
+from rag.rag_ingest import KnowledgeIngestor
+from rag.rag_store import get_embeddings
+
+DOCUMENTS = 200
+PARAGRAPHS = 6
+
+
+def _write(directory, i, revision=0):
+    path = os.path.join(directory, f"doc_{i:04d}.md")
+    with open(path, "w") as f:
+        for p in range(PARAGRAPHS):
+            f.write(f"Document {i} revision {revision} paragraph {p}. " * 8 + "\n\n")
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + revision * 1_000_000_000))
+
+
+if __name__ == "__main__":
+    if "--fake" in sys.argv:
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+
+        embeddings = DeterministicFakeEmbedding(size=384)
+    else:
+        embeddings = get_embeddings()
+
+    print("=" * 60)
+    print(f"Knowledge Ingestion Benchmark ({DOCUMENTS} documents)")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as kb:
+        for i in range(DOCUMENTS):
+            _write(kb, i)
+
+        store = FAISS.from_texts(["seed"], embeddings)
+        ingestor = KnowledgeIngestor(store, directory=kb, embeddings=embeddings)
+        report = ingestor.sync()
+        full = report["seconds"]
+        print(f"full ingest:    {full * 1000:10.1f} ms  "
+              f"({DOCUMENTS / full:,.0f} docs/s, {report['chunks_embedded'] / full:,.0f} chunks/s)")
+
+        _write(kb, 7, revision=1)
+        report = ingestor.sync()
+        one = report["seconds"]
+        print(f"one doc change: {one * 1000:10.1f} ms  ({report['chunks_embedded']} chunks re-embedded)")
+
+        report = ingestor.sync()
+        print(f"no change scan: {report['seconds'] * 1000:10.1f} ms")
+
+    print("-" * 60)
+    print(f"Update vs full re-embed: {full / one:,.0f}x faster")
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark: recall@k vs query latency vs memory for the FAISS index types in
+rag/vector_index.py, against the exact flat baseline.
+
+Vectors are synthetic, 384-dimensional (the size of bge-small-en-v1.5
+embeddings): clusters that vary along a low-dimensional subspace, like real
+sentence embeddings do. Isotropic noise would make every neighbour almost
+equidistant and understate the recall of the approximate types. Pass a
+vector count to change the corpus size, e.g. python bench_vector_index.py 100000
+"""
+import sys
+import time
+
+import numpy as np
+
+from rag.vector_index import apply_search_params, build_faiss_index, index_bytes
+
+DIM = 384
+CLUSTERS = 200
+SUBSPACE = 32
+QUERIES = 200
+K = 10
+
+
+def corpus(n, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(CLUSTERS, DIM))
+    basis = rng.normal(size=(SUBSPACE, DIM)) / np.sqrt(SUBSPACE)
+
+    def sample(m):
+        spread = rng.normal(size=(m, SUBSPACE)) @ basis
+        return (centers[rng.integers(0, CLUSTERS, m)] + spread + rng.normal(scale=0.05, size=(m, DIM))).astype("float32")
+
+    return sample(n), sample(QUERIES)
+
+
+def measure(label, index, queries, truth, flat_bytes):
+    start = time.perf_counter()
+    _, found = index.search(queries, K)
+    per_query_us = (time.perf_counter() - start) / len(queries) * 1e6
+    recall = np.mean([len(set(t) & set(f)) / K for t, f in zip(truth, found)])
+    size = index_bytes(index)
+    print(f"{label:22} {recall:8.3f} {per_query_us:12.0f} {size / 2**20:10.1f} {size / flat_bytes:8.2f}")
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    vectors, queries = corpus(n)
+
+    print("=" * 66)
+    print(f"Vector Index Benchmark ({n:,} x {DIM}d, {QUERIES} queries, recall@{K})")
+    print("=" * 66)
+    print(f"{'index':22} {'recall':>8} {'us/query':>12} {'MB':>10} {'vs flat':>8}")
+
+    flat, _ = build_faiss_index(vectors, "flat")
+    _, truth = flat.search(queries, K)
+    flat_bytes = index_bytes(flat)
+    measure("flat", flat, queries, truth, flat_bytes)
+
+    for index_type in ["sqfp16", "sq8", "ivf", "ivfpq", "hnsw"]:
+        start = time.perf_counter()
+        index, spec = build_faiss_index(vectors, index_type)
+        build_s = time.perf_counter() - start
+        print(f"-- {index_type} ({spec}, built in {build_s:.1f} s)")
+        if index_type in ("ivf", "ivfpq"):
+            for nprobe in [1, 4, 8, 16, 32]:
+                apply_search_params(index, nprobe=nprobe)
+                measure(f"   nprobe={nprobe}", index, queries, truth, flat_bytes)
+        elif index_type == "hnsw":
+            for ef in [16, 64, 128]:
+                apply_search_params(index, ef_search=ef)
+                measure(f"   efSearch={ef}", index, queries, truth, flat_bytes)
+        else:
+            measure(f"   {index_type}", index, queries, truth, flat_bytes)
@@ -11,3 +11,7 @@ GOOGLE_SCOPES = [
     "https://www.googleapis.com/auth/calendar.events"
 ]
 
+
+# Timezone used for all-day events and "today"/"3pm" style matching.
+# Naive datetimes are treated as UTC, matching what create_event sends.
+CALENDAR_TIMEZONE = os.getenv("CALENDAR_TIMEZONE", "UTC")
@@ -0,0 +1,308 @@
+"""
+Deterministic date/time parser for event creation messages.
+
+Handles relative dates (today, tomorrow, weekdays, "in 3 days", "5 march"),
+clock times, ranges ("3-4pm", "5 baje se 6 baje tak"), durations and the
+common Hinglish forms. Returns the same {title, start, end} shape as the
+Gemini parser, or None when the message can't be resolved locally.
+"""
+import re
+from datetime import datetime, timedelta
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+MONTHS = ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"]
+
+_MONTH = r"(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*"
+_MERIDIEM = r"(am|pm|a\.m\.|p\.m\.)"
+_CLOCK = r"(\d{1,2})(?::(\d{2}))?\s*" + _MERIDIEM + r"?(?:\s*baje)?"
+
+# Things we don't try to resolve locally - these go to the LLM
+_UNSUPPORTED = re.compile(
+    r"\b(every|daily|weekly|monthly|yearly|recurring|each|next week|next month|"
+    r"this week|weekend|fortnight|(?<!day )after|before|until|till|later|soon|between)\b"
+)
+
+_DURATION = re.compile(
+    r"\b(?:for\s+)?(\d+(?:\.\d+)?|half an?|an?|ek|aadha|dedh)\s*"
+    r"(hours?|hrs?|minutes?|mins?|ghante|ghanta|ghanton|minute|min)\b"
+    r"(?:\s+(?:ki|ka|ke|tak))?"
+)
+_RANGE = re.compile(
+    r"\b(?:from\s+)?" + _CLOCK + r"\s*(?:-|–|to|se)\s*" + _CLOCK + r"(?:\s+tak)?\b"
+)
+_TIME = re.compile(
+    r"(?:\b(?:at|@)\s*)?\b(\d{1,2})(?::(\d{2}))?\s*(am|pm|a\.m\.|p\.m\.|baje)(?![a-z])"
+)
+_TIME_AT = re.compile(r"\b(?:at|@)\s*(\d{1,2})(?::(\d{2}))?\b")
+_TIME_24H = re.compile(r"\b(\d{1,2}):(\d{2})\b")
+_TIME_NAMED = re.compile(r"\b(?:at\s+)?(noon|midday|midnight)\b")
+
+_DAYPART = re.compile(
+    r"\b(?:in the\s+)?(morning|subah|afternoon|dopahar|evening|shaam|sham|night|raat|tonight)\b"
+)
+_PM_DAYPARTS = {"afternoon", "dopahar", "evening", "shaam", "sham", "night", "raat", "tonight"}
+# Meals hint at the time of day but stay part of the title ("dinner at 8")
+_MEAL = re.compile(r"\b(breakfast|brunch|lunch|dinner|supper)\b")
+_MEAL_DAYPARTS = {
+    "breakfast": "morning", "brunch": "midday", "lunch": "midday",
+    "dinner": "evening", "supper": "evening",
+}
+
+_DATE_ISO = re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b")
+_DATE_DAY_MONTH = re.compile(r"\b(?:on\s+)?(\d{1,2})(?:st|nd|rd|th)?\s+(?:of\s+)?" + _MONTH + r"\b")
+_DATE_MONTH_DAY = re.compile(r"\b(?:on\s+)?" + _MONTH + r"\s+(\d{1,2})(?:st|nd|rd|th)?\b")
+_DATE_IN_DAYS = re.compile(r"\bin\s+(\d+)\s+days?\b")
+_DATE_RELATIVE = re.compile(
+    r"\b(day after tomorrow|parso|today|aaj|tonight|tomorrow|tmrw|tmr|kal)\b"
+)
+_WEEKDAY_ABBREVIATIONS = r"mon|tues|tue|wed|thurs|thur|thu|fri|sat|sun"
+# Abbreviations are everyday words too ("sat", "sun", "wed"), so they only
+# count as a date after a qualifier ("on sat", "next fri")
+_DATE_WEEKDAY = re.compile(
+    r"\b(?:(next|this|on|coming)\s+)?(monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b"
+    r"|\b(next|this|on|coming)\s+(" + _WEEKDAY_ABBREVIATIONS + r")\b\.?"
+)
+# Date or timezone words still in the title after parsing ("3pm EST",
+# "meeting fri 3pm") mean the result would be wrong - leave it to the LLM
+_LEFTOVER_DATE_TIME = re.compile(
+    r"\b(" + _WEEKDAY_ABBREVIATIONS + r"|"
+    r"jan|january|feb|february|mar|march|apr|april|may|jun|june|jul|july|aug|august|"
+    r"sep|sept|september|oct|october|nov|november|dec|december|"
+    r"utc|gmt|ist|est|edt|cst|cdt|mst|mdt|pst|pdt|bst|cet|cest|aest|jst|sgt)\b"
+)
+
+_RELATIVE_OFFSETS = {
+    "today": 0, "aaj": 0, "tonight": 0,
+    "tomorrow": 1, "tmrw": 1, "tmr": 1, "kal": 1,
+    "day after tomorrow": 2, "parso": 2,
+}
+
+_TITLE_STOPWORDS = {
+    "create", "schedule", "add", "book", "set", "up", "setup", "arrange", "plan",
+    "put", "make", "organise", "organize", "please", "new", "a", "an", "the",
+    "at", "on", "for", "from", "to", "in", "my", "mera", "meri", "mere",
+    "karo", "kar", "do", "ki", "ka", "ke", "se", "tak", "hai", "ek", "and",
+}
+
+
+def _number(value):
+    return {"half a": 0.5, "half an": 0.5, "aadha": 0.5, "a": 1, "an": 1,
+            "ek": 1, "dedh": 1.5}.get(value) or float(value)
+
+
+def _to_24h(hour, minute, meridiem, daypart, baje=False):
+    """
+    Resolve an hour to 24h using the meridiem or daypart
+
+    Returns None for a bare 1-11 ("at 8", "10 baje") - without a meridiem or
+    daypart it could be either, so the message goes to the LLM instead. The
+    exception is "1-7 baje": said without "subah" it means the afternoon or
+    evening.
+    """
+    if hour > 23 or minute > 59:
+        return None
+    meridiem = (meridiem or "").replace(".", "")
+    if meridiem == "pm" or (not meridiem and daypart in _PM_DAYPARTS):
+        return (hour % 12) + 12, minute
+    if meridiem == "am" or (not meridiem and daypart in ("morning", "subah")):
+        return hour % 12, minute
+    if hour == 0 or hour >= 12:
+        return hour, minute
+    if daypart == "midday":
+        # "lunch at 1" is 13:00, "lunch at 11:30" is before noon
+        return (hour + 12 if hour <= 5 else hour), minute
+    if baje and hour <= 7:
+        return hour + 12, minute
+    return None
+
+
+class _Scanner:
+    """Tracks which parts of the message were consumed by date/time matches"""
+
+    def __init__(self, text, original):
+        self.text = text
+        # Keep the user's casing for the title when lower() preserved offsets
+        self.original = original if len(original) == len(text) else text
+        self.spans = []
+
+    def search(self, pattern):
+        for match in pattern.finditer(self.text):
+            if not any(match.start() < end and start < match.end() for start, end in self.spans):
+                self.spans.append(match.span())
+                return match
+        return None
+
+    def remainder(self):
+        chars = list(self.original)
+        for start, end in self.spans:
+            for i in range(start, end):
+                chars[i] = " "
+        return "".join(chars)
+
+
+def _resolve_date(scanner, today):
+    match = scanner.search(_DATE_ISO)
+    if match:
+        return datetime(int(match.group(1)), int(match.group(2)), int(match.group(3))).date()
+
+    match = scanner.search(_DATE_DAY_MONTH)
+    day, month = (match.group(1), match.group(2)) if match else (None, None)
+    if not match:
+        match = scanner.search(_DATE_MONTH_DAY)
+        if match:
+            month, day = match.group(1), match.group(2)
+    if match:
+        candidate = datetime(today.year, MONTHS.index(month[:3]) + 1, int(day)).date()
+        if candidate < today:
+            candidate = candidate.replace(year=today.year + 1)
+        return candidate
+
+    match = scanner.search(_DATE_IN_DAYS)
+    if match:
+        return today + timedelta(days=int(match.group(1)))
+
+    match = scanner.search(_DATE_RELATIVE)
+    if match:
+        return today + timedelta(days=_RELATIVE_OFFSETS[match.group(1)])
+
+    match = scanner.search(_DATE_WEEKDAY)
+    if match:
+        qualifier, name = (match.group(1), match.group(2)) if match.group(2) else (match.group(3), match.group(4))
+        target = next(i for i, day in enumerate(WEEKDAYS) if day.startswith(name[:3]))
+        days_ahead = (target - today.weekday()) % 7
+        if days_ahead == 0 and qualifier != "this":
+            days_ahead = 7
+        # "next monday" said on a Sunday is the Monday after tomorrow: the
+        # next (Sunday-first) week, like services.event_matcher reads it
+        if qualifier == "next" and (today.weekday() + 1) % 7 + days_ahead <= 6:
+            days_ahead += 7
+        return today + timedelta(days=days_ahead)
+
+    return None
+
+
+def _resolve_times(scanner, daypart):
+    """Return ((start_h, start_m), (end_h, end_m) or None), or None"""
+    match = scanner.search(_RANGE)
+    if match:
+        h1, m1, mer1, h2, m2, mer2 = match.groups()
+        baje = "baje" in match.group(0)
+        end = _to_24h(int(h2), int(m2 or 0), mer2, daypart, baje)
+        start = _to_24h(int(h1), int(m1 or 0), mer1 or mer2, daypart, baje)
+        if start is None or end is None:
+            return None
+        # "11-1pm" means 11am to 1pm, not 11pm to 1pm
+        if not mer1 and start > end and start[0] >= 12:
+            start = (start[0] - 12, start[1])
+        return start, end
+
+    match = scanner.search(_TIME)
+    if match:
+        baje = match.group(3) == "baje"
+        meridiem = None if baje else match.group(3)
+        start = _to_24h(int(match.group(1)), int(match.group(2) or 0), meridiem, daypart, baje)
+        return (start, None) if start else None
+
+    match = scanner.search(_TIME_24H)
+    if match:
+        hour, minute = int(match.group(1)), int(match.group(2))
+        # Two-digit hours ("09:30", "14:00") are a 24h clock
+        start = (hour, minute) if hour >= 12 or len(match.group(1)) == 2 else _to_24h(hour, minute, None, daypart)
+        return (start, None) if start and hour < 24 and minute < 60 else None
+
+    match = scanner.search(_TIME_AT)
+    if match:
+        start = _to_24h(int(match.group(1)), int(match.group(2) or 0), None, daypart)
+        return (start, None) if start else None
+
+    match = scanner.search(_TIME_NAMED)
+    if match:
+        return ((0, 0) if match.group(1) == "midnight" else (12, 0)), None
+
+    return None
+
+
+def _clean_title(remainder):
+    words = re.sub(r"[^\w\s'&/-]", " ", remainder).split()
+    while words and words[0].lower() in _TITLE_STOPWORDS:
+        words.pop(0)
+    while words and words[-1].lower() in _TITLE_STOPWORDS:
+        words.pop()
+    title = " ".join(words)
+    return title[:1].upper() + title[1:]
+
+
+def parse_event_local(user_input, now=None):
+    """
+    Parse an event creation message without calling the LLM
+
+    Args:
+        user_input: User message, e.g. "Kal 5 baje project meeting 1 ghante ki"
+        now: Reference datetime (defaults to datetime.now())
+
+    Returns:
+        {"title", "start", "end"} with ISO datetimes, or None if the message
+        couldn't be resolved
+    """
+    original = " ".join(user_input.split())
+    text = original.lower()
+    if not text or _UNSUPPORTED.search(text):
+        return None
+
+    now = now or datetime.now()
+    scanner = _Scanner(text, original)
+
+    duration = timedelta()
+    while True:
+        match = scanner.search(_DURATION)
+        if not match:
+            break
+        amount = _number(match.group(1))
+        unit = match.group(2)
+        if unit.startswith(("h", "ghant")):
+            duration += timedelta(hours=amount)
+        else:
+            duration += timedelta(minutes=amount)
+
+    try:
+        event_date = _resolve_date(scanner, now.date())
+    except ValueError:
+        # "31 feb" and friends
+        return None
+    daypart_match = scanner.search(_DAYPART)
+    daypart = daypart_match.group(1) if daypart_match else None
+    if daypart is None:
+        meal = _MEAL.search(text)
+        daypart = _MEAL_DAYPARTS[meal.group(1)] if meal else None
+    if daypart == "tonight" and event_date is None:
+        event_date = now.date()
+
+    times = _resolve_times(scanner, daypart)
+    if not times:
+        return None
+
+    # Stray digits mean something we didn't understand (e.g. "3 people")
+    remainder = scanner.remainder()
+    if re.search(r"\d", remainder) or _LEFTOVER_DATE_TIME.search(remainder.lower()):
+        return None
+
+    title = _clean_title(remainder)
+    if not title:
+        return None
+
+    (start_h, start_m), end_time = times
+    start = datetime.combine(event_date or now.date(), datetime.min.time()).replace(
+        hour=start_h, minute=start_m
+    )
+    if end_time:
+        end = start.replace(hour=end_time[0], minute=end_time[1])
+        if end <= start:
+            end += timedelta(days=1)
+    else:
+        end = start + (duration or timedelta(hours=1))
+
+    return {
+        "title": title,
+        "start": start.strftime("%Y-%m-%dT%H:%M:%S"),
+        "end": end.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
@@ -1,16 +1,14 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
 from dotenv import load_dotenv
+from services.cache import response_cache
+from services import llm_gateway
+from services.log import get_logger
 import os
 
 load_dotenv()
 
-# LLM setup
-llm = ChatGoogleGenerativeAI(
-    model="gemini-flash-latest",
-    temperature=0
-)
+logger = get_logger(__name__)
 
 parser = JsonOutputParser()
 
@@ -34,16 +32,28 @@ Examples:
 User message: {input}
 """)
 
-delete_chain = prompt | llm | parser
+# Built on first use so importing this module never creates a client
+_delete_chain = None
+
+
+def get_delete_chain():
+    global _delete_chain
+    if _delete_chain is None:
+        _delete_chain = prompt | llm_gateway.get_chat_model() | parser
+    return _delete_chain
 
 def parse_delete_request(user_message: str) -> dict:
     """
     Parse delete request using Gemini
     """
     try:
-        result = delete_chain.invoke({"input": user_message})
-        print(f"[DELETE_PARSER] Parsed: {result}")
+        result = response_cache.cached(
+            "delete_parse", user_message, lambda: llm_gateway.invoke(
+                "delete_parse", get_delete_chain(), {"input": user_message}
+            )
+        )
+        logger.debug("Parsed: %s", result)
         return result
     except Exception as e:
-        print(f"[DELETE_PARSER] Error: {e}")
+        logger.warning("Delete parse failed: %s", e)
         return {"error": str(e)}
@@ -1,13 +1,27 @@
-import google.generativeai as genai
 import json
 import os
+import threading
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
 
+from date_parser import parse_event_local
+from services.cache import response_cache
+from services import llm_gateway
+from services.log import get_logger
+
 load_dotenv()
 
-# 🔐 Gemini config
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+logger = get_logger(__name__)
+
+# How many parse_event calls were answered by each path
+_stats_lock = threading.Lock()
+_stats = {"local": 0, "llm": 0}
+
+
+def get_parser_stats():
+    """Return how many events were parsed locally vs by Gemini"""
+    with _stats_lock:
+        return dict(_stats)
 
 def get_prompt_with_context():
     """Generate prompt with current date context"""
@@ -42,13 +56,37 @@ User sentence:
 """
 
 def parse_event(user_input):
-    model = genai.GenerativeModel("gemini-flash-latest")
-    
+    """
+    Parse an event creation message into {title, start, end}
+
+    Tries the local rule-based parser first and only calls Gemini when the
+    message can't be resolved locally. The result's "parser" key reports
+    which path was taken ("local" or "llm").
+    """
+    event_data = parse_event_local(user_input)
+    if event_data:
+        with _stats_lock:
+            _stats["local"] += 1
+        event_data["parser"] = "local"
+        return event_data
+
+    with _stats_lock:
+        _stats["llm"] += 1
+
+    return response_cache.cached("event_parse", user_input, lambda: _parse_event_llm(user_input))
+
+
+def _parse_event_llm(user_input):
     prompt = get_prompt_with_context()
-    response = model.generate_content(
-        prompt + user_input,
-        generation_config={"temperature": 0}
-    )
+    try:
+        response = llm_gateway.generate_content(
+            "event_parse",
+            prompt + user_input,
+            generation_config={"temperature": 0}
+        )
+    except llm_gateway.LLMTimeoutError as e:
+        logger.warning("Event parse timed out: %s", e)
+        return {"error": "Gemini took too long to respond, please try again"}
 
     try:
         # Clean response text - remove markdown code blocks if present
@@ -60,16 +98,19 @@ def parse_event(user_input):
                 response_text = response_text[4:]
             response_text = response_text.strip()
         
-        return json.loads(response_text)
+        event_data = json.loads(response_text)
+        if isinstance(event_data, dict):
+            event_data["parser"] = "llm"
+        return event_data
     except json.JSONDecodeError as e:
-        print(f"[PARSE ERROR] Failed to parse JSON: {e}")
-        print(f"[PARSE ERROR] Raw response: {response.text}")
+        logger.warning("Failed to parse JSON: %s", e)
+        logger.debug("Raw response: %s", response.text)
         return {
             "error": "Invalid response from Gemini",
             "raw": response.text
         }
     except Exception as e:
-        print(f"[PARSE ERROR] Unexpected error: {e}")
+        logger.exception("Unexpected parse error: %s", e)
         return {
             "error": str(e),
             "raw": response.text if hasattr(response, 'text') else ""
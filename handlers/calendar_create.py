@@ -1,82 +1,153 @@
 # handlers/calendar_create.py
 
 from gemini_parser import parse_event
-from services.calendar_service import get_calendar_service, create_event, check_conflicts
+from services.calendar_service import get_service_for_session, create_event, check_conflicts
+from services.credential_store import session_user_id
+from services.event_store import event_store
+from services.executor import gather_stages, run_io, run_parallel
+from services.log import get_logger
 from flask import session as flask_session
 
-def handle_create_event(user_message, session=None):
+logger = get_logger(__name__)
+
+def handle_create_event(user_message, session=None, event_data=None):
     """
     Create calendar event from user message with conflict detection
+
+    Args:
+        user_message: User's message
+        session: Flask session containing credentials
+        event_data: Pre-parsed {title, start, end} from the unified extraction
+            call (optional). Parsed again if missing or incomplete.
     """
 
-    # 1. Gemini se structured data nikaalo
-    event_data = parse_event(user_message)
+    creds_source = session if session is not None else flask_session
+
+    # 1. Gemini se structured data nikaalo (unless the router already did).
+    # Meanwhile warm the calendar service and the user's event mirror so the
+    # conflict check after parsing is served locally.
+    if not event_data or not all(event_data.get(key) for key in ["title", "start", "end"]):
+        stages = {"parse": lambda: parse_event(user_message)}
+        if "credentials" in creds_source:
+            try:
+                service = get_service_for_session(creds_source)
+                user_id = session_user_id(creds_source)
+                stages["warm_events"] = lambda: event_store.prefetch(user_id, service)
+            except Exception as e:
+                logger.warning("Could not prefetch calendar: %s", e)
+        event_data = run_parallel("create", stages)["parse"]
+
+    error = _parse_error(event_data)
+    if error:
+        return error
+
+    try:
+        service = get_service_for_session(creds_source)
+        user_id = session_user_id(creds_source)
+        return _create_checked(event_data, service, user_id)
+    except Exception as e:
+        return _failure(e)
+
+
+async def handle_create_event_async(user_message, service, user_id, event_data=None):
+    """
+    Async variant of handle_create_event (same result)
+
+    The caller resolves the Calendar service and user id from the session on
+    the request thread, so nothing here touches the session. Parsing and the
+    event mirror warm-up are awaited together; the blocking Gemini and
+    Calendar clients run on the I/O pool.
+
+    Args:
+        user_message: User's message
+        service: Calendar service, or None if the user isn't logged in
+        user_id: Credential store key of the user
+        event_data: Pre-parsed {title, start, end} (optional)
+    """
+    if service is None:
+        return {"error": "Not authenticated. Please login with Google Calendar."}
+
+    if not event_data or not all(event_data.get(key) for key in ["title", "start", "end"]):
+        stages = {
+            "parse": run_io(parse_event, user_message),
+            "warm_events": run_io(event_store.prefetch, user_id, service),
+        }
+        event_data = (await gather_stages("create", stages))["parse"]
+
+    error = _parse_error(event_data)
+    if error:
+        return error
 
-    # Check for errors in parsing
+    try:
+        return await run_io(_create_checked, event_data, service, user_id)
+    except Exception as e:
+        return _failure(e)
+
+
+def _parse_error(event_data):
+    """Error response for a failed or incomplete parse, else None"""
     if not event_data or "error" in event_data:
         error_msg = event_data.get("error", "Could not understand event details") if isinstance(event_data, dict) else "Could not understand event details"
-        print(f"[CREATE_EVENT] Parse error: {error_msg}")
+        logger.warning("Parse error: %s", error_msg)
         if isinstance(event_data, dict) and "raw" in event_data:
-            print(f"[CREATE_EVENT] Raw response: {event_data.get('raw')}")
+            logger.debug("Raw response: %s", event_data.get("raw"))
         return {"error": error_msg}
-    
+
     # Validate that required fields are present
     if not all(key in event_data for key in ["title", "start", "end"]):
         return {"error": "Missing required event details (title, start, or end)"}
+    return None
 
-    try:
-        creds_source = session if session is not None else flask_session
-        service = get_calendar_service(creds_source["credentials"])
-
-        # 2. Check for conflicts
-        print(f"[CREATE_EVENT] Checking conflicts for time range: {event_data['start']} to {event_data['end']}")
-        conflicts = check_conflicts(service, event_data["start"], event_data["end"])
-        print(f"[CREATE_EVENT] Found {len(conflicts)} conflicting events")
-        
-        if conflicts:
-            # Format conflict information
-            conflict_info = []
-            for event in conflicts:
-                event_title = event.get("summary", "Untitled Event")
-                event_start = event.get("start", {}).get("dateTime", "Unknown time")
-                print(f"[CREATE_EVENT] Conflict: {event_title} at {event_start}")
-                conflict_info.append(f"• {event_title} at {event_start}")
-            
-            conflict_message = "\n".join(conflict_info)
-            
-            print(f"[CREATE_EVENT] Returning conflict response")
-            return {
-                "response": f"⚠️ Time conflict detected!\n\nExisting events:\n{conflict_message}\n\nWould you like me to:\n1. Delete the existing event(s) and create the new one?\n2. Create anyway (double booking)?\n3. Cancel?\n\nPlease reply with 'delete and create', 'create anyway', or 'cancel'.",
-                "conflict_detected": True,
-                "conflicts": conflicts,
-                "pending_event": event_data
-            }
 
-        # 3. No conflicts - create event
-        print(f"[CREATE_EVENT] No conflicts found, creating event")
-        success, result = create_event(
-            service=service,
-            title=event_data["title"],
-            start=event_data["start"],
-            end=event_data["end"],
-            description=event_data.get("description", "")
-        )
-
-        if success:
-            return {
-                "response": f"✅ Created event: {event_data['title']}",
-                "event_created": {
-                    "name": event_data["title"],
-                    "start": event_data["start"],
-                    "description": event_data.get("description", ""),
-                    "id": result["id"]
-                }
+def _failure(e):
+    logger.exception("Create failed: %s", e)
+    return {"error": f"Failed to create event: {str(e)}"}
+
+
+def _create_checked(event_data, service, user_id):
+    """Create the event unless it conflicts with existing ones"""
+    # 2. Check for conflicts
+    conflicts = check_conflicts(service, event_data["start"], event_data["end"], user_id=user_id)
+    logger.info("%d conflicting events for %s to %s", len(conflicts), event_data["start"], event_data["end"])
+
+    if conflicts:
+        # Format conflict information
+        conflict_info = []
+        for event in conflicts:
+            event_title = event.get("summary", "Untitled Event")
+            event_start = event.get("start", {}).get("dateTime") or event.get("start", {}).get("date", "Unknown time")
+            if event.get("calendarId"):
+                event_title += f" ({event['calendarId']})"
+            conflict_info.append(f"• {event_title} at {event_start}")
+
+        conflict_message = "\n".join(conflict_info)
+
+        return {
+            "response": f"⚠️ Time conflict detected!\n\nExisting events:\n{conflict_message}\n\nWould you like me to:\n1. Delete the existing event(s) and create the new one?\n2. Create anyway (double booking)?\n3. Cancel?\n\nPlease reply with 'delete and create', 'create anyway', or 'cancel'.",
+            "conflict_detected": True,
+            "conflicts": conflicts,
+            "pending_event": event_data
+        }
+
+    # 3. No conflicts - create event
+    success, result = create_event(
+        service=service,
+        title=event_data["title"],
+        start=event_data["start"],
+        end=event_data["end"],
+        description=event_data.get("description", ""),
+        user_id=user_id
+    )
+
+    if success:
+        return {
+            "response": f"✅ Created event: {event_data['title']}",
+            "event_created": {
+                "name": event_data["title"],
+                "start": event_data["start"],
+                "description": event_data.get("description", ""),
+                "id": result["id"]
             }
+        }
 
-        return {"error": result}
-    
-    except Exception as e:
-        print(f"[CREATE_EVENT] Exception: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return {"error": f"Failed to create event: {str(e)}"}
+    return {"error": result}
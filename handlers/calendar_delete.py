@@ -1,120 +1,145 @@
 # handlers/calendar_delete.py
 
-from services.calendar_service import get_calendar_service, delete_event, list_events
+from services.calendar_service import get_service_for_session, delete_event, event_matcher
+from services.event_matcher import unresolved_parts
 from gemini_delete_parser import parse_delete_request
+from services.credential_store import session_user_id
+from services.event_time import event_bounds, local_datetime
+from services.executor import gather_stages, run_io, run_parallel
+from services.log import get_logger, sampled
 from flask import session as flask_session
-from datetime import datetime, timedelta
 
-def handle_delete_event(user_message, session=None):
+logger = get_logger(__name__)
+
+# A candidate is deleted without asking only if it scores this much above the next one
+CLEAR_MATCH_MARGIN = 0.2
+
+def handle_delete_event(user_message, session=None, delete_info=None):
     """
     Delete event based on user's natural language request
+
+    Args:
+        user_message: User's message
+        session: Flask session containing credentials
+        delete_info: Pre-parsed {event_title, time_reference, time} from the
+            unified extraction call (optional)
     """
-    # Parse the delete request
-    delete_info = parse_delete_request(user_message)
-    
-    if "error" in delete_info:
-        return {"error": f"Could not understand delete request: {delete_info['error']}"}
-    
+    creds_source = session if session is not None else flask_session
+
+    # Check if credentials exist
+    if "credentials" not in creds_source:
+        return {"error": "Not authenticated. Please login with Google Calendar."}
+
+    try:
+        service = get_service_for_session(creds_source)
+        user_id = session_user_id(creds_source)
+
+        # Index the user's events (served from the local mirror after the first
+        # sync) while Gemini parses the request - neither needs the other
+        stages = {"fetch_events": lambda: event_matcher(service, user_id=user_id)}
+        if not isinstance(delete_info, dict) or not any(delete_info.values()):
+            stages["parse"] = lambda: parse_delete_request(user_message)
+        results = run_parallel("delete", stages)
+        return _delete_matching(results["fetch_events"], results.get("parse", delete_info), service, user_id)
+
+    except Exception as e:
+        return _failure(e)
+
+
+async def handle_delete_event_async(user_message, service, user_id, delete_info=None):
+    """
+    Async variant of handle_delete_event (same result)
+
+    The caller resolves the Calendar service and user id from the session on
+    the request thread. The Calendar and Gemini clients are blocking, so
+    their calls run on the I/O pool while the event loop waits on both.
+
+    Args:
+        user_message: User's message
+        service: Calendar service, or None if the user isn't logged in
+        user_id: Credential store key of the user
+        delete_info: Pre-parsed {event_title, time_reference, time} (optional)
+    """
+    if service is None:
+        return {"error": "Not authenticated. Please login with Google Calendar."}
+
     try:
-        creds_source = session if session is not None else flask_session
-        
-        # Check if credentials exist
-        if "credentials" not in creds_source:
-            return {"error": "Not authenticated. Please login with Google Calendar."}
-        
-        service = get_calendar_service(creds_source["credentials"])
-
-        # Get upcoming events
-        events = list_events(service, max_results=50)
-        
-        if not events:
-            return {"response": "❌ No events found in your calendar. Make sure you're logged in and have events scheduled."}
-        
-        # Search for matching event
-        event_title = delete_info.get("event_title", "").lower()
-        time_ref = delete_info.get("time_reference", "").lower()
-        time_str = delete_info.get("time", "").lower()
-        
-        print(f"[DELETE] Searching for: title='{event_title}', time_ref='{time_ref}', time='{time_str}'")
-        
-        matching_events = []
-        
-        for event in events:
-            event_summary = event.get("summary", "").lower()
-            event_start = event.get("start", {}).get("dateTime", "")
-            
-            # Check if title matches (if title was specified)
-            title_match = True
-            if event_title:
-                title_match = event_title in event_summary
-            
-            # Check if time matches (if time was specified)
-            time_match = True
-            if time_str:
-                # Extract hour from time string
-                time_clean = time_str.replace("pm", "").replace("am", "").replace(":", "").strip()
-                # Check if the hour appears in the event start time
-                # For "3pm", check for "15:" or "T15" in the datetime
-                if "pm" in time_str.lower():
-                    hour = int(time_clean) if time_clean.isdigit() else 0
-                    if hour < 12:
-                        hour += 12  # Convert to 24-hour format
-                    hour_str = f"T{hour:02d}:"
-                    time_match = hour_str in event_start
-                elif "am" in time_str.lower():
-                    hour = int(time_clean) if time_clean.isdigit() else 0
-                    hour_str = f"T{hour:02d}:"
-                    time_match = hour_str in event_start
-                else:
-                    # Just check if the number appears
-                    time_match = time_clean in event_start.replace(":", "").replace("-", "")
-            
-            # Check if date matches (if date reference was specified)
-            date_match = True
-            if time_ref:
-                event_date = event_start.split("T")[0] if "T" in event_start else ""
-                today = datetime.now().date().isoformat()
-                tomorrow = (datetime.now() + timedelta(days=1)).date().isoformat()
-                
-                if "today" in time_ref:
-                    date_match = event_date == today
-                elif "tomorrow" in time_ref:
-                    date_match = event_date == tomorrow
-            
-            print(f"[DELETE] Checking: {event.get('summary')} at {event_start}")
-            print(f"[DELETE]   title_match={title_match}, time_match={time_match}, date_match={date_match}")
-            
-            if title_match and time_match and date_match:
-                matching_events.append(event)
-                print(f"[DELETE] ✓ Match found: {event.get('summary')} at {event_start}")
-        
-        if not matching_events:
-            return {"response": "❌ No matching events found. Please be more specific."}
-        
-        if len(matching_events) > 1:
-            # Multiple matches - list them
-            event_list = "\n".join([f"• {e.get('summary', 'Untitled')} at {e.get('start', {}).get('dateTime', 'Unknown')}" 
-                                   for e in matching_events[:5]])
-            return {
-                "response": f"⚠️ Found {len(matching_events)} matching events:\n{event_list}\n\nPlease be more specific about which one to delete."
-            }
-        
-        # Delete the single matching event
-        event_to_delete = matching_events[0]
-        event_id = event_to_delete.get("id")
-        event_name = event_to_delete.get("summary", "Untitled Event")
-        
-        success, result = delete_event(service, event_id)
-        
-        if success:
-            return {
-                "response": f"✅ Deleted event: {event_name}"
-            }
-        
-        return {"error": f"Failed to delete event: {result}"}
-    
+        stages = {"fetch_events": run_io(event_matcher, service, user_id=user_id)}
+        if not isinstance(delete_info, dict) or not any(delete_info.values()):
+            stages["parse"] = run_io(parse_delete_request, user_message)
+        results = await gather_stages("delete", stages)
+        return await run_io(
+            _delete_matching, results["fetch_events"], results.get("parse", delete_info), service, user_id
+        )
     except Exception as e:
-        print(f"[DELETE] Exception: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return {"error": f"Failed to delete event: {str(e)}"}
+        return _failure(e)
+
+
+def _failure(e):
+    logger.exception("Delete failed: %s", e)
+    return {"error": f"Failed to delete event: {str(e)}"}
+
+
+def _describe(event):
+    """Title plus local start time, for listing candidates"""
+    bounds = event_bounds(event)
+    if bounds is None:
+        when = "unknown time"
+    elif event.get("start", {}).get("date"):
+        when = local_datetime(bounds[0]).strftime("%a %d %b (all day)")
+    else:
+        when = local_datetime(bounds[0]).strftime("%a %d %b %I:%M %p")
+    return f"{event.get('summary', 'Untitled')} at {when}"
+
+
+def _delete_matching(matcher, delete_info, service, user_id):
+    """Pick the event the request refers to and delete it"""
+    if "error" in delete_info:
+        return {"error": f"Could not understand delete request: {delete_info['error']}"}
+
+    if not len(matcher):
+        return {"response": "❌ No events found in your calendar. Make sure you're logged in and have events scheduled."}
+
+    time_reference = delete_info.get("time_reference") or ""
+    time_of_day = delete_info.get("time") or ""
+    ranked = matcher.match(
+        title=delete_info.get("event_title") or "",
+        time_reference=time_reference,
+        time_of_day=time_of_day,
+    )
+    logger.info("%d candidate(s) for %s among %d events", len(ranked), delete_info, len(matcher))
+    for score, event in ranked:
+        sampled(logger, "Candidate %.3f: %s at %s", score, event.get("summary"), event.get("start"))
+
+    if not ranked:
+        return {"response": "❌ No matching events found. Please be more specific."}
+
+    # The date/time filter couldn't be applied, so even a single clear match
+    # may be on the wrong day - list the candidates instead of deleting
+    unresolved = unresolved_parts(time_reference, time_of_day)
+    if unresolved:
+        event_list = "\n".join(f"• {_describe(event)}" for _, event in ranked[:5])
+        return {
+            "response": f"⚠️ I couldn't work out when \"{' '.join(unresolved)}\" is. Possible matches:\n{event_list}\n\nPlease tell me which one to delete, with its date (e.g. 'tomorrow' or '5 march') and time."
+        }
+
+    # Only delete on its own when one candidate is clearly the best match
+    if len(ranked) > 1 and ranked[0][0] - ranked[1][0] < CLEAR_MATCH_MARGIN:
+        event_list = "\n".join(f"• {_describe(event)}" for _, event in ranked[:5])
+        return {
+            "response": f"⚠️ Found {len(ranked)} matching events:\n{event_list}\n\nPlease be more specific about which one to delete."
+        }
+
+    # Delete the best matching event
+    event_to_delete = ranked[0][1]
+    event_id = event_to_delete.get("id")
+    event_name = event_to_delete.get("summary", "Untitled Event")
+
+    success, result = delete_event(service, event_id, user_id=user_id)
+
+    if success:
+        return {
+            "response": f"✅ Deleted event: {event_name}"
+        }
+
+    return {"error": f"Failed to delete event: {result}"}
@@ -1,8 +1,12 @@
 # handlers/conflict_resolution.py
 
-from services.calendar_service import get_calendar_service, create_event, delete_event
+from services.calendar_service import get_service_for_session, create_event, replace_events
+from services.credential_store import session_user_id
+from services.log import get_logger
 from flask import session as flask_session
 
+logger = get_logger(__name__)
+
 def handle_conflict_resolution(user_message, pending_event, conflicts, session=None):
     """
     Handle user's decision on how to resolve calendar conflicts
@@ -16,42 +20,63 @@ def handle_conflict_resolution(user_message, pending_event, conflicts, session=N
     Returns:
         Response dictionary
     """
+    try:
+        creds_source = session if session is not None else flask_session
+        service = get_service_for_session(creds_source)
+        user_id = session_user_id(creds_source)
+    except Exception as e:
+        logger.exception("Conflict resolution failed: %s", e)
+        return {"error": f"Failed to resolve conflict: {str(e)}"}
+
+    return resolve_conflict(user_message, pending_event, conflicts, service, user_id)
+
+
+def resolve_conflict(user_message, pending_event, conflicts, service, user_id):
+    """
+    handle_conflict_resolution for a service and user id resolved by the
+    caller (no session access, so it can run on the I/O pool)
+    """
     user_message_lower = user_message.lower().strip()
     
     try:
-        creds_source = session if session is not None else flask_session
-        service = get_calendar_service(creds_source["credentials"])
-        
         # Option 1: Delete existing events and create new one
+        # (all deletes and the insert go out as one batched round trip)
         if "delete" in user_message_lower and "create" in user_message_lower:
-            deleted_count = 0
-            for conflict in conflicts:
-                event_id = conflict.get("id")
-                if event_id:
-                    success, _ = delete_event(service, event_id)
-                    if success:
-                        deleted_count += 1
-            
-            # Now create the new event
-            success, result = create_event(
-                service=service,
+            # Only the user's own calendar - conflicts from other calendars
+            # (calendarId set) are left alone
+            event_ids = [
+                conflict.get("id") for conflict in conflicts
+                if conflict.get("id") and not conflict.get("calendarId")
+            ]
+            report = replace_events(
+                service,
+                event_ids,
                 title=pending_event["title"],
                 start=pending_event["start"],
                 end=pending_event["end"],
-                description=pending_event.get("description", "")
+                description=pending_event.get("description", ""),
+                user_id=user_id
             )
-            
-            if success:
+            deleted_count = len(report["deleted"])
+            for event_id, error in report["delete_errors"].items():
+                logger.warning("Failed to delete %s: %s", event_id, error)
+
+            if report["created"]:
+                response = f"✅ Deleted {deleted_count} conflicting event(s) and created: {pending_event['title']}"
+                if report["delete_errors"]:
+                    response += f"\n⚠️ {len(report['delete_errors'])} conflicting event(s) could not be deleted."
                 return {
-                    "response": f"✅ Deleted {deleted_count} conflicting event(s) and created: {pending_event['title']}",
+                    "response": response,
                     "event_created": {
                         "name": pending_event["title"],
                         "start": pending_event["start"],
-                        "id": result["id"]
-                    }
+                        "id": report["created"]["id"]
+                    },
+                    "deleted_ids": report["deleted"],
+                    "failed_deletes": report["delete_errors"]
                 }
             else:
-                return {"error": f"Deleted conflicts but failed to create new event: {result}"}
+                return {"error": f"Deleted {deleted_count} conflict(s) but failed to create new event: {report['create_error']}"}
         
         # Option 2: Create anyway (double booking)
         elif "create anyway" in user_message_lower or "anyway" in user_message_lower:
@@ -60,7 +85,8 @@ def handle_conflict_resolution(user_message, pending_event, conflicts, session=N
                 title=pending_event["title"],
                 start=pending_event["start"],
                 end=pending_event["end"],
-                description=pending_event.get("description", "")
+                description=pending_event.get("description", ""),
+                user_id=user_id
             )
             
             if success:
@@ -89,7 +115,5 @@ def handle_conflict_resolution(user_message, pending_event, conflicts, session=N
             }
     
     except Exception as e:
-        print(f"[CONFLICT_RESOLUTION] Exception: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Conflict resolution failed: %s", e)
         return {"error": f"Failed to resolve conflict: {str(e)}"}
@@ -1,18 +1,71 @@
 # handlers/rag_query.py
 
-from rag.rag_pipeline import get_rag_chain
+import time
+
+from rag.rag_pipeline import rag_chain_invoke, get_index_version, get_rag_chain
+from services.cache import response_cache
+from services import llm_gateway, metrics
 
 def handle_query(user_message):
     """
     Answer general questions using RAG
     """
-    rag_chain = get_rag_chain()
-    response = rag_chain.invoke({
-        "input": user_message
-    })
+    def answer():
+        return rag_chain_invoke({"input": user_message})["answer"]
 
+    # Answers are only reused until the knowledge base changes
     return {
-        "response": response.get("answer", response)
+        "response": response_cache.cached("rag", user_message, answer, version=get_index_version())
+    }
+
+
+def stream_query(user_message):
+    """
+    Answer a question using RAG, yielding frames as tokens arrive
+
+    Yields:
+        {"type": "token", "text": str} for each chunk, then one
+        {"type": "final", "response": str, "metrics": {...}} frame
+    """
+    start = time.monotonic()
+    # Taken before retrieval: an answer built while an ingest lands is
+    # stored under the old version and never served afterwards
+    version = get_index_version()
+
+    cached = response_cache.get("rag", user_message, version)
+    if cached is not None:
+        yield {
+            "type": "final",
+            "response": cached,
+            "metrics": {"cached": True, "total_ms": round((time.monotonic() - start) * 1000, 1)},
+        }
+        return
+
+    parts = []
+    ttft_ms = None
+    for chunk in llm_gateway.stream("rag", get_rag_chain(), user_message):
+        text = chunk.content if hasattr(chunk, "content") else str(chunk)
+        if not text:
+            continue
+        if ttft_ms is None:
+            ttft_ms = (time.monotonic() - start) * 1000
+        parts.append(text)
+        yield {"type": "token", "text": text}
+
+    answer = "".join(parts)
+    total_ms = (time.monotonic() - start) * 1000
+    metrics.observe("chat.stream.total", total_ms)
+    if ttft_ms is not None:
+        metrics.observe("chat.stream.ttft", ttft_ms)
+        response_cache.set("rag", user_message, answer, version)
+
+    yield {
+        "type": "final",
+        "response": answer,
+        "metrics": {
+            "ttft_ms": round(ttft_ms, 1) if ttft_ms is not None else None,
+            "total_ms": round(total_ms, 1),
+        },
     }
 
 
@@ -1,17 +1,16 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
 from dotenv import load_dotenv
+from services.cache import response_cache
+from services import llm_gateway
+from datetime import datetime, timedelta
 import os
+import re
+import threading
 
 load_dotenv()
 
 # ---------------- LLM SETUP ----------------
-llm = ChatGoogleGenerativeAI(
-    model="gemini-flash-latest",
-    temperature=0
-)
-
 parser = JsonOutputParser()
 
 prompt = ChatPromptTemplate.from_template("""
@@ -34,16 +33,313 @@ User message:
 {input}
 """)
 
-intent_chain = prompt | llm | parser
+# Chains are built on first use so importing this module never creates a client
+_intent_chain = None
+_unified_chain = None
+
+
+def get_intent_chain():
+    global _intent_chain
+    if _intent_chain is None:
+        _intent_chain = prompt | llm_gateway.get_chat_model() | parser
+    return _intent_chain
+
+# Single-call mode: intent and the create/delete payload in one round trip
+unified_prompt = ChatPromptTemplate.from_template("""
+You are the request parser for a calendar chatbot.
+
+Important: Today is {today} (a {weekday}). Tomorrow is {tomorrow}.
+
+1. Classify the user's message into ONE intent:
+- create_event
+- update_event
+- delete_event
+- query
+
+2. If the intent is create_event, fill "event":
+- If duration not mentioned, assume 1 hour
+- Output time in ISO format: YYYY-MM-DDTHH:MM:SS
+- Assume timezone IST (UTC+5:30)
+- For relative dates like "tomorrow 9pm", calculate the absolute date
+
+3. If the intent is delete_event, fill "delete":
+- "event_title": title or keywords to search for
+- "time_reference": today/tomorrow/specific date if mentioned
+- "time": specific time if mentioned (e.g., 3pm, 14:00)
+
+Leave the other object empty. Return ONLY valid JSON in this format:
+
+{{
+  "intent": "<one_of_the_above>",
+  "event": {{"title": "", "start": "", "end": ""}},
+  "delete": {{"event_title": "", "time_reference": "", "time": ""}}
+}}
+
+User message:
+{input}
+""")
+
+
+
+def get_unified_chain():
+    global _unified_chain
+    if _unified_chain is None:
+        _unified_chain = unified_prompt | llm_gateway.get_chat_model() | parser
+    return _unified_chain
+
+# ---------------- LOCAL FAST PATH ----------------
+# Obvious messages ("delete my 3pm", "create a meeting tomorrow") are
+# classified with keyword/pattern rules. Gemini is only called when the
+# local confidence is below LOCAL_INTENT_THRESHOLD (LOCAL_DELETE_THRESHOLD for deletes).
+LOCAL_INTENT_THRESHOLD = float(os.getenv("LOCAL_INTENT_THRESHOLD", "0.75"))
+# A wrong local delete loses an event, so it needs a verb, a target and a time
+LOCAL_DELETE_THRESHOLD = float(os.getenv("LOCAL_DELETE_THRESHOLD", "0.9"))
+
+_DELETE_VERBS = re.compile(
+    r"\b(delete|remove|cancel|erase|hatao|hata do|mitao)\b"
+)
+_CREATE_VERBS = re.compile(
+    r"\b(create|schedule|add|book|set ?up|arrange|organi[sz]e|"
+    r"banao|bana do|rakho|rakh do|karo)\b"
+)
+# Verbs with everyday non-calendar meanings ("drop me a line", "make sure",
+# "clear my head"); they only ever count as a weak signal
+_AMBIGUOUS_DELETE_VERBS = re.compile(r"\b(drop|clear)\b")
+_AMBIGUOUS_CREATE_VERBS = re.compile(r"\b(make|put|block|plan)\b")
+# "don't delete ...", "never cancel ..." - leave those to the LLM
+_NEGATION = re.compile(
+    r"\b(don'?t|don\u2019t|do not|never|not|no need to|mat|nahi|nahin)\b"
+)
+_UPDATE_VERBS = re.compile(
+    r"\b(reschedule|move|postpone|prepone|shift|change|update|rename|push|edit)\b"
+)
+_EVENT_NOUNS = re.compile(
+    r"\b(meeting|meet|event|call|appointment|session|sync|standup|stand-up|"
+    r"lunch|dinner|interview|reminder|class|review|demo|discussion)s?\b"
+)
+_TIME_WORDS = re.compile(
+    r"\b(\d{1,2}(:\d{2})?\s*(am|pm)|\d{1,2}:\d{2}|\d{1,2}\s*baje|noon|midnight|"
+    r"today|tomorrow|tonight|kal|aaj|parso|"
+    r"monday|tuesday|wednesday|thursday|friday|saturday|sunday|"
+    r"next week|this week)\b"
+)
+_QUESTION_START = re.compile(
+    r"^(what|what's|whats|how|why|who|when|where|which|explain|define|"
+    r"tell me|describe|can you explain|is|are|does|do)\b"
+)
+
+# Confidence buckets used for the histogram in get_intent_stats()
+_CONFIDENCE_BUCKETS = (0.5, 0.75, 0.9, 1.0)
+
+_stats_lock = threading.Lock()
+_stats = {
+    "total": 0,
+    "local_hits": 0,
+    "llm_calls": 0,
+    "test_mode": 0,
+    "local_by_intent": {},
+    "confidence_histogram": {str(b): 0 for b in _CONFIDENCE_BUCKETS},
+}
+
+
+def _record(source, intent=None, confidence=None):
+    with _stats_lock:
+        _stats["total"] += 1
+        if source == "local":
+            _stats["local_hits"] += 1
+            by_intent = _stats["local_by_intent"]
+            by_intent[intent] = by_intent.get(intent, 0) + 1
+        elif source == "llm":
+            _stats["llm_calls"] += 1
+        elif source == "test":
+            _stats["test_mode"] += 1
+
+        if confidence is not None:
+            for bucket in _CONFIDENCE_BUCKETS:
+                if confidence <= bucket:
+                    _stats["confidence_histogram"][str(bucket)] += 1
+                    break
+
+
+def classify_intent_local(user_message: str):
+    """
+    Rule-based intent classifier used before the Gemini call
+
+    Args:
+        user_message: Raw user message
+
+    Returns:
+        Tuple (intent: str, confidence: float)
+    """
+    text = " ".join(user_message.lower().split())
+    if not text:
+        return "query", 0.0
+
+    has_time = bool(_TIME_WORDS.search(text))
+    has_event = bool(_EVENT_NOUNS.search(text))
+
+    scores = {"create_event": 0.0, "delete_event": 0.0, "update_event": 0.0, "query": 0.0}
+
+    for intent, pattern, ambiguous in (
+        ("delete_event", _DELETE_VERBS, _AMBIGUOUS_DELETE_VERBS),
+        ("create_event", _CREATE_VERBS, _AMBIGUOUS_CREATE_VERBS),
+        ("update_event", _UPDATE_VERBS, None),
+    ):
+        match = pattern.search(text)
+        if match:
+            # A leading imperative verb is a much stronger signal
+            scores[intent] += 0.6 if match.start() == 0 else 0.45
+        elif ambiguous is not None and ambiguous.search(text):
+            scores[intent] += 0.3
+        else:
+            continue
+        if has_time:
+            scores[intent] += 0.2
+        if has_event:
+            scores[intent] += 0.15
+
+    # "Kal 5 baje project meeting" - event + time without any verb
+    if not any(scores.values()) and has_event and has_time:
+        scores["create_event"] += 0.35
+
+    if _QUESTION_START.search(text):
+        scores["query"] += 0.6
+    if text.endswith("?"):
+        scores["query"] += 0.2
+    if not has_time and not has_event and scores["query"]:
+        scores["query"] += 0.2
+
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    (best_intent, best), (_, second) = ranked[0], ranked[1]
+    if best == 0:
+        return "query", 0.0
+
+    # Competing signals ("delete and create", "what meeting should I cancel?")
+    # pull the confidence down so the LLM gets the final say
+    confidence = max(0.0, min(0.99, best - 0.5 * second))
+    if _NEGATION.search(text):
+        confidence *= 0.5
+    return best_intent, round(confidence, 3)
+
+
+def is_confident(intent, confidence):
+    """Whether a local classification is trusted without asking the LLM"""
+    if intent == "delete_event":
+        return confidence >= LOCAL_DELETE_THRESHOLD
+    return confidence >= LOCAL_INTENT_THRESHOLD
+
+
+def get_intent_stats() -> dict:
+    """Return a snapshot of the local/LLM hit counters"""
+    with _stats_lock:
+        snapshot = {
+            "total": _stats["total"],
+            "local_hits": _stats["local_hits"],
+            "llm_calls": _stats["llm_calls"],
+            "test_mode": _stats["test_mode"],
+            "local_by_intent": dict(_stats["local_by_intent"]),
+            "confidence_histogram": dict(_stats["confidence_histogram"]),
+        }
+    classified = snapshot["local_hits"] + snapshot["llm_calls"]
+    snapshot["local_hit_rate"] = snapshot["local_hits"] / classified if classified else 0.0
+    snapshot["threshold"] = LOCAL_INTENT_THRESHOLD
+    snapshot["delete_threshold"] = LOCAL_DELETE_THRESHOLD
+    return snapshot
+
 
 # ---------------- MAIN FUNCTION ----------------
 def detect_intent(user_message: str) -> dict:
     """
-    Detect intent using Gemini
+    Detect intent locally when the rules are confident, otherwise using Gemini
     """
     # 🔹 TEST MODE (optional)
     test_intent = os.getenv("TEST_INTENT")
     if test_intent:
+        _record("test")
         return {"intent": test_intent}
 
-    return intent_chain.invoke({"input": user_message})
+    intent, confidence = classify_intent_local(user_message)
+    if is_confident(intent, confidence):
+        _record("local", intent, confidence)
+        return {"intent": intent, "source": "local", "confidence": confidence}
+
+    _record("llm", confidence=confidence)
+    result = response_cache.cached(
+        "intent",
+        user_message,
+        lambda: llm_gateway.invoke("intent", get_intent_chain(), {"input": user_message}),
+    )
+    if isinstance(result, dict):
+        # Annotate a copy so neither the cache nor the chain result is changed
+        result = dict(result)
+        result.setdefault("source", "llm")
+        result.setdefault("local_confidence", confidence)
+    return result
+
+
+def _local_intent_with_payload(user_message):
+    """Shared start of the sync and async unified paths; None means ask Gemini"""
+    test_intent = os.getenv("TEST_INTENT")
+    if test_intent:
+        _record("test")
+        return {"intent": test_intent, "payload": None, "source": "test"}
+
+    intent, confidence = classify_intent_local(user_message)
+    if is_confident(intent, confidence):
+        _record("local", intent, confidence)
+        return {"intent": intent, "payload": None, "source": "local", "confidence": confidence}
+
+    _record("llm", confidence=confidence)
+    return None
+
+
+def _unified_inputs(user_message):
+    today = datetime.now().date()
+    return {
+        "input": user_message,
+        "today": today.strftime("%Y-%m-%d"),
+        "weekday": today.strftime("%A"),
+        "tomorrow": (today + timedelta(days=1)).strftime("%Y-%m-%d"),
+    }
+
+
+def _unified_result(result):
+    intent = result.get("intent")
+    payload = None
+    if intent == "create_event":
+        payload = result.get("event")
+    elif intent == "delete_event":
+        payload = result.get("delete")
+    return {"intent": intent, "payload": payload or None, "source": "llm_unified"}
+
+
+def detect_intent_with_payload(user_message: str) -> dict:
+    """
+    Detect intent and extract the create/delete payload in a single call
+
+    Confident local classifications return without a payload; the handlers
+    then parse on their own. Otherwise one Gemini call returns both.
+
+    Returns:
+        {"intent": str, "payload": dict or None, "source": str}
+    """
+    local = _local_intent_with_payload(user_message)
+    if local is not None:
+        return local
+
+    result = response_cache.cached("unified", user_message, lambda: llm_gateway.invoke(
+        "unified", get_unified_chain(), _unified_inputs(user_message)
+    ))
+    return _unified_result(result)
+
+
+async def detect_intent_with_payload_async(user_message: str) -> dict:
+    """Async variant of detect_intent_with_payload (same result shape)"""
+    local = _local_intent_with_payload(user_message)
+    if local is not None:
+        return local
+
+    result = await response_cache.acached("unified", user_message, lambda: llm_gateway.ainvoke(
+        "unified", get_unified_chain(), _unified_inputs(user_message)
+    ))
+    return _unified_result(result)
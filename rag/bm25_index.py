@@ -0,0 +1,110 @@
+"""
+BM25 inverted index over the RAG chunks
+
+Kept beside the FAISS index (same chunk ids) so keyword questions like
+"OAuth" or "timezone" can be answered without running the embedding model.
+Small enough to rebuild from the docstore at every start.
+"""
+import math
+import os
+import re
+from collections import Counter, defaultdict
+
+# Lexical answers are trusted only for short queries whose terms all occur
+LEXICAL_MAX_TERMS = int(os.getenv("RAG_LEXICAL_MAX_TERMS", "3"))
+LEXICAL_MIN_SCORE = float(os.getenv("RAG_LEXICAL_MIN_SCORE", "1.0"))
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it me my of on or "
+    "the this to what when where which who why will with you your".split()
+)
+
+
+def tokenize(text):
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Args:
+        k1: Term frequency saturation
+        b: Length normalization
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(dict)  # term -> {doc_id: tf}
+        self.lengths = {}
+        self.doc_terms = {}
+        self._total_length = 0
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def add(self, doc_id, text):
+        if doc_id in self.lengths:
+            self.remove(doc_id)
+        terms = tokenize(text)
+        counts = Counter(terms)
+        for term, tf in counts.items():
+            self.postings[term][doc_id] = tf
+        self.doc_terms[doc_id] = list(counts)
+        self.lengths[doc_id] = len(terms)
+        self._total_length += len(terms)
+
+    def remove(self, doc_id):
+        length = self.lengths.pop(doc_id, None)
+        if length is None:
+            return
+        self._total_length -= length
+        for term in self.doc_terms.pop(doc_id):
+            posting = self.postings[term]
+            del posting[doc_id]
+            if not posting:
+                del self.postings[term]
+
+    def search(self, query, k=4):
+        """
+        Returns:
+            [(doc_id, score)] best first, only documents sharing a term
+        """
+        n = len(self.lengths)
+        if not n:
+            return []
+        avg_length = self._total_length / n or 1
+        scores = defaultdict(float)
+        # dict, not set: a stable term order keeps tied scores in insertion order
+        for term in dict.fromkeys(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for doc_id, tf in posting.items():
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[doc_id] / avg_length)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: -item[1])[:k]
+
+    def confident(self, query, results):
+        """Short keyword query, every term indexed and a strong top hit"""
+        terms = set(tokenize(query))
+        if not terms or len(terms) > LEXICAL_MAX_TERMS or not results:
+            return False
+        if any(term not in self.postings for term in terms):
+            return False
+        return results[0][1] >= LEXICAL_MIN_SCORE
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """
+    Merge ranked key lists; each key scores sum(1 / (k + rank))
+
+    Returns:
+        Keys ordered by fused score
+    """
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, key in enumerate(ranking):
+            scores[key] += 1 / (k + rank + 1)
+    return sorted(scores, key=lambda key: -scores[key])
@@ -0,0 +1,105 @@
+"""
+Streaming embed pipeline for building the FAISS index
+
+Chunks are produced lazily file by file, embedded in batches on a thread
+pool and added to the index in order as each batch completes. At most
+`workers * 2` batches are in flight, so memory stays bounded by the batch
+size rather than the corpus size.
+
+Threads rather than processes: FastEmbed runs the model in onnxruntime,
+which releases the GIL, and a process pool would load one model copy per
+worker.
+"""
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_community.document_loaders import TextLoader
+from langchain_community.vectorstores import FAISS
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from services import metrics
+from services.log import get_logger
+
+logger = get_logger(__name__)
+
+EMBED_BATCH_SIZE = int(os.getenv("RAG_EMBED_BATCH_SIZE", "64"))
+EMBED_WORKERS = int(os.getenv("RAG_EMBED_WORKERS", "4"))
+PROGRESS_EVERY_SECONDS = 5
+
+
+def iter_chunks(sources, chunk_size, chunk_overlap):
+    """Yield the chunks of each source file, loading one file at a time"""
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    for path in sources:
+        yield from splitter.split_documents(TextLoader(path).load())
+
+
+def _batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def embed_chunks(chunks, embeddings, batch_size=EMBED_BATCH_SIZE, workers=EMBED_WORKERS, vectorstore=None):
+    """
+    Embed chunks in parallel batches and add them to a FAISS store
+
+    Args:
+        chunks: Iterable of Documents (consumed lazily)
+        embeddings: Embeddings used for the chunks
+        batch_size: Chunks per embed_documents call
+        workers: Batches embedded at the same time
+        vectorstore: Store to add to (None: created from the first batch)
+
+    Returns:
+        The FAISS store (None if there were no chunks)
+    """
+    start = time.monotonic()
+    last_report = start
+    done = 0
+
+    def embed(batch):
+        batch_start = time.monotonic()
+        vectors = embeddings.embed_documents([d.page_content for d in batch])
+        metrics.observe("rag.embed.batch", (time.monotonic() - batch_start) * 1000)
+        return batch, vectors
+
+    def add(batch, vectors):
+        nonlocal vectorstore
+        text_embeddings = list(zip([d.page_content for d in batch], vectors))
+        metadatas = [d.metadata for d in batch]
+        if vectorstore is None:
+            vectorstore = FAISS.from_embeddings(text_embeddings, embeddings, metadatas=metadatas)
+        else:
+            vectorstore.add_embeddings(text_embeddings, metadatas=metadatas)
+        return len(batch)
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rag-embed") as pool:
+        in_flight = deque()
+        for batch in _batches(chunks, batch_size):
+            in_flight.append(pool.submit(embed, batch))
+            if len(in_flight) < workers * 2:
+                continue
+            # Oldest first, so the index order doesn't depend on timing
+            done += add(*in_flight.popleft().result())
+
+            now = time.monotonic()
+            if now - last_report >= PROGRESS_EVERY_SECONDS:
+                last_report = now
+                logger.info("Embedded %d chunks (%.0f/s)", done, done / (now - start))
+
+        while in_flight:
+            done += add(*in_flight.popleft().result())
+
+    elapsed = time.monotonic() - start
+    if done:
+        metrics.incr("rag.embed.chunks", done)
+        logger.info("Embedded %d chunks in %.1f s (%.0f/s)", done, elapsed, done / max(elapsed, 1e-9))
+    return vectorstore
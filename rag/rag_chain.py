@@ -1,17 +1,14 @@
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.chains import create_retrieval_chain
 from langchain.chains.combine_documents import create_stuff_documents_chain
 from langchain_core.prompts import ChatPromptTemplate
 from rag.rag_store import load_rag
+from services import llm_gateway
 
 load_dotenv()
 
 # LLM
-llm = ChatGoogleGenerativeAI(
-    model="gemini-flash-latest",
-    temperature=0
-)
+llm = llm_gateway.get_chat_model()
 
 # Prompt
 prompt = ChatPromptTemplate.from_template("""
@@ -0,0 +1,337 @@
+"""
+Incremental ingestion of a knowledge directory into the live FAISS index
+
+Every document's chunks are stored under ids "kb:<relative path>#<n>", so a
+changed document only re-embeds its own chunks and a deleted one removes
+exactly its chunks. A polling thread (RAG_INGEST_INTERVAL seconds) picks up
+changes; the index is mutated under the retriever's lock, so running
+retrievers see new documents on their next query without a restart.
+
+Which documents (and content hashes) are in the index is saved as
+ingest_state.json next to the saved index, so a restart only embeds what
+changed while the app was down.
+
+With several workers sharing a saved index, only the worker holding
+INGEST_LOCK_FILE (taken without waiting, next to the saved indexes) embeds
+and saves; the others reload the saved index whenever its state changes,
+and one of them takes over if the ingesting worker exits.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from langchain_community.vectorstores import FAISS
+
+from rag.rag_store import CHUNK_OVERLAP, CHUNK_SIZE, index_dir_lock, replace_saved_index
+from rag.vector_index import apply_search_params
+from services import metrics
+from services.file_lock import lock_file, open_lock_file
+from services.log import get_logger
+
+logger = get_logger(__name__)
+
+KNOWLEDGE_DIR = os.getenv("RAG_KNOWLEDGE_DIR", "rag/knowledge")
+INGEST_INTERVAL_SECONDS = float(os.getenv("RAG_INGEST_INTERVAL", "10"))
+SUPPORTED_EXTENSIONS = (".txt", ".md", ".pdf")
+ID_PREFIX = "kb:"
+STATE_FILE = "ingest_state.json"
+INGEST_LOCK_FILE = ".ingest.lock"
+
+
+def _read_text(path):
+    if path.endswith(".pdf"):
+        try:
+            from pypdf import PdfReader
+        except ImportError:
+            logger.warning("Skipping %s: install pypdf to ingest PDFs", path)
+            return None
+        return "\n\n".join(page.extract_text() or "" for page in PdfReader(path).pages)
+    with open(path, encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+class KnowledgeIngestor:
+    """
+    Keeps a FAISS vector store in sync with a directory of documents
+
+    Args:
+        vectorstore: The live FAISS store (mutated in place)
+        directory: Knowledge directory to watch
+        embeddings: Embeddings used for new chunks
+        lock: Lock the retrievers hold while searching
+        on_change: Called after every index mutation (bumps the index version)
+        state_dir: Where ingest_state.json and the saved index go (None: don't persist)
+        lexical: BM25Index kept in step with the vector store (optional)
+    """
+
+    def __init__(self, vectorstore, directory=KNOWLEDGE_DIR, embeddings=None, lock=None,
+                 on_change=None, state_dir=None, lexical=None):
+        self.vectorstore = vectorstore
+        self.lexical = lexical
+        self.directory = directory
+        self.embeddings = embeddings or vectorstore.embeddings
+        self.lock = lock or threading.RLock()
+        self.on_change = on_change or (lambda: None)
+        self.state_dir = state_dir
+        self.splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+        # relative path -> {"hash", "mtime", "size", "ids"}
+        self.documents = {}
+        self._stop = threading.Event()
+        self._thread = None
+        # Held for the life of the process by the one worker that ingests
+        self._ingest_lock = None
+        self._loaded_state = None
+        self._load_state()
+
+    # ---- persisted state ----
+
+    def _load_state(self):
+        if not self.state_dir:
+            return
+        self._loaded_state = self._state_stamp()
+        try:
+            with open(os.path.join(self.state_dir, STATE_FILE)) as f:
+                documents = json.load(f)
+        except (OSError, ValueError):
+            documents = {}
+
+        # Trust only documents whose chunks really are in the loaded index;
+        # drop "kb:" chunks the state doesn't know about (crash mid-save)
+        present = set(self.vectorstore.index_to_docstore_id.values())
+        self.documents = {
+            path: info for path, info in documents.items() if set(info["ids"]) <= present
+        }
+        known = {chunk_id for info in self.documents.values() for chunk_id in info["ids"]}
+        orphans = [i for i in present if i.startswith(ID_PREFIX) and i not in known]
+        if orphans:
+            with self.lock:
+                self._delete_ids(orphans)
+            self.on_change()
+
+    def save(self):
+        """
+        Save the index and ingest state (no-op without state_dir)
+
+        Both go into a fresh directory that replaces state_dir in one swap,
+        so workers loading it never see a mix of old and new files.
+        """
+        if not self.state_dir:
+            return
+        replace_saved_index(
+            self.vectorstore, self.state_dir, lock=self.lock,
+            files=lambda: {STATE_FILE: json.dumps(self.documents, indent=2, sort_keys=True)},
+        )
+
+    def _state_stamp(self):
+        try:
+            return os.stat(os.path.join(self.state_dir, STATE_FILE)).st_mtime_ns
+        except OSError:
+            return None
+
+    # ---- several workers ----
+
+    def is_ingesting_worker(self):
+        """
+        Whether this process embeds and saves (takes the ingest lock if free)
+
+        Always true without state_dir - nothing is shared then.
+        """
+        if not self.state_dir or self._ingest_lock is not None:
+            return True
+        lock = open_lock_file(os.path.join(os.path.dirname(os.path.abspath(self.state_dir)), INGEST_LOCK_FILE))
+        if not lock_file(lock, blocking=False):
+            lock.close()
+            return False
+        self._ingest_lock = lock
+        logger.info("This worker ingests the knowledge directory")
+        return True
+
+    def follow(self):
+        """
+        Load the index another worker saved, if it changed since the last look
+
+        Returns:
+            True if the live index was replaced
+        """
+        stamp = self._state_stamp()
+        if not self.state_dir or stamp is None or stamp == self._loaded_state:
+            return False
+
+        with index_dir_lock(os.path.dirname(os.path.abspath(self.state_dir))):
+            saved = FAISS.load_local(self.state_dir, self.embeddings, allow_dangerous_deserialization=True)
+            with open(os.path.join(self.state_dir, STATE_FILE)) as f:
+                documents = json.load(f)
+            stamp = self._state_stamp()
+        apply_search_params(saved.index)
+
+        with self.lock:
+            if self.lexical is not None:
+                for path, info in self.documents.items():
+                    if documents.get(path, {}).get("hash") != info["hash"]:
+                        for chunk_id in info["ids"]:
+                            self.lexical.remove(chunk_id)
+                for path, info in documents.items():
+                    if self.documents.get(path, {}).get("hash") != info["hash"]:
+                        for chunk_id in info["ids"]:
+                            self.lexical.add(chunk_id, saved.docstore.search(chunk_id).page_content)
+            self.vectorstore.index = saved.index
+            self.vectorstore.docstore = saved.docstore
+            self.vectorstore.index_to_docstore_id = saved.index_to_docstore_id
+            self.documents = documents
+        self._loaded_state = stamp
+        metrics.incr("rag.ingest.followed")
+        self.on_change()
+        return True
+
+    # ---- scanning ----
+
+    def _scan_directory(self):
+        found = {}
+        if not os.path.isdir(self.directory):
+            return found
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                    path = os.path.join(root, name)
+                    found[os.path.relpath(path, self.directory)] = path
+        return found
+
+    def _chunk(self, rel_path, text):
+        docs = self.splitter.split_documents([Document(page_content=text, metadata={"source": rel_path})])
+        ids = [f"{ID_PREFIX}{rel_path}#{i}" for i in range(len(docs))]
+        return docs, ids
+
+    def sync(self):
+        """
+        Apply every added, changed and deleted document to the index
+
+        Returns:
+            Report dict with counts, chunks embedded and timings
+        """
+        start = time.monotonic()
+        report = {"added": 0, "updated": 0, "deleted": 0, "unchanged": 0, "chunks_embedded": 0, "chunks_removed": 0}
+        found = self._scan_directory()
+
+        for rel_path in sorted(set(self.documents) - set(found)):
+            self._remove(rel_path, report)
+            report["deleted"] += 1
+
+        for rel_path, path in sorted(found.items()):
+            stat = os.stat(path)
+            known = self.documents.get(rel_path)
+            if known and known["mtime"] == stat.st_mtime and known["size"] == stat.st_size:
+                report["unchanged"] += 1
+                continue
+
+            with open(path, "rb") as f:
+                digest = hashlib.sha256(f.read()).hexdigest()
+            if known and known["hash"] == digest:
+                known.update(mtime=stat.st_mtime, size=stat.st_size)
+                report["unchanged"] += 1
+                continue
+
+            text = _read_text(path)
+            if text is None:
+                continue
+            self._upsert(rel_path, text, digest, stat, report)
+            report["updated" if known else "added"] += 1
+
+        elapsed = time.monotonic() - start
+        report["seconds"] = round(elapsed, 3)
+        changed = report["added"] + report["updated"] + report["deleted"]
+        if changed:
+            metrics.observe("rag.ingest.sync", elapsed * 1000)
+            metrics.incr("rag.ingest.documents", changed)
+            metrics.incr("rag.ingest.chunks_embedded", report["chunks_embedded"])
+            logger.info("Synced knowledge base: %s", report)
+            try:
+                self.save()
+            except Exception as e:
+                logger.error("Could not save index: %s", e)
+        return report
+
+    def _upsert(self, rel_path, text, digest, stat, report):
+        docs, ids = self._chunk(rel_path, text)
+
+        # Embedding is the slow part - do it before taking the index lock
+        embed_start = time.monotonic()
+        vectors = self.embeddings.embed_documents([d.page_content for d in docs]) if docs else []
+        metrics.observe("rag.ingest.embed", (time.monotonic() - embed_start) * 1000)
+
+        update_start = time.monotonic()
+        with self.lock:
+            old_ids = self.documents.get(rel_path, {}).get("ids", [])
+            if old_ids:
+                self._delete_ids(old_ids)
+            if docs:
+                self.vectorstore.add_embeddings(
+                    list(zip([d.page_content for d in docs], vectors)),
+                    metadatas=[d.metadata for d in docs],
+                    ids=ids,
+                )
+                if self.lexical is not None:
+                    for chunk_id, doc in zip(ids, docs):
+                        self.lexical.add(chunk_id, doc.page_content)
+            self.documents[rel_path] = {"hash": digest, "mtime": stat.st_mtime, "size": stat.st_size, "ids": ids}
+        self.on_change()
+        # How long retrievers were blocked / until the change was visible
+        metrics.observe("rag.ingest.index_update", (time.monotonic() - update_start) * 1000)
+
+        report["chunks_embedded"] += len(ids)
+        report["chunks_removed"] += len(old_ids)
+
+    def _remove(self, rel_path, report):
+        with self.lock:
+            ids = self.documents.pop(rel_path)["ids"]
+            if ids:
+                self._delete_ids(ids)
+        self.on_change()
+        report["chunks_removed"] += len(ids)
+
+    def _delete_ids(self, ids):
+        # Caller holds self.lock
+        self.vectorstore.delete(ids)
+        if self.lexical is not None:
+            for chunk_id in ids:
+                self.lexical.remove(chunk_id)
+
+    # ---- watcher ----
+
+    def start(self, interval=INGEST_INTERVAL_SECONDS):
+        """Sync now, then keep polling the directory in a daemon thread"""
+        if self._thread and self._thread.is_alive():
+            return
+
+        def loop():
+            while True:
+                try:
+                    if self.is_ingesting_worker():
+                        self.sync()
+                    else:
+                        self.follow()
+                except Exception as e:
+                    logger.exception("Sync failed: %s", e)
+                if self._stop.wait(interval):
+                    return
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=loop, name="rag-ingest", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._ingest_lock is not None:
+            self._ingest_lock.close()
+            self._ingest_lock = None
+
+    def get_stats(self):
+        stats = metrics.snapshot("rag.ingest.")
+        stats["documents"] = len(self.documents)
+        stats["chunks"] = sum(len(info["ids"]) for info in self.documents.values())
+        stats["directory"] = self.directory
+        return stats
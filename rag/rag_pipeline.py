@@ -1,16 +1,24 @@
+import os
+import threading
+import time
+from typing import Any, List
+
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI#langchain ka gemini wrapper
+from langchain_core.documents import Document
 from langchain_core.prompts import ChatPromptTemplate, PromptTemplate
+from langchain_core.retrievers import BaseRetriever
 from langchain_core.runnables import RunnablePassthrough, RunnableLambda
-from rag.rag_store import load_rag
+from rag.bm25_index import reciprocal_rank_fusion
+from rag.rag_store import build_lexical_index, get_index_info, load_rag
+from rag.retrieval_cache import retrieval_cache
+from services.cache import response_cache
+from services import llm_gateway#shared gemini client, timeouts aur metrics yahan se
+from services import metrics
+from services.log import get_logger
 
 load_dotenv()
 
-# LLM
-llm = ChatGoogleGenerativeAI(
-    model="gemini-flash-latest",
-    temperature=0#no creativity only factual answers
-)
+logger = get_logger(__name__)
 
 # Prompt
 prompt_template = PromptTemplate.from_template("""
@@ -26,19 +34,134 @@ Question: {input}
 # Lazy load vector DB - will be loaded only when first used
 _vectorstore = None
 _retriever = None
+# The warm-up thread and the first request may both get here
+_load_lock = threading.Lock()
+
+# The ingestor changes the index in place; searches and updates take turns
+index_lock = threading.RLock()
+_index_version = 0
+_ingestor = None
+_lexical = None
+
+# Try the BM25 index before the embedding model (see rag/bm25_index.py)
+LEXICAL_FIRST = os.getenv("RAG_LEXICAL_FIRST", "1") == "1"
+
+
+def get_index_version():
+    """Bumped on every index change (cached retrieval results key on it)"""
+    return _index_version
+
+
+def bump_index_version():
+    global _index_version
+    with index_lock:
+        _index_version += 1
+    # Results and answers from the old index can never be hit again
+    retrieval_cache.invalidate_results()
+    response_cache.clear_chain("rag")
+
+
+class LockedRetriever(BaseRetriever):
+    """
+    Similarity search that never sees a half-applied ingest update
+
+    With a cache, repeated questions skip the embedding model and, until
+    the index changes, the FAISS search too. With a lexical index, short
+    keyword questions it answers confidently skip the embedding model
+    altogether; otherwise both result lists are merged with reciprocal
+    rank fusion.
+    """
+
+    vectorstore: Any
+    k: int = 4
+    cache: Any = None
+    lexical: Any = None
+
+    def _search(self, embedding):
+        with index_lock:
+            return self.vectorstore.similarity_search_by_vector(embedding, k=self.k)
+
+    def _dense(self, query):
+        # Embed outside the lock so a slow model doesn't stall the ingestor
+        embed = self.vectorstore.embeddings.embed_query
+        if self.cache is None:
+            return self._search(embed(query))
+        embedding = self.cache.embed_query(query, embed)
+        return self.cache.search(embedding, self.k, get_index_version(), self._search)
+
+    def _lexical_search(self, query):
+        with index_lock:
+            hits = self.lexical.search(query, self.k)
+            confident = self.lexical.confident(query, hits)
+            docs = [self.vectorstore.docstore.search(doc_id) for doc_id, _ in hits]
+        return [Document(page_content=d.page_content, metadata=dict(d.metadata)) for d in docs], confident
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        start = time.monotonic()
+        if self.lexical is None:
+            return self._record("dense", start, self._dense(query))
+
+        lexical_docs, confident = self._lexical_search(query)
+        if confident:
+            return self._record("lexical", start, lexical_docs)
+
+        dense_docs = self._dense(query)
+        if not lexical_docs:
+            return self._record("dense", start, dense_docs)
+        by_text = {d.page_content: d for d in dense_docs + lexical_docs}
+        fused = reciprocal_rank_fusion([
+            [d.page_content for d in dense_docs],
+            [d.page_content for d in lexical_docs],
+        ])
+        return self._record("hybrid", start, [by_text[text] for text in fused[:self.k]])
+
+    @staticmethod
+    def _record(path, start, docs):
+        metrics.observe(f"rag.retrieve.{path}", (time.monotonic() - start) * 1000)
+        return docs
+
+
+def _start_ingestor(vectorstore, lexical):
+    global _ingestor
+    from rag.rag_ingest import KNOWLEDGE_DIR, KnowledgeIngestor
+
+    if not os.path.isdir(KNOWLEDGE_DIR):
+        return
+    try:
+        _ingestor = KnowledgeIngestor(
+            vectorstore,
+            lock=index_lock,
+            on_change=bump_index_version,
+            state_dir=get_index_info().get("path"),
+            lexical=lexical,
+        )
+        _ingestor.start()
+    except Exception as e:
+        logger.warning("Knowledge ingestion disabled: %s", e)
+
+
+def get_ingest_stats():
+    return _ingestor.get_stats() if _ingestor else {"enabled": False}
+
 
 def get_vectorstore():
-    global _vectorstore
+    global _vectorstore, _lexical
     if _vectorstore is None:
-        print("[RAG] Loading vector store (first use)...")
-        _vectorstore = load_rag()
+        with _load_lock:
+            if _vectorstore is None:
+                logger.info("Loading vector store (first use)")
+                vectorstore = load_rag()
+                _lexical = build_lexical_index(vectorstore) if LEXICAL_FIRST else None
+                # Documents dropped into RAG_KNOWLEDGE_DIR are added while the app runs
+                _start_ingestor(vectorstore, _lexical)
+                _vectorstore = vectorstore
     return _vectorstore
 
 def get_retriever():
     global _retriever
     if _retriever is None:
         vectorstore = get_vectorstore()
-        _retriever = vectorstore.as_retriever()
+        _retriever = LockedRetriever(vectorstore=vectorstore, cache=retrieval_cache, lexical=_lexical)
     return _retriever
 
 # Create a simple RAG chain using LCEL (LangChain Expression Language)
@@ -56,14 +179,14 @@ def get_rag_chain():
         _rag_chain = (
             {"context": retriever | RunnableLambda(format_docs), "input": RunnablePassthrough()}
             | prompt_template
-            | llm
+            | llm_gateway.get_chat_model(temperature=0)#no creativity only factual answers
         )
     return _rag_chain
 
 # Export function for use in handlers
 def rag_chain_invoke(input_dict):
     chain = get_rag_chain()
-    result = chain.invoke(input_dict.get("input", input_dict))
+    result = llm_gateway.invoke("rag", chain, input_dict.get("input", input_dict))
     return {"answer": result.content if hasattr(result, "content") else str(result)}
 
 # Only run this when rag_pipeline.py is executed directly
@@ -1,16 +1,243 @@
-from langchain_community.document_loaders import TextLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+"""
+Builds the FAISS index over the knowledge files, or loads the saved one
+
+The index and docstore are saved under RAG_INDEX_DIR/<manifest hash>/ next
+to a manifest of the source file hashes, chunking parameters and embedding
+model. A start whose manifest matches loads that directory instead of
+re-chunking and re-embedding; any change to the inputs gives a new hash and
+therefore a rebuild.
+
+The knowledge ingestor rewrites a saved index while the app runs; it swaps
+in a complete new directory under an exclusive lock that loading takes
+shared, so a starting worker never reads an index and docstore that don't
+belong together.
+"""
+import hashlib
+import json
+import os
+import shutil
+import time
+from contextlib import contextmanager, nullcontext
+
 from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings.fastembed import FastEmbedEmbeddings
+from langchain_core.embeddings import Embeddings
+
+from rag.vector_index import apply_search_params, build_faiss_index, index_bytes
+from services import metrics
+from services.file_lock import locked
+from services.log import get_logger
+
+logger = get_logger(__name__)
+
+SOURCE_FILES = ["rag/rag.txt"]
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 50
+EMBEDDING_MODEL = os.getenv("RAG_EMBEDDING_MODEL", "BAAI/bge-small-en-v1.5")
+INDEX_DIR = os.getenv("RAG_INDEX_DIR", "rag/index")
+# flat, sqfp16, sq8, ivf, ivfpq or hnsw (see rag/vector_index.py)
+INDEX_TYPE = os.getenv("RAG_INDEX_TYPE", "flat")
+MANIFEST_VERSION = 1
+LOCK_FILE = ".index.lock"
+
+_embeddings = None
+_index_info = {}
+
+
+def get_embeddings():
+    """Shared FastEmbed model, loaded on first use"""
+    global _embeddings
+    if _embeddings is None:
+        from langchain_community.embeddings.fastembed import FastEmbedEmbeddings
+
+        _embeddings = FastEmbedEmbeddings(model_name=EMBEDDING_MODEL)
+    return _embeddings
+
+
+class _LazyEmbeddings(Embeddings):
+    """Defers loading the embedding model until the first query"""
 
-def load_rag():
-    loader = TextLoader("rag/rag.txt")
-    docs = loader.load()
+    def embed_documents(self, texts):
+        return get_embeddings().embed_documents(texts)
 
-    splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
-    splits = splitter.split_documents(docs)
+    def embed_query(self, text):
+        return get_embeddings().embed_query(text)
 
-    embeddings = FastEmbedEmbeddings()
 
-    vectordb = FAISS.from_documents(splits, embeddings)
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def build_manifest(sources=None, embedding_model=EMBEDDING_MODEL, index_type=INDEX_TYPE):
+    """Everything the saved index depends on"""
+    return {
+        "version": MANIFEST_VERSION,
+        "sources": {path: _file_hash(path) for path in (sources or SOURCE_FILES)},
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+        "embedding_model": embedding_model,
+        "index_type": index_type,
+    }
+
+
+def manifest_key(manifest):
+    return hashlib.sha256(json.dumps(manifest, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def build_index(sources, embeddings, index_type=INDEX_TYPE):
+    # Lazily chunked and embedded in parallel batches (see rag/embed_pipeline.py)
+    from rag.embed_pipeline import embed_chunks, iter_chunks
+
+    vectordb = embed_chunks(iter_chunks(sources, CHUNK_SIZE, CHUNK_OVERLAP), embeddings)
+    if vectordb is None:
+        raise ValueError(f"No text to index in {sources}")
+
+    if index_type != "flat":
+        # Same vectors in the same order, so index_to_docstore_id still lines up
+        flat = vectordb.index
+        vectordb.index, spec = build_faiss_index(flat.reconstruct_n(0, flat.ntotal), index_type)
+        logger.info("Using %s index (%.0f KB)", spec, index_bytes(vectordb.index) / 1024)
     return vectordb
+
+
+def _save(vectordb, manifest, index_dir, target):
+    """Write to a temp dir and rename, so other workers never see half an index"""
+    tmp = f"{target}.tmp-{os.getpid()}"
+    vectordb.save_local(tmp)
+    with open(os.path.join(tmp, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    try:
+        os.rename(tmp, target)
+    except OSError:
+        # Another worker saved the same index first
+        shutil.rmtree(tmp, ignore_errors=True)
+        return
+
+    # Indexes for older inputs are no longer reachable
+    for name in os.listdir(index_dir):
+        path = os.path.join(index_dir, name)
+        if path != target and os.path.isdir(path) and ".tmp-" not in name:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+@contextmanager
+def index_dir_lock(index_dir, exclusive=False):
+    """Shared while loading a saved index, exclusive while swapping one in"""
+    with locked(os.path.join(index_dir, LOCK_FILE), exclusive):
+        yield
+
+
+def replace_saved_index(vectordb, target, files=None, lock=None):
+    """
+    Overwrite a saved index as one unit
+
+    Everything is written to a temp dir first (the manifest is carried
+    over), then the directories are swapped under index_dir_lock.
+
+    Args:
+        vectordb: FAISS store to save
+        target: Saved index directory to replace
+        files: Function returning extra {file name: text} to save with the
+            index; called under `lock`, so they match the saved store (optional)
+        lock: Held while the store is serialized (optional)
+    """
+    tmp = f"{target}.tmp-{os.getpid()}"
+    old = f"{target}.old-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    with lock or nullcontext():
+        vectordb.save_local(tmp)
+        extra = files() if files else {}
+    manifest = os.path.join(target, "manifest.json")
+    if os.path.exists(manifest):
+        shutil.copy2(manifest, tmp)
+    for name, text in extra.items():
+        with open(os.path.join(tmp, name), "w") as f:
+            f.write(text)
+
+    with index_dir_lock(os.path.dirname(target), exclusive=True):
+        if os.path.exists(target):
+            os.rename(target, old)
+        os.rename(tmp, target)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+def load_rag(sources=None, index_dir=INDEX_DIR, embeddings=None, embedding_model=EMBEDDING_MODEL,
+             index_type=INDEX_TYPE):
+    """
+    Return the FAISS vector store for the knowledge files
+
+    Args:
+        sources: Knowledge file paths (default SOURCE_FILES)
+        index_dir: Where saved indexes live (None disables saving/loading)
+        embeddings: Embeddings to use (default: the shared FastEmbed model)
+        embedding_model: Name recorded in the manifest for those embeddings
+        index_type: FAISS index type (see rag/vector_index.py)
+    """
+    sources = sources or SOURCE_FILES
+    start = time.monotonic()
+
+    manifest = build_manifest(sources, embedding_model, index_type)
+    target = os.path.join(index_dir, manifest_key(manifest)) if index_dir else None
+
+    if target and os.path.exists(os.path.join(target, "index.faiss")):
+        try:
+            # The ingestor may be swapping in a new copy right now
+            with index_dir_lock(index_dir):
+                vectordb = FAISS.load_local(
+                    target,
+                    embeddings or _LazyEmbeddings(),
+                    # Only ever files this app wrote itself
+                    allow_dangerous_deserialization=True,
+                )
+            # nprobe / efSearch aren't saved with the index
+            apply_search_params(vectordb.index)
+            elapsed_ms = (time.monotonic() - start) * 1000
+            _record("disk", elapsed_ms, vectordb, target)
+            logger.info("Loaded saved index %s in %.1f ms", os.path.basename(target), elapsed_ms)
+            return vectordb
+        except Exception as e:
+            logger.warning("Saved index unreadable, rebuilding: %s", e)
+
+    vectordb = build_index(sources, embeddings or get_embeddings(), index_type)
+    if target:
+        try:
+            os.makedirs(index_dir, exist_ok=True)
+            _save(vectordb, manifest, index_dir, target)
+        except Exception as e:
+            logger.error("Could not save index: %s", e)
+
+    elapsed_ms = (time.monotonic() - start) * 1000
+    _record("built", elapsed_ms, vectordb, target)
+    logger.info("Built index over %d file(s) in %.1f ms", len(sources), elapsed_ms)
+    return vectordb
+
+
+def build_lexical_index(vectordb):
+    """BM25 index over the same chunks and ids as the FAISS index (rebuilt at every start)"""
+    from rag.bm25_index import BM25Index
+
+    start = time.monotonic()
+    lexical = BM25Index()
+    for doc_id in vectordb.index_to_docstore_id.values():
+        lexical.add(doc_id, vectordb.docstore.search(doc_id).page_content)
+    metrics.observe("rag.index.lexical_build", (time.monotonic() - start) * 1000)
+    return lexical
+
+
+def _record(source, elapsed_ms, vectordb, target):
+    metrics.observe(f"rag.index.{'load' if source == 'disk' else 'build'}", elapsed_ms)
+    _index_info.update({
+        "source": source,
+        "ms": round(elapsed_ms, 1),
+        "vectors": vectordb.index.ntotal,
+        "path": target,
+        "index": type(vectordb.index).__name__,
+    })
+
+
+def get_index_info():
+    """How the current process got its index ({"source": "disk"|"built", "ms", "vectors", "path", "index"})"""
+    return dict(_index_info)
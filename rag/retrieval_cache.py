@@ -0,0 +1,70 @@
+"""
+Caches in front of the RAG retriever
+
+Query embeddings are keyed by the normalized question, so a repeated FAQ
+never reaches the embedding model. Top-k results are keyed by the query
+embedding, k and the index version; any index change bumps the version, so
+results from an older index are never served (and are dropped straight away).
+"""
+import hashlib
+import os
+
+import numpy as np
+from langchain_core.documents import Document
+
+from services.cache import LRUCache, normalize_message
+
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RAG_RETRIEVAL_CACHE_SIZE", "512"))
+
+
+def _hit_rate(stats):
+    lookups = stats["hits"] + stats["misses"]
+    return round(stats["hits"] / lookups, 3) if lookups else 0.0
+
+
+class RetrievalCache:
+    """
+    Args:
+        max_entries: Entries per cache (embeddings and results are bounded separately)
+    """
+
+    def __init__(self, max_entries=RETRIEVAL_CACHE_SIZE):
+        self.embeddings = LRUCache(max_entries=max_entries)
+        self.results = LRUCache(max_entries=max_entries)
+
+    def embed_query(self, query, embed):
+        """Cached embed(query); the vector is stored as a tuple so callers can't mutate it"""
+        key = normalize_message(query)
+        vector = self.embeddings.get(key)
+        if vector is None:
+            vector = tuple(embed(query))
+            self.embeddings.set(key, vector)
+        return list(vector)
+
+    def search(self, embedding, k, version, search):
+        """Cached search(embedding) for this index version"""
+        digest = hashlib.sha1(np.asarray(embedding, dtype=np.float32).tobytes()).hexdigest()
+        key = (digest, k, version)
+        cached = self.results.get(key)
+        if cached is None:
+            docs = search(embedding)
+            cached = tuple((d.page_content, dict(d.metadata)) for d in docs)
+            self.results.set(key, cached)
+        # Fresh Document objects - chains are free to modify what they get
+        return [Document(page_content=text, metadata=dict(metadata)) for text, metadata in cached]
+
+    def invalidate_results(self):
+        self.results.clear()
+
+    def clear(self):
+        self.embeddings.clear()
+        self.results.clear()
+
+    def get_stats(self):
+        return {
+            "embeddings": dict(self.embeddings.stats, size=len(self.embeddings), hit_rate=_hit_rate(self.embeddings.stats)),
+            "results": dict(self.results.stats, size=len(self.results), hit_rate=_hit_rate(self.results.stats)),
+        }
+
+
+retrieval_cache = RetrievalCache()
@@ -1,33 +1,219 @@
-from intent_detector import detect_intent
-from handlers.calendar_create import handle_create_event
-from handlers.calendar_delete import handle_delete_event
-from handlers.rag_query import handle_rag_query
-from handlers.conflict_resolution import handle_conflict_resolution
+import asyncio
+import os
+
+from intent_detector import (
+    classify_intent_local,
+    detect_intent,
+    detect_intent_with_payload,
+    detect_intent_with_payload_async,
+)
+from handlers.calendar_create import handle_create_event, handle_create_event_async
+from handlers.calendar_delete import handle_delete_event, handle_delete_event_async
+from handlers.rag_query import handle_rag_query, stream_query
+from handlers.conflict_resolution import handle_conflict_resolution, resolve_conflict
+from services.calendar_service import get_service_for_session, get_service_for_user, update_session_credentials
+from services.credential_store import session_user_id
+from services.event_store import event_store
+from services.executor import run_io, submit
+from services.log import get_logger
+
+logger = get_logger(__name__)
+
+# "unified" = one LLM call for intent + payload, "two_step" = detect_intent
+# followed by the create/delete parser
+EXTRACTION_MODE = os.getenv("EXTRACTION_MODE", "unified")
+
+
+def extract_intent(user_message, mode=None):
+    """
+    Return (intent, payload) for a message using the given extraction mode
+
+    Falls back to the two-step mode if the unified call fails. payload is
+    None whenever the handler should parse the message itself.
+    """
+    mode = mode or EXTRACTION_MODE
+    if mode == "unified":
+        try:
+            result = detect_intent_with_payload(user_message)
+            return result["intent"], result.get("payload")
+        except Exception as e:
+            logger.warning("Unified extraction failed, using two-step: %s", e)
+
+    intent_data = detect_intent(user_message)
+    return intent_data["intent"], None
+
+
+async def extract_intent_async(user_message, mode=None):
+    """Async variant of extract_intent"""
+    mode = mode or EXTRACTION_MODE
+    if mode == "unified":
+        try:
+            result = await detect_intent_with_payload_async(user_message)
+            return result["intent"], result.get("payload")
+        except Exception as e:
+            logger.warning("Unified extraction failed, using two-step: %s", e)
+
+    intent_data = await run_io(detect_intent, user_message)
+    return intent_data["intent"], None
+
+
+def _wants_events(user_message):
+    """
+    Whether to sync the event mirror before the intent is known
+
+    Only for messages the local classifier leans towards create/delete on,
+    however unsure it is; a RAG question shouldn't cost a Calendar sync.
+    """
+    intent, _ = classify_intent_local(user_message)
+    return intent in ("create_event", "delete_event")
+
+
+def _prefetch_events(session):
+    """
+    Start syncing the user's event mirror while the intent is extracted
+
+    The sync is skipped when the mirror is fresh, so this costs at most one
+    Calendar call per sync interval.
+    """
+    if "credentials" not in session:
+        return
+    try:
+        service = get_service_for_session(session)
+        user_id = session_user_id(session)
+        submit("route", "prefetch_events", lambda: event_store.prefetch(user_id, service))
+    except Exception as e:
+        logger.warning("Event prefetch skipped: %s", e)
+
 
 def route_message(user_message, session):
     # Check if there's a pending conflict resolution
     if "pending_event" in session and "conflicts" in session:
-        # User is responding to a conflict
-        result = handle_conflict_resolution(
-            user_message=user_message,
-            pending_event=session["pending_event"],
-            conflicts=session["conflicts"],
-            session=session
-        )
-        
-        # Clear pending data unless still waiting for response
+        return _resolve_pending_conflict(user_message, session)
+    
+    # Normal intent detection
+    if _wants_events(user_message):
+        _prefetch_events(session)
+    intent, payload = extract_intent(user_message)
+    return _dispatch(intent, payload, user_message, session)
+
+
+def _open_calendar(user_id, credentials_dict, prefetch=True):
+    """
+    Calendar service for plain session values, safe on the I/O pool
+
+    Returns:
+        (service, credentials dict); service is None if the user isn't
+        logged in or the service can't be built
+    """
+    if credentials_dict is None:
+        return None, None
+    try:
+        service, credentials_dict = get_service_for_user(user_id, credentials_dict)
+    except Exception as e:
+        logger.warning("Calendar service unavailable: %s", e)
+        return None, credentials_dict
+    if prefetch:
+        submit("route", "prefetch_events", lambda: event_store.prefetch(user_id, service))
+    return service, credentials_dict
+
+
+async def route_message_async(user_message, session, stream=False):
+    """
+    Async variant of route_message for the async /chat and /chat/stream views
+
+    Intent extraction and the calendar set-up (service, plus an event prefetch
+    when the message looks like a create/delete) are awaited together, and the
+    handlers' independent Gemini/Calendar calls overlap on one event loop. The
+    session is only read and written here; the stages on the I/O pool get
+    plain values.
+
+    Args:
+        stream: Return RAG answers as a generator of token frames (see
+            stream_query) instead of a result dict
+    """
+    user_id = credentials = None
+    if "credentials" in session:
+        user_id = session_user_id(session)
+        credentials = dict(session["credentials"])
+
+    if "pending_event" in session and "conflicts" in session:
+        pending_event, conflicts = session["pending_event"], session["conflicts"]
+        service, credentials = await run_io(_open_calendar, user_id, credentials, prefetch=False)
+        update_session_credentials(session, credentials)
+        if service is None:
+            return {"error": "Not authenticated. Please login with Google Calendar."}
+
+        result = await run_io(resolve_conflict, user_message, pending_event, conflicts, service, user_id)
         if not result.get("conflict_pending"):
             session.pop("pending_event", None)
             session.pop("conflicts", None)
-        
         return result
+
+    (service, credentials), (intent, payload) = await asyncio.gather(
+        run_io(_open_calendar, user_id, credentials, prefetch=_wants_events(user_message)),
+        extract_intent_async(user_message),
+    )
+    update_session_credentials(session, credentials)
+
+    if intent == "create_event":
+        result = await handle_create_event_async(user_message, service, user_id, event_data=payload)
+        if result.get("conflict_detected"):
+            session["pending_event"] = result.get("pending_event")
+            session["conflicts"] = result.get("conflicts")
+        return result
+
+    elif intent == "delete_event":
+        return await handle_delete_event_async(user_message, service, user_id, delete_info=payload)
+
+    elif intent == "query":
+        if stream:
+            return stream_query(user_message)
+        return await run_io(handle_rag_query, user_message)
+
+    else:
+        return {"error": "Intent not supported yet"}
+
+
+async def route_message_stream(user_message, session):
+    """
+    Streaming variant of route_message_async for /chat/stream
+
+    RAG answers come back as a generator of token frames. Everything else is
+    routed right away (so session changes happen before the response starts)
+    and returned as a single final frame.
+    """
+    result = await route_message_async(user_message, session, stream=True)
+    if isinstance(result, dict):
+        return iter([_final_frame(result)])
+    return result
+
+
+def _final_frame(result):
+    frame = {"type": "final"}
+    frame.update(result)
+    return frame
+
+
+def _resolve_pending_conflict(user_message, session):
+    # User is responding to a conflict
+    result = handle_conflict_resolution(
+        user_message=user_message,
+        pending_event=session["pending_event"],
+        conflicts=session["conflicts"],
+        session=session
+    )
     
-    # Normal intent detection
-    intent_data = detect_intent(user_message)
-    intent = intent_data["intent"]
+    # Clear pending data unless still waiting for response
+    if not result.get("conflict_pending"):
+        session.pop("pending_event", None)
+        session.pop("conflicts", None)
+    
+    return result
+
 
+def _dispatch(intent, payload, user_message, session):
     if intent == "create_event":
-        result = handle_create_event(user_message, session)
+        result = handle_create_event(user_message, session, event_data=payload)
         
         # If conflict detected, store in session
         if result.get("conflict_detected"):
@@ -37,7 +223,7 @@ def route_message(user_message, session):
         return result
 
     elif intent == "delete_event":
-        return handle_delete_event(user_message, session)
+        return handle_delete_event(user_message, session, delete_info=payload)
 
     elif intent == "query":
         return handle_rag_query(user_message)
@@ -0,0 +1,280 @@
+"""
+Shared LLM response cache
+
+Responses are keyed by chain name plus a normalized message. Chains whose
+answers contain absolute dates (resolved from "today"/"tomorrow") also key on
+the date context the prompts inject and expire at local midnight. Callers
+whose answers depend on changing data (the RAG index) pass a version, so
+answers from older data are never served.
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from services.sqlite_db import connect
+
+# Per-chain time-to-live in seconds
+CHAIN_TTLS = {
+    "intent": 24 * 3600,
+    "unified": 24 * 3600,
+    "delete_parse": 24 * 3600,
+    "event_parse": 24 * 3600,
+    "rag": 6 * 3600,
+}
+DEFAULT_TTL = 3600
+
+# Chains whose output depends on today's date
+DATE_SENSITIVE_CHAINS = {"unified", "event_parse"}
+
+
+def _empty_stats():
+    return {"hits": 0, "misses": 0, "sets": 0, "evictions": 0, "expirations": 0}
+
+
+class LRUCache:
+    """
+    In-process cache with LRU eviction and optional per-entry expiry
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = _empty_stats()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._data[key]
+                self.stats["expirations"] += 1
+                self.stats["misses"] += 1
+                return None
+            self._data.move_to_end(key)
+            self.stats["hits"] += 1
+            return value
+
+    def set(self, key, value, expires_at=None):
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            self.stats["sets"] += 1
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            for key in [k for k in self._data if k.startswith(prefix)]:
+                del self._data[key]
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteCache:
+    """
+    On-disk cache backend that survives restarts and is shared by workers
+
+    Values must be strings. Eviction is least-recently-used by
+    last access time, checked every few writes to keep set() cheap.
+    """
+
+    def __init__(self, path, max_entries=10000):
+        self.max_entries = max_entries
+        self._conn = connect(path)
+        self._lock = threading.Lock()
+        self._writes_since_check = 0
+        self.stats = _empty_stats()
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " expires_at REAL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS llm_cache_access ON llm_cache(last_access)"
+        )
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            value, expires_at = row
+            if expires_at is not None and expires_at <= now:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self.stats["expirations"] += 1
+                self.stats["misses"] += 1
+                return None
+            self._conn.execute(
+                "UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key)
+            )
+            self.stats["hits"] += 1
+        return value
+
+    def set(self, key, value, expires_at=None):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, last_access)"
+                " VALUES (?, ?, ?, ?)",
+                (key, value, expires_at, time.time()),
+            )
+            self.stats["sets"] += 1
+            self._writes_since_check += 1
+            if self._writes_since_check >= max(1, self.max_entries // 20):
+                self._writes_since_check = 0
+                self._evict()
+
+    def _evict(self):
+        self._conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN"
+                " (SELECT key FROM llm_cache ORDER BY last_access LIMIT ?)",
+                (excess,),
+            )
+            self.stats["evictions"] += excess
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+
+    def delete_prefix(self, prefix):
+        # Key range instead of LIKE, so "_" and "%" need no escaping
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache WHERE key >= ? AND key < ?", (prefix, upper))
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+
+def normalize_message(message):
+    """Lowercase, collapse whitespace and drop trailing punctuation"""
+    return " ".join(str(message).lower().split()).rstrip("?!. ")
+
+
+def _next_local_midnight(now):
+    tomorrow = (now + timedelta(days=1)).date()
+    return datetime.combine(tomorrow, datetime.min.time()).timestamp()
+
+
+class ResponseCache:
+    """
+    Front-end used by the LLM call sites
+
+    Responses are stored as JSON so both backends behave the same and
+    callers always get their own copy to mutate.
+
+    Args:
+        backend: LRUCache or SQLiteCache
+        ttls: Per-chain TTLs in seconds (defaults to CHAIN_TTLS)
+    """
+
+    def __init__(self, backend, ttls=None):
+        self.backend = backend
+        self.ttls = dict(CHAIN_TTLS, **(ttls or {}))
+        self.enabled = True
+
+    def _key(self, chain, message, now, version=None):
+        key = f"{chain}|{normalize_message(message)}"
+        if chain in DATE_SENSITIVE_CHAINS:
+            key = f"{chain}|{now.date().isoformat()}|{normalize_message(message)}"
+        if version is not None:
+            key = f"{key}|v{version}"
+        return key
+
+    def _expires_at(self, chain, now):
+        expires_at = now.timestamp() + self.ttls.get(chain, DEFAULT_TTL)
+        if chain in DATE_SENSITIVE_CHAINS:
+            expires_at = min(expires_at, _next_local_midnight(now))
+        return expires_at
+
+    def get(self, chain, message, version=None):
+        if not self.enabled:
+            return None
+        value = self.backend.get(self._key(chain, message, datetime.now(), version))
+        return None if value is None else json.loads(value)
+
+    def set(self, chain, message, value, version=None):
+        if not self.enabled:
+            return
+        now = datetime.now()
+        self.backend.set(
+            self._key(chain, message, now, version), json.dumps(value), self._expires_at(chain, now)
+        )
+
+    def cached(self, chain, message, compute, version=None):
+        """
+        Return the cached response for (chain, message) or compute and store it
+
+        Error responses (dicts with an "error" key) and None are not cached.
+
+        Args:
+            version: Version of the data the answer depends on (optional);
+                entries stored under another version are not returned
+        """
+        value = self.get(chain, message, version)
+        if value is not None:
+            return value
+
+        value = compute()
+        if value is not None and not (isinstance(value, dict) and "error" in value):
+            self.set(chain, message, value, version)
+        return value
+
+    async def acached(self, chain, message, compute, version=None):
+        """cached() for async callers; compute returns an awaitable"""
+        value = self.get(chain, message, version)
+        if value is not None:
+            return value
+
+        value = await compute()
+        if value is not None and not (isinstance(value, dict) and "error" in value):
+            self.set(chain, message, value, version)
+        return value
+
+    def clear_chain(self, chain):
+        """Drop every cached response of one chain (all workers, for SQLite)"""
+        self.backend.delete_prefix(f"{chain}|")
+
+    def get_stats(self):
+        stats = dict(self.backend.stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["entries"] = len(self.backend)
+        stats["backend"] = type(self.backend).__name__
+        return stats
+
+
+def _build_default_cache():
+    max_entries = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2048"))
+    if os.getenv("LLM_CACHE_BACKEND", "memory") == "sqlite":
+        backend = SQLiteCache(os.getenv("LLM_CACHE_PATH", "cache/llm_cache.sqlite3"), max_entries)
+    else:
+        backend = LRUCache(max_entries)
+    cache = ResponseCache(backend)
+    cache.enabled = os.getenv("LLM_CACHE_ENABLED", "1") != "0"
+    return cache
+
+
+# Process-wide cache shared by every chain
+response_cache = _build_default_cache()
@@ -1,12 +1,123 @@
+# Services module
 from google.oauth2.credentials import Credentials
 from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
-from datetime import datetime
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from googleapiclient.http import HttpRequest
+from collections import OrderedDict
+from datetime import datetime, timezone
+from itertools import chain, islice
+import google_auth_httplib2
+import hashlib
+import httplib2
+import json
+import os
+import threading
+import time
+import weakref
+
+from services import metrics
+from services.event_matcher import EventMatcher
+from services.event_store import EVENT_FIELDS, event_store
+from services.event_time import event_bounds, to_epoch
+from services.interval_index import IntervalIndex
+from services.log import get_logger, sampled
+
+logger = get_logger(__name__)
+
+# Max number of per-user service objects kept in memory
+SERVICE_CACHE_SIZE = int(os.getenv("CALENDAR_SERVICE_CACHE_SIZE", "256"))
+
+# Calendar API limit on requests per batch
+BATCH_LIMIT = 50
+
+# events().list page size (the API maximum is 2500, default 250)
+LIST_PAGE_SIZE = int(os.getenv("CALENDAR_LIST_PAGE_SIZE", "250"))
+# Delete matching never looks at status or transparency
+MATCH_FIELDS = "id,summary,start,end"
+
+# How check_conflicts asks the API (when the local mirror can't answer):
+# "freebusy" gets busy intervals first and lists events only where busy,
+# "list" lists every event in the slot, "auto" uses freebusy only when more
+# than one calendar has to be asked (for a single calendar, one masked
+# listing is the same round trip and about the same size)
+CONFLICT_MODE = os.getenv("CALENDAR_CONFLICT_MODE", "auto")
+# Comma-separated calendar ids whose events block time
+CONFLICT_CALENDARS = [c.strip() for c in os.getenv("CALENDAR_CONFLICT_CALENDARS", "primary").split(",") if c.strip()]
+
+_discovery_doc = None
+_discovery_lock = threading.Lock()
+
+# credential identity -> (token, service), least recently used first
+_service_cache = OrderedDict()
+_service_cache_lock = threading.Lock()
+
+_thread_local = threading.local()
+
+
+def get_discovery_document():
+    """
+    Return the Calendar v3 discovery document, parsed once per process
+    """
+    global _discovery_doc
+    if _discovery_doc is None:
+        with _discovery_lock:
+            if _discovery_doc is None:
+                _discovery_doc = json.loads(get_static_doc("calendar", "v3"))
+    return _discovery_doc
+
+
+def _thread_safe_request(http, *args, **kwargs):
+    """
+    requestBuilder that gives every thread its own HTTP connection
+
+    Cached service objects are shared between requests, but httplib2
+    connections are not thread-safe, so each thread wraps the same
+    credentials in its own AuthorizedHttp.
+    """
+    per_thread = getattr(_thread_local, "http", None)
+    if per_thread is None:
+        per_thread = _thread_local.http = weakref.WeakKeyDictionary()
+
+    thread_http = per_thread.get(http)
+    if thread_http is None:
+        credentials = getattr(http, "credentials", None)
+        if credentials is None:
+            return HttpRequest(http, *args, **kwargs)
+        thread_http = google_auth_httplib2.AuthorizedHttp(credentials, http=httplib2.Http())
+        per_thread[http] = thread_http
+    return HttpRequest(thread_http, *args, **kwargs)
+
+
+def _credential_identity(credentials_dict):
+    """Stable cache key for a user's credentials (never the raw secret)"""
+    identity = "|".join([
+        credentials_dict.get("client_id") or "",
+        credentials_dict.get("refresh_token") or credentials_dict.get("token") or "",
+    ])
+    return hashlib.sha256(identity.encode()).hexdigest()
+
+
+def build_calendar_service(credentials):
+    """Build a Calendar service from the cached discovery document"""
+    return build_from_document(
+        get_discovery_document(),
+        credentials=credentials,
+        requestBuilder=_thread_safe_request,
+    )
+
+
+def clear_service_cache():
+    with _service_cache_lock:
+        _service_cache.clear()
 
 
 def get_calendar_service(credentials_dict):
     """
     Build and return Google Calendar service from credentials dict
+
+    Service objects are cached per user (keyed by credential identity) and
+    rebuilt when the access token changes.
     
     Args:
         credentials_dict: Dictionary containing OAuth credentials
@@ -14,6 +125,14 @@ def get_calendar_service(credentials_dict):
     Returns:
         Google Calendar service object
     """
+    identity = _credential_identity(credentials_dict)
+    token = credentials_dict.get("token")
+    with _service_cache_lock:
+        cached = _service_cache.get(identity)
+        if cached is not None and cached[0] == token:
+            _service_cache.move_to_end(identity)
+            return cached[1]
+
     # Convert credentials dict to Credentials object
     credentials = Credentials(
         token=credentials_dict.get("token"),
@@ -21,7 +140,8 @@ def get_calendar_service(credentials_dict):
         token_uri=credentials_dict.get("token_uri"),
         client_id=credentials_dict.get("client_id"),
         client_secret=credentials_dict.get("client_secret"),
-        scopes=credentials_dict.get("scopes")
+        scopes=credentials_dict.get("scopes"),
+        expiry=datetime.fromisoformat(credentials_dict["expiry"]) if credentials_dict.get("expiry") else None
     )
     
     # Only try to refresh if we have all required fields
@@ -29,19 +149,90 @@ def get_calendar_service(credentials_dict):
         try:
             if credentials.token_uri and credentials.client_id and credentials.client_secret:
                 credentials.refresh(Request())
-                print("[CALENDAR_SERVICE] Token refreshed successfully")
+                logger.info("Token refreshed")
             else:
-                print("[CALENDAR_SERVICE] Warning: Missing fields for token refresh, using existing token")
+                logger.warning("Missing fields for token refresh, using existing token")
         except Exception as e:
-            print(f"[CALENDAR_SERVICE] Token refresh failed: {e}")
+            logger.warning("Token refresh failed: %s", e)
             # Continue with existing token
     
-    # Build and return calendar service
-    service = build("calendar", "v3", credentials=credentials)
+    # Build calendar service and remember it for this user
+    service = build_calendar_service(credentials)
+    with _service_cache_lock:
+        _service_cache[identity] = (token, service)
+        _service_cache.move_to_end(identity)
+        while len(_service_cache) > SERVICE_CACHE_SIZE:
+            _service_cache.popitem(last=False)
     return service
 
 
-def create_event(service, title, start, end, description=""):
+def primary_calendar_id(credentials_dict):
+    """
+    The id of the user's primary calendar - their account email, which
+    identifies the account without asking for an extra OAuth scope
+    """
+    service = get_calendar_service(credentials_dict)
+    return service.calendars().get(calendarId="primary", fields="id").execute()["id"]
+
+
+def get_service_for_user(user_id, credentials_dict):
+    """
+    Return (service, credentials dict) for a user
+
+    Takes plain values instead of the session, so it can run on the I/O
+    pool; the caller writes the returned credentials back to the session
+    on the request thread (update_session_credentials).
+    """
+    from services.credential_store import credential_store
+
+    credentials_dict = credential_store.ensure_fresh(user_id, credentials_dict)
+    return get_calendar_service(credentials_dict), credentials_dict
+
+
+def update_session_credentials(session, credentials_dict):
+    """Write refreshed credentials back to the session"""
+    if credentials_dict and credentials_dict.get("token") != session.get("credentials", {}).get("token"):
+        session["credentials"] = credentials_dict
+
+
+def get_service_for_session(session):
+    """
+    Return the Calendar service for the user in this session
+
+    Credentials go through the credential store first, so a refreshed token
+    is written back to the session instead of being refreshed again on the
+    next request.
+    """
+    from services.credential_store import session_user_id
+
+    service, credentials_dict = get_service_for_user(session_user_id(session), session["credentials"])
+    update_session_credentials(session, credentials_dict)
+    return service
+
+
+def event_body(title, start, end, description=""):
+    """Build the events().insert body for a timed event"""
+    # Convert datetime objects to ISO format strings if needed
+    if isinstance(start, datetime):
+        start = start.isoformat()
+    if isinstance(end, datetime):
+        end = end.isoformat()
+
+    return {
+        "summary": title,
+        "description": description,
+        "start": {
+            "dateTime": start,
+            "timeZone": "UTC",
+        },
+        "end": {
+            "dateTime": end,
+            "timeZone": "UTC",
+        },
+    }
+
+
+def create_event(service, title, start, end, description="", user_id=None):
     """
     Create a calendar event
     
@@ -51,36 +242,21 @@ def create_event(service, title, start, end, description=""):
         start: Start datetime (string in ISO format or datetime object)
         end: End datetime (string in ISO format or datetime object)
         description: Event description (optional)
+        user_id: Credential store user id; the new event is added to the
+            user's local event mirror (optional)
         
     Returns:
         Tuple (success: bool, result: dict)
     """
     try:
-        # Convert datetime objects to ISO format strings if needed
-        if isinstance(start, datetime):
-            start = start.isoformat()
-        if isinstance(end, datetime):
-            end = end.isoformat()
-        
-        # Create event body
-        event = {
-            "summary": title,
-            "description": description,
-            "start": {
-                "dateTime": start,
-                "timeZone": "UTC",
-            },
-            "end": {
-                "dateTime": end,
-                "timeZone": "UTC",
-            },
-        }
-        
         # Insert event into primary calendar
         event_result = service.events().insert(
             calendarId="primary",
-            body=event
+            body=event_body(title, start, end, description)
         ).execute()
+
+        if user_id:
+            event_store.record_created(user_id, event_result)
         
         return True, event_result
         
@@ -88,7 +264,109 @@ def create_event(service, title, start, end, description=""):
         return False, str(e)
 
 
-def check_conflicts(service, start, end):
+def blocks_time(event):
+    """
+    Whether an event makes its time busy
+
+    Timed and all-day events both count, except ones marked "free"
+    (transparency: transparent), which is how Calendar creates most
+    all-day events such as holidays and birthdays.
+    """
+    return event.get("transparency") != "transparent"
+
+
+def _rfc3339(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def _overlapping(events, start_ts, end_ts, calendar_id):
+    """Blocking events among `events` that overlap [start_ts, end_ts)"""
+    index = IntervalIndex.from_events(e for e in events if blocks_time(e))
+    conflicts = index.overlaps(start_ts, end_ts)
+    for event in conflicts:
+        sampled(logger, "Conflict in %s: %s at %s", calendar_id, event.get("summary"), event.get("start"))
+    if calendar_id != "primary":
+        for event in conflicts:
+            event["calendarId"] = calendar_id
+    return conflicts
+
+
+def _listed_conflicts(service, start_ts, end_ts, calendar_id):
+    """Blocking events of one calendar that overlap [start_ts, end_ts)"""
+    # timeMin/timeMax already select by overlap (event end > timeMin and
+    # start < timeMax), so the exact slot is enough - multi-day events
+    # that started earlier are included
+    events = iter_events(service, calendar_id=calendar_id, timeMin=_rfc3339(start_ts),
+                         timeMax=_rfc3339(end_ts), orderBy="startTime")
+    return _overlapping(events, start_ts, end_ts, calendar_id)
+
+
+def freebusy_conflicts(service, start_ts, end_ts, calendars):
+    """
+    Conflicts found through freebusy.query
+
+    One query returns the busy intervals of every calendar, so a free slot
+    costs a single small response. Events are then listed only for busy
+    calendars and only across their busy intervals - in one batched round
+    trip when several calendars are busy.
+
+    Args:
+        service: Google Calendar service object
+        start_ts, end_ts: Slot in epoch seconds
+        calendars: Calendar ids to check
+
+    Returns:
+        Conflicting events; ones from calendars other than primary carry a
+        "calendarId" key
+    """
+    metrics.incr("events.api_calls")
+    response = service.freebusy().query(body={
+        "timeMin": _rfc3339(start_ts),
+        "timeMax": _rfc3339(end_ts),
+        "items": [{"id": calendar_id} for calendar_id in calendars],
+    }).execute()
+
+    windows = {}
+    for calendar_id, info in response.get("calendars", {}).items():
+        if info.get("errors"):
+            logger.warning("Free/busy unavailable for %s: %s", calendar_id, info["errors"])
+            continue
+        busy = [(to_epoch(span["start"]), to_epoch(span["end"])) for span in info.get("busy", [])]
+        if busy:
+            windows[calendar_id] = (max(start_ts, min(a for a, _ in busy)), min(end_ts, max(b for _, b in busy)))
+
+    # The events behind the busy intervals carry the titles for the conflict message
+    if not windows:
+        return []
+    if len(windows) == 1:
+        calendar_id, (first, last) = next(iter(windows.items()))
+        return _listed_conflicts(service, first, last, calendar_id)
+
+    metrics.incr("events.api_calls")
+    requests = [
+        (calendar_id, service.events().list(
+            calendarId=calendar_id, timeMin=_rfc3339(first), timeMax=_rfc3339(last), singleEvents=True,
+            orderBy="startTime", maxResults=LIST_PAGE_SIZE, fields=f"nextPageToken,items({EVENT_FIELDS})",
+        ))
+        for calendar_id, (first, last) in windows.items()
+    ]
+    report = batch_mutations(service, requests)
+
+    conflicts = []
+    for calendar_id, error in report["errors"].items():
+        logger.warning("Could not list %s: %s", calendar_id, error)
+    for calendar_id, page in report["results"].items():
+        first, last = windows[calendar_id]
+        events = page.get("items", [])
+        if page.get("nextPageToken"):
+            events = chain(events, iter_events(service, calendar_id=calendar_id, timeMin=_rfc3339(first),
+                                               timeMax=_rfc3339(last), orderBy="startTime",
+                                               pageToken=page["nextPageToken"]))
+        conflicts.extend(_overlapping(events, first, last, calendar_id))
+    return conflicts
+
+
+def check_conflicts(service, start, end, user_id=None, calendars=None, mode=None):
     """
     Check if there are any conflicting events in the given time range
     
@@ -96,89 +374,60 @@ def check_conflicts(service, start, end):
         service: Google Calendar service object
         start: Start datetime (string in ISO format or datetime object)
         end: End datetime (string in ISO format or datetime object)
+        user_id: Credential store user id; when given, the primary calendar
+            is checked against the user's local event mirror (optional)
+        calendars: Calendar ids to check (default: CONFLICT_CALENDARS)
+        mode: "freebusy", "list" or "auto" for calendars the mirror doesn't
+            cover (default: CONFLICT_MODE)
         
     Returns:
-        List of conflicting events
+        List of conflicting events, sorted by start time
     """
     try:
-        # Convert datetime objects to ISO format strings if needed
-        if isinstance(start, datetime):
-            start_str = start.isoformat()
-        else:
-            start_str = start
-            
-        if isinstance(end, datetime):
-            end_str = end.isoformat()
-        else:
-            end_str = end
-        
-        # Ensure timezone is included (add Z if not present)
-        if 'Z' not in start_str and '+' not in start_str and '-' not in start_str[-6:]:
-            start_str = start_str + 'Z'
-        if 'Z' not in end_str and '+' not in end_str and '-' not in end_str[-6:]:
-            end_str = end_str + 'Z'
-        
-        print(f"[CHECK_CONFLICTS] Querying events from {start_str} to {end_str}")
-        
-        # Get events that overlap with the requested time
-        # We need to check a wider range to catch all overlapping events
-        from datetime import datetime as dt, timedelta
-        
-        # Parse the start time to get a wider search range
-        start_dt = dt.fromisoformat(start_str.replace('Z', '+00:00'))
-            
-        # Search from 24 hours before to 24 hours after
-        search_start = (start_dt - timedelta(days=1)).isoformat().replace('+00:00', 'Z')
-        search_end = (start_dt + timedelta(days=1)).isoformat().replace('+00:00', 'Z')
-        
-        print(f"[CHECK_CONFLICTS] Expanded search range: {search_start} to {search_end}")
-        
-        # Query events in the expanded time range
-        events_result = service.events().list(
-            calendarId="primary",
-            timeMin=search_start,
-            timeMax=search_end,
-            singleEvents=True,
-            orderBy="startTime"
-        ).execute()
-        
-        all_events = events_result.get("items", [])
-        print(f"[CHECK_CONFLICTS] Found {len(all_events)} total events in expanded range")
-        
-        # Filter to only events that actually overlap with our requested time
+        start_ts = to_epoch(start)
+        end_ts = to_epoch(end)
+        remote = list(calendars or CONFLICT_CALENDARS)
+        mode = mode or CONFLICT_MODE
+
         conflicting_events = []
-        for event in all_events:
-            event_start = event.get("start", {}).get("dateTime")
-            event_end = event.get("end", {}).get("dateTime")
-            
-            if not event_start or not event_end:
-                continue
-            
-            # Check if events overlap
-            # Events overlap if: event_start < our_end AND event_end > our_start
-            if event_start < end_str and event_end > start_str:
-                print(f"[CHECK_CONFLICTS] CONFLICT: {event.get('summary', 'No title')} ({event_start} to {event_end})")
-                conflicting_events.append(event)
-            else:
-                print(f"[CHECK_CONFLICTS] No overlap: {event.get('summary', 'No title')} ({event_start} to {event_end})")
-        
-        print(f"[CHECK_CONFLICTS] Returning {len(conflicting_events)} conflicting events")
+        if user_id and "primary" in remote:
+            events = event_store.events_between(user_id, service, start_ts, end_ts)
+            if events is not None:
+                conflicting_events = [e for e in events if blocks_time(e)]
+                remote.remove("primary")
+                logger.debug("%d conflicting events (local mirror)", len(conflicting_events))
+        if not remote:
+            return conflicting_events
+        if mode == "auto":
+            mode = "freebusy" if len(remote) > 1 else "list"
+
+        logger.debug("Checking %s from %s to %s (%s)", remote, _rfc3339(start_ts), _rfc3339(end_ts), mode)
+        began = time.monotonic()
+        if mode == "freebusy":
+            conflicting_events += freebusy_conflicts(service, start_ts, end_ts, remote)
+        else:
+            for calendar_id in remote:
+                conflicting_events += _listed_conflicts(service, start_ts, end_ts, calendar_id)
+        metrics.observe(f"events.conflicts.{mode}", (time.monotonic() - began) * 1000)
+
+        conflicting_events.sort(key=lambda e: event_bounds(e)[0])
+        logger.debug("%d conflicting events", len(conflicting_events))
         return conflicting_events
         
     except Exception as e:
-        print(f"[CHECK_CONFLICTS] Error checking conflicts: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error checking conflicts: %s", e)
         return []
 
 
-def delete_event(service, event_id):
+def delete_event(service, event_id, user_id=None):
     """
     Delete a calendar event
     
     Args:
         service: Google Calendar service object
         event_id: ID of the event to delete
+        user_id: Credential store user id; the event is dropped from the
+            user's local event mirror (optional)
         
     Returns:
         Tuple (success: bool, result: str)
@@ -188,6 +437,9 @@ def delete_event(service, event_id):
             calendarId="primary",
             eventId=event_id
         ).execute()
+
+        if user_id:
+            event_store.record_deleted(user_id, event_id)
         
         return True, f"Event {event_id} deleted successfully"
         
@@ -195,46 +447,177 @@ def delete_event(service, event_id):
         return False, str(e)
 
 
-def list_events(service, max_results=50):
+def batch_mutations(service, requests):
+    """
+    Send several Calendar requests as batched HTTP round trips
+
+    The Calendar API accepts up to BATCH_LIMIT requests per batch and does
+    not guarantee the order they run in, so only batch independent changes.
+
+    Args:
+        service: Google Calendar service object
+        requests: List of (key, HttpRequest) pairs, e.g.
+            ("delete:abc", service.events().delete(calendarId="primary", eventId="abc"))
+
+    Returns:
+        Report dict:
+            results: {key: API response} for requests that succeeded
+            errors: {key: error message} for requests that failed
+    """
+    report = {"results": {}, "errors": {}}
+
+    def on_response(request_id, response, exception):
+        if exception is not None:
+            report["errors"][request_id] = str(exception)
+        else:
+            report["results"][request_id] = response
+
+    for offset in range(0, len(requests), BATCH_LIMIT):
+        chunk = requests[offset:offset + BATCH_LIMIT]
+        batch = service.new_batch_http_request(callback=on_response)
+        for key, request in chunk:
+            batch.add(request, request_id=key)
+        try:
+            batch.execute()
+        except Exception as e:
+            # The whole round trip failed - nothing in this chunk was applied
+            for key, _ in chunk:
+                report["errors"].setdefault(key, str(e))
+    return report
+
+
+def replace_events(service, event_ids, title, start, end, description="", user_id=None):
+    """
+    Delete event_ids and create a new event in a single batched round trip
+
+    Returns:
+        Report dict:
+            deleted: ids that were deleted
+            delete_errors: {event_id: error message}
+            created: the new event resource, or None
+            create_error: error message if the insert failed, else None
+    """
+    requests = [
+        (f"delete:{event_id}", service.events().delete(calendarId="primary", eventId=event_id))
+        for event_id in event_ids
+    ]
+    requests.append((
+        "insert",
+        service.events().insert(calendarId="primary", body=event_body(title, start, end, description)),
+    ))
+
+    report = batch_mutations(service, requests)
+    deleted = [event_id for event_id in event_ids if f"delete:{event_id}" in report["results"]]
+    created = report["results"].get("insert")
+
+    if user_id:
+        for event_id in deleted:
+            event_store.record_deleted(user_id, event_id)
+        if created:
+            event_store.record_created(user_id, created)
+
+    return {
+        "deleted": deleted,
+        "delete_errors": {
+            key.split(":", 1)[1]: error for key, error in report["errors"].items() if key.startswith("delete:")
+        },
+        "created": created,
+        "create_error": report["errors"].get("insert"),
+    }
+
+
+def iter_events(service, fields=EVENT_FIELDS, page_size=LIST_PAGE_SIZE, calendar_id="primary", **params):
+    """
+    Stream events().list results, one page per API call
+
+    The next page is only requested once the caller has consumed the current
+    one, so stopping early (islice, break, any()) saves the remaining calls.
+
+    Args:
+        service: Google Calendar service object
+        fields: Partial-response mask for each event, e.g. "id,summary,start";
+            None returns full event resources
+        page_size: maxResults per page
+        calendar_id: Calendar to list
+        **params: Extra events().list parameters (timeMin, timeMax, orderBy, q, ...)
+
+    Yields:
+        Event dictionaries
+    """
+    page_token = None
+    while True:
+        metrics.incr("events.api_calls")
+        request = dict(params, calendarId=calendar_id, singleEvents=True, maxResults=page_size)
+        if page_token:
+            request["pageToken"] = page_token
+        if fields:
+            request["fields"] = f"nextPageToken,items({fields})"
+        response = service.events().list(**request).execute()
+        yield from response.get("items", [])
+        page_token = response.get("nextPageToken")
+        if not page_token:
+            return
+
+
+def list_events(service, max_results=50, user_id=None, fields=EVENT_FIELDS):
     """
     List calendar events (past, present, and future)
     
     Args:
         service: Google Calendar service object
-        max_results: Maximum number of events to return
+        max_results: Maximum number of events to return (None for all)
+        user_id: Credential store user id; when given, events come from the
+            user's local event mirror (optional)
+        fields: Partial-response mask for each event (API path only)
         
     Returns:
         List of event dictionaries
     """
     try:
         from datetime import datetime, timedelta
+
+        if user_id:
+            now = time.time()
+            events = event_store.events_between(user_id, service, now - 7 * 86400, now + 30 * 86400)
+            if events is not None:
+                logger.debug("Found %d events (local mirror)", len(events))
+                return events[:max_results]
         
         # Get events from 7 days ago to 30 days in the future
         time_min = (datetime.utcnow() - timedelta(days=7)).isoformat() + 'Z'
         time_max = (datetime.utcnow() + timedelta(days=30)).isoformat() + 'Z'
         
-        print(f"[LIST_EVENTS] Querying events from {time_min} to {time_max}")
-        
-        events_result = service.events().list(
-            calendarId="primary",
-            timeMin=time_min,
-            timeMax=time_max,
-            maxResults=max_results,
-            singleEvents=True,
-            orderBy="startTime"
-        ).execute()
-        
-        events = events_result.get("items", [])
-        print(f"[LIST_EVENTS] Found {len(events)} events")
-        
-        for event in events:
-            print(f"[LIST_EVENTS] - {event.get('summary', 'No title')} at {event.get('start', {}).get('dateTime', 'No time')}")
-        
+        logger.debug("Listing events from %s to %s", time_min, time_max)
+
+        # Pages are only fetched until max_results events have been read
+        events = list(islice(
+            iter_events(service, fields=fields, timeMin=time_min, timeMax=time_max, orderBy="startTime"),
+            max_results,
+        ))
+        logger.debug("Found %d events", len(events))
         return events
         
     except Exception as e:
-        print(f"[LIST_EVENTS] Error listing events: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error listing events: %s", e)
         # Return empty list instead of raising error
         return []
+
+
+def event_matcher(service, user_id=None):
+    """
+    Index of the events a delete request can refer to
+
+    Args:
+        service: Google Calendar service object
+        user_id: Credential store user id; when given, the index covers the
+            user's whole local mirror instead of the events listed around today
+
+    Returns:
+        EventMatcher
+    """
+    if user_id:
+        try:
+            return event_store.matcher(user_id, service)
+        except Exception as e:
+            logger.warning("Local mirror unavailable, listing events instead: %s", e)
+    return EventMatcher(list_events(service, max_results=None, fields=MATCH_FIELDS))
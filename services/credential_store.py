@@ -0,0 +1,384 @@
+"""
+Per-user OAuth credential store
+
+Refreshed tokens are written back here (and to the session by the caller),
+so a refresh happens once per token lifetime instead of on every request.
+A background thread refreshes tokens that are close to expiry, so requests
+normally never wait on Google's token endpoint. Users who have not made a
+request for CREDENTIAL_IDLE_TTL seconds are no longer refreshed, and their
+stored credentials are purged.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+
+from services import metrics
+from services.log import get_logger
+from services.sqlite_db import connect
+
+logger = get_logger(__name__)
+
+# Refresh in the background once a token is this close to expiry
+REFRESH_MARGIN_SECONDS = int(os.getenv("CREDENTIAL_REFRESH_MARGIN", "300"))
+REFRESH_INTERVAL_SECONDS = int(os.getenv("CREDENTIAL_REFRESH_INTERVAL", "60"))
+# Stop refreshing (and forget) users idle for this long - 30 days by default
+IDLE_TTL_SECONDS = int(os.getenv("CREDENTIAL_IDLE_TTL", str(30 * 24 * 3600)))
+# Refreshes are serialised per user on a fixed set of locks
+LOCK_STRIPES = 64
+
+
+def _expiry_timestamp(credentials_dict):
+    """Expiry as a UTC epoch timestamp, or None if unknown"""
+    expiry = credentials_dict.get("expiry")
+    if not expiry:
+        return None
+    # google-auth uses naive UTC datetimes
+    return (datetime.fromisoformat(expiry) - datetime(1970, 1, 1)).total_seconds()
+
+
+class MemoryCredentialBackend:
+    """Credentials kept in this process only"""
+
+    def __init__(self):
+        self._data = {}
+        self._last_used = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            value = self._data.get(user_id)
+            return dict(value) if value else None
+
+    def put(self, user_id, credentials_dict):
+        with self._lock:
+            self._data[user_id] = dict(credentials_dict)
+            self._last_used.setdefault(user_id, time.time())
+
+    def touch(self, user_id, when=None):
+        with self._lock:
+            if user_id in self._data:
+                self._last_used[user_id] = when or time.time()
+
+    def delete(self, user_id):
+        with self._lock:
+            self._data.pop(user_id, None)
+            self._last_used.pop(user_id, None)
+
+    def expiring_before(self, timestamp, used_since=0):
+        with self._lock:
+            items = [
+                (user_id, creds) for user_id, creds in self._data.items()
+                if self._last_used.get(user_id, 0) >= used_since
+            ]
+        return [
+            (user_id, dict(creds)) for user_id, creds in items
+            if (_expiry_timestamp(creds) or float("inf")) <= timestamp
+        ]
+
+    def purge_idle(self, used_before):
+        with self._lock:
+            idle = [user_id for user_id, used in self._last_used.items() if used < used_before]
+            for user_id in idle:
+                self._data.pop(user_id, None)
+                self._last_used.pop(user_id, None)
+        return len(idle)
+
+
+class SQLiteCredentialBackend:
+    """Credentials shared by every worker on the host and kept across restarts"""
+
+    def __init__(self, path):
+        new_file = not os.path.exists(path)
+        self._conn = connect(path)
+        self._lock = threading.Lock()
+        if new_file:
+            # Holds refresh tokens - keep it private to the app user
+            os.chmod(path, 0o600)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS credentials ("
+            " user_id TEXT PRIMARY KEY, data TEXT NOT NULL,"
+            " expires_at REAL, updated_at REAL NOT NULL, last_used REAL)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(credentials)")}
+        if "last_used" not in columns:
+            # Stores from before idle users were purged count as used now
+            self._conn.execute("ALTER TABLE credentials ADD COLUMN last_used REAL")
+            self._conn.execute("UPDATE credentials SET last_used = ?", (time.time(),))
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS credentials_expiry ON credentials(expires_at)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS credentials_last_used ON credentials(last_used)"
+        )
+
+    def get(self, user_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM credentials WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, user_id, credentials_dict):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO credentials (user_id, data, expires_at, updated_at, last_used)"
+                " VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT(user_id) DO UPDATE SET data = excluded.data,"
+                " expires_at = excluded.expires_at, updated_at = excluded.updated_at",
+                (user_id, json.dumps(credentials_dict), _expiry_timestamp(credentials_dict), now, now),
+            )
+
+    def touch(self, user_id, when=None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE credentials SET last_used = ? WHERE user_id = ?", (when or time.time(), user_id)
+            )
+
+    def delete(self, user_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM credentials WHERE user_id = ?", (user_id,))
+
+    def expiring_before(self, timestamp, used_since=0):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT user_id, data FROM credentials WHERE expires_at <= ? AND last_used >= ?",
+                (timestamp, used_since),
+            ).fetchall()
+        return [(user_id, json.loads(data)) for user_id, data in rows]
+
+    def purge_idle(self, used_before):
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM credentials WHERE last_used < ?", (used_before,)
+            ).rowcount
+
+
+def refresh_credentials(credentials_dict):
+    """
+    Exchange the refresh token for a new access token
+
+    Returns:
+        New credentials dict (token, expiry and possibly refresh_token updated)
+    """
+    credentials = Credentials(
+        token=credentials_dict.get("token"),
+        refresh_token=credentials_dict.get("refresh_token"),
+        token_uri=credentials_dict.get("token_uri"),
+        client_id=credentials_dict.get("client_id"),
+        client_secret=credentials_dict.get("client_secret"),
+        scopes=credentials_dict.get("scopes")
+    )
+    credentials.refresh(Request())
+
+    refreshed = dict(credentials_dict)
+    refreshed["token"] = credentials.token
+    refreshed["refresh_token"] = credentials.refresh_token or credentials_dict.get("refresh_token")
+    refreshed["expiry"] = credentials.expiry.isoformat() if credentials.expiry else None
+    return refreshed
+
+
+class CredentialStore:
+    """
+    Front-end for the credential backends
+
+    Args:
+        backend: MemoryCredentialBackend or SQLiteCredentialBackend
+        refresher: Function taking and returning a credentials dict
+            (defaults to refresh_credentials; tests pass a fake)
+        idle_ttl: Seconds without a request after which a user is no
+            longer refreshed and is purged
+    """
+
+    def __init__(self, backend, refresher=refresh_credentials, refresh_margin=REFRESH_MARGIN_SECONDS,
+                 idle_ttl=IDLE_TTL_SECONDS):
+        self.backend = backend
+        self.refresher = refresher
+        self.refresh_margin = refresh_margin
+        self.idle_ttl = idle_ttl
+        self._user_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self._pending_lock = threading.Lock()
+        self._pending = set()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cred-refresh")
+        self._thread = None
+        self._stop = threading.Event()
+
+    def _lock_for(self, user_id):
+        # A fixed set of locks, so memory doesn't grow with the number of users
+        digest = hashlib.blake2b(user_id.encode(), digest_size=4).digest()
+        return self._user_locks[int.from_bytes(digest, "big") % len(self._user_locks)]
+
+    def get(self, user_id):
+        return self.backend.get(user_id)
+
+    def save(self, user_id, credentials_dict):
+        """
+        Store a user's credentials after a login
+
+        Google only sends a refresh token on the first consent, so a later
+        login without one keeps the stored refresh token.
+        """
+        credentials_dict = dict(credentials_dict)
+        if not credentials_dict.get("refresh_token"):
+            stored = self.backend.get(user_id)
+            if stored and stored.get("refresh_token"):
+                credentials_dict["refresh_token"] = stored["refresh_token"]
+        self.backend.put(user_id, credentials_dict)
+        self.backend.touch(user_id)
+        return credentials_dict
+
+    def delete(self, user_id):
+        self.backend.delete(user_id)
+
+    def refresh(self, user_id, credentials_dict, background=False):
+        """Refresh one user's token and persist it; returns the new dict"""
+        with self._lock_for(user_id):
+            # Someone else may have refreshed while we waited for the lock
+            current = self.backend.get(user_id) or credentials_dict
+            expiry = _expiry_timestamp(current)
+            if expiry is not None and expiry - time.time() > self.refresh_margin:
+                return current
+
+            start = time.monotonic()
+            try:
+                refreshed = self.refresher(current)
+            except Exception as e:
+                metrics.incr("credentials.refresh.failed")
+                logger.warning("Token refresh failed for %s: %s", user_id, e)
+                raise
+            finally:
+                metrics.observe("credentials.refresh", (time.monotonic() - start) * 1000)
+
+            metrics.incr("credentials.refresh.background" if background else "credentials.refresh.blocking")
+            self.backend.put(user_id, refreshed)
+            return refreshed
+
+    def ensure_fresh(self, user_id, credentials_dict):
+        """
+        Return up-to-date credentials for a request
+
+        - A newer token in the store (refreshed in the background) wins
+        - An expired token is refreshed synchronously (the request blocks)
+        - A token close to expiry is refreshed in the background
+        """
+        stored = self.backend.get(user_id)
+        if stored is None:
+            self.backend.put(user_id, credentials_dict)
+            stored = credentials_dict
+        elif stored.get("token") != credentials_dict.get("token"):
+            metrics.incr("credentials.store_newer")
+        self.backend.touch(user_id)
+
+        expiry = _expiry_timestamp(stored)
+        if expiry is None or not stored.get("refresh_token"):
+            return stored
+
+        remaining = expiry - time.time()
+        if remaining <= 30:
+            metrics.incr("credentials.blocked_requests")
+            try:
+                return self.refresh(user_id, stored)
+            except Exception:
+                # Same behaviour as before: carry on with the existing token
+                return stored
+
+        if remaining <= self.refresh_margin:
+            self._refresh_in_background(user_id, stored)
+        return stored
+
+    def _refresh_in_background(self, user_id, credentials_dict):
+        with self._pending_lock:
+            if user_id in self._pending:
+                return
+            self._pending.add(user_id)
+
+        def run():
+            try:
+                self.refresh(user_id, credentials_dict, background=True)
+            except Exception:
+                pass
+            finally:
+                with self._pending_lock:
+                    self._pending.discard(user_id)
+
+        self._executor.submit(run)
+
+    def refresh_expiring(self):
+        """
+        Refresh every stored token that expires within the margin
+
+        Users idle for longer than idle_ttl are skipped and purged.
+        """
+        now = time.time()
+        purged = self.backend.purge_idle(now - self.idle_ttl)
+        if purged:
+            metrics.incr("credentials.purged", purged)
+            logger.info("Purged credentials of %d idle users", purged)
+        for user_id, credentials_dict in self.backend.expiring_before(now + self.refresh_margin,
+                                                                      used_since=now - self.idle_ttl):
+            if credentials_dict.get("refresh_token"):
+                self._refresh_in_background(user_id, credentials_dict)
+
+    def start_background_refresh(self, interval=REFRESH_INTERVAL_SECONDS):
+        """Start the daemon thread that refreshes tokens before they expire"""
+        if self._thread and self._thread.is_alive():
+            return
+
+        def loop():
+            while not self._stop.wait(interval):
+                try:
+                    self.refresh_expiring()
+                except Exception as e:
+                    logger.exception("Background refresh loop error: %s", e)
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=loop, name="cred-refresh-loop", daemon=True)
+        self._thread.start()
+
+    def stop_background_refresh(self):
+        self._stop.set()
+
+    def get_stats(self):
+        return metrics.snapshot("credentials.")
+
+
+def session_user_id(session):
+    """
+    Return the store key for a session's user
+
+    Sessions from before the store existed get one derived from their
+    credentials the first time they're seen.
+    """
+    user_id = session.get("user_id")
+    if not user_id:
+        from services.calendar_service import _credential_identity
+
+        user_id = _credential_identity(session["credentials"])[:32]
+        session["user_id"] = user_id
+    return user_id
+
+
+def account_user_id(client_id, account):
+    """
+    Store key for a Google account (its primary calendar id), so logging in
+    again - from any browser - maps to the same user
+    """
+    return hashlib.sha256(f"{client_id or ''}|{account}".encode()).hexdigest()[:32]
+
+
+def _build_default_store():
+    if os.getenv("CREDENTIAL_STORE_BACKEND", "sqlite") == "memory":
+        backend = MemoryCredentialBackend()
+    else:
+        backend = SQLiteCredentialBackend(os.getenv("CREDENTIAL_STORE_PATH", "cache/credentials.sqlite3"))
+    return CredentialStore(backend)
+
+
+credential_store = _build_default_store()
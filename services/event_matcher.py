@@ -0,0 +1,295 @@
+"""
+Indexed, ranked matching of delete requests against a user's events
+
+Events are bucketed by normalized title token, local date and local start
+hour (CALENDAR_TIMEZONE, whatever offset the event was stored with), so a
+request only looks at events that can match. Title similarity is fuzzy
+(typos and partial titles still match) and candidates come back ranked.
+"""
+import difflib
+import re
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from services.event_time import LOCAL_TZ, event_bounds, local_datetime
+
+# A candidate needs at least this title similarity when a title was given
+MIN_TITLE_SCORE = 0.5
+# Query tokens match index tokens this similar (difflib ratio)
+FUZZY_TOKEN_CUTOFF = 0.8
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset("a an the my our of for with at on in to event events".split())
+_WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+_MONTHS = ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"]
+_TIME = re.compile(r"^(\d{1,2})(?::?(\d{2}))?\s*(am|pm|a\.m\.|p\.m\.)?$")
+_TIME_PREFIX = re.compile(r"^(?:at|around|about|approx(?:imately)?|by|~)\s*")
+_WEEKDAY = re.compile(
+    r"\b(?:(last|next|this|coming|on)\s+)?"
+    r"(monday|mon|tuesday|tues|tue|wednesday|wed|thursday|thurs|thur|thu|friday|fri|saturday|sat|sunday|sun)\b"
+)
+_MONTH = r"(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?"
+_DAY_MONTH = re.compile(r"\b(\d{1,2})(?:st|nd|rd|th)?\s+(?:of\s+)?" + _MONTH + r"(?:,?\s+(\d{4}))?(?!\w)")
+_MONTH_DAY = re.compile(r"\b" + _MONTH + r"\s+(\d{1,2})(?:st|nd|rd|th)?(?:,?\s+(\d{4}))?\b")
+
+
+def title_tokens(text):
+    return [t for t in _TOKEN.findall((text or "").lower()) if t not in _STOPWORDS]
+
+
+def parse_time_of_day(text):
+    """
+    "3pm", "3:30 pm", "15:00", "1500", "noon" -> [(hour, minute)] candidates
+
+    A bare hour below 12 ("3") could be either half of the day, so both are
+    returned. Unparseable input gives [].
+    """
+    text = _TIME_PREFIX.sub("", (text or "").strip().lower())
+    if not text:
+        return []
+    if text == "noon":
+        return [(12, 0)]
+    if text == "midnight":
+        return [(0, 0)]
+    match = _TIME.match(text.replace(" ", ""))
+    if not match:
+        return []
+    hour, minute, meridiem = int(match.group(1)), int(match.group(2) or 0), match.group(3)
+    if hour > 23 or minute > 59:
+        return []
+    if meridiem:
+        if hour > 12:
+            return []
+        hour = hour % 12 + (12 if meridiem.startswith("p") else 0)
+        return [(hour, minute)]
+    if hour < 12 and match.group(2) is None:
+        return [(hour, minute), (hour + 12, minute)]
+    return [(hour, minute)]
+
+
+def _weekday_date(name, qualifier, today):
+    """
+    Date for "<qualifier> <weekday>": "last" is the most recent one before
+    today, "next" skips the one still in this (Sunday-first) week, anything
+    else is the next occurrence with today included
+    """
+    target = next(i for i, day in enumerate(_WEEKDAYS) if day.startswith(name[:3]))
+    if qualifier == "last":
+        return today - timedelta(days=(today.weekday() - target) % 7 or 7)
+    ahead = (target - today.weekday()) % 7
+    if qualifier == "next":
+        ahead = ahead or 7
+        if (today.weekday() + 1) % 7 + ahead <= 6:
+            ahead += 7
+    return today + timedelta(days=ahead)
+
+
+def _month_date(day, month, year, today):
+    """Date for a day and month name; without a year, the one nearest today"""
+    month = _MONTHS.index(month[:3]) + 1
+    try:
+        if year:
+            return date(int(year), month, int(day))
+        candidates = []
+        for offset in (-1, 0, 1):
+            try:
+                candidates.append(date(today.year + offset, month, int(day)))
+            except ValueError:
+                pass
+    except ValueError:
+        return None
+    return min(candidates, key=lambda d: abs(d - today)) if candidates else None
+
+
+def parse_day(text, today=None):
+    """
+    "today", "tomorrow", "yesterday", "day after tomorrow", a weekday
+    ("friday", "fri", "last monday", "next tue"), a day and month name
+    ("5th march", "Oct 20") or an ISO date -> date, else None
+    """
+    text = (text or "").strip().lower()
+    today = today or datetime.now(LOCAL_TZ).date()
+    if not text:
+        return None
+    if "day after tomorrow" in text:
+        return today + timedelta(days=2)
+    if "tomorrow" in text:
+        return today + timedelta(days=1)
+    if "yesterday" in text:
+        return today - timedelta(days=1)
+    if "today" in text or "tonight" in text:
+        return today
+    found = re.search(r"\d{4}-\d{2}-\d{2}", text)
+    if found:
+        try:
+            return date.fromisoformat(found.group(0))
+        except ValueError:
+            return None
+    found = _DAY_MONTH.search(text)
+    if found:
+        return _month_date(found.group(1), found.group(2), found.group(3), today)
+    found = _MONTH_DAY.search(text)
+    if found:
+        return _month_date(found.group(2), found.group(1), found.group(3), today)
+    found = _WEEKDAY.search(text)
+    if found:
+        return _weekday_date(found.group(2), found.group(1), today)
+    return None
+
+
+def unresolved_parts(time_reference="", time_of_day="", today=None):
+    """
+    The date and time a request gave that couldn't be parsed
+
+    match() can't filter on those, so its ranking may point at an event on
+    another day; callers must not act on it without asking.
+    """
+    parts = []
+    if (time_reference or "").strip() and parse_day(time_reference, today) is None:
+        parts.append(time_reference.strip())
+    if (time_of_day or "").strip() and not parse_time_of_day(time_of_day):
+        parts.append(time_of_day.strip())
+    return parts
+
+
+class EventMatcher:
+    """
+    Index over one user's events
+
+    Titles are scored once per distinct normalized title (recurring
+    meetings share one), dates and hours are bucketed per event.
+
+    Args:
+        events: Calendar event resources
+    """
+
+    def __init__(self, events):
+        self.events = {}
+        self.titles = {}
+        self.starts = {}
+        self.title_events = defaultdict(list)  # normalized title -> ids
+        self.by_token = defaultdict(set)  # token -> normalized titles
+        self.by_date = defaultdict(set)
+        self.by_hour = defaultdict(set)  # (date, hour) -> ids
+
+        for event in events:
+            event_id = event.get("id")
+            bounds = event_bounds(event)
+            if not event_id or bounds is None:
+                continue
+            tokens = title_tokens(event.get("summary"))
+            title = " ".join(tokens)
+            self.events[event_id] = event
+            self.titles[event_id] = title
+            self.starts[event_id] = bounds[0]
+            self.title_events[title].append(event_id)
+            for token in tokens:
+                self.by_token[token].add(title)
+
+            start = local_datetime(bounds[0])
+            if event.get("start", {}).get("dateTime"):
+                self.by_date[start.date()].add(event_id)
+                self.by_hour[(start.date(), start.hour)].add(event_id)
+            else:
+                # All-day events sit in every day they cover, in no hour
+                day, last = start.date(), local_datetime(bounds[1] - 1).date()
+                while day <= last:
+                    self.by_date[day].add(event_id)
+                    day += timedelta(days=1)
+
+        self._hours = defaultdict(set)  # hour -> ids, for requests without a date
+        for (_, hour), ids in self.by_hour.items():
+            self._hours[hour] |= ids
+
+    def __len__(self):
+        return len(self.events)
+
+    def _close_words(self, token):
+        """Indexed words similar to a query token, with their similarity"""
+        close = {token: 1.0} if token in self.by_token else {}
+        for word in difflib.get_close_matches(token, self.by_token.keys(), n=3, cutoff=FUZZY_TOKEN_CUTOFF):
+            close.setdefault(word, difflib.SequenceMatcher(None, token, word).ratio())
+        return close
+
+    def title_scores(self, title, among=None):
+        """
+        {normalized title: similarity} for indexed titles scoring at least
+        MIN_TITLE_SCORE: 70% share of query words found (fuzzily) in the
+        title, 30% overlap of the two word sets (so exact titles beat
+        longer ones that merely contain the words)
+
+        Args:
+            among: Only score these normalized titles (default: all sharing a word)
+        """
+        tokens = title_tokens(title)
+        if not tokens:
+            return {}
+        found = defaultdict(float)
+        for token in tokens:
+            best = {}
+            for word, ratio in self._close_words(token).items():
+                for candidate in self.by_token[word]:
+                    if (among is None or candidate in among) and ratio > best.get(candidate, 0.0):
+                        best[candidate] = ratio
+            for candidate, ratio in best.items():
+                found[candidate] += ratio
+
+        scores = {}
+        for candidate, matched in found.items():
+            words = len(candidate.split())
+            overlap = matched / (len(tokens) + words - matched)
+            score = 0.7 * matched / len(tokens) + 0.3 * overlap
+            if score >= MIN_TITLE_SCORE:
+                scores[candidate] = score
+        return scores
+
+    def match(self, title="", time_reference="", time_of_day="", now=None):
+        """
+        Rank the events a delete request could mean
+
+        Args:
+            title: Title or keywords from the request
+            time_reference: "today", "tomorrow", a weekday or a date
+                (ignored if it doesn't parse - see unresolved_parts)
+            time_of_day: "3pm", "15:00", ... (likewise)
+            now: Epoch seconds used for "today" and for tie-breaking (default: now)
+
+        Returns:
+            [(score, event)] best first; score is the title similarity (1.0
+            without a title), ties go to the event closest to now
+        """
+        now = now if now is not None else datetime.now(LOCAL_TZ).timestamp()
+        day = parse_day(time_reference, local_datetime(now).date())
+        times = parse_time_of_day(time_of_day)
+
+        # Date/hour buckets first - usually the most selective
+        in_time = None
+        if day is not None:
+            in_time = self.by_date.get(day, set())
+        if times:
+            in_hours = set()
+            for hour, _ in times:
+                in_hours |= self.by_hour.get((day, hour), set()) if day is not None else self._hours.get(hour, set())
+            in_time = in_hours if in_time is None else in_time & in_hours
+
+        if title_tokens(title):
+            among = None if in_time is None else {self.titles[i] for i in in_time}
+            scores = self.title_scores(title, among)
+            if in_time is None:
+                scored = [(score, i) for t, score in scores.items() for i in self.title_events[t]]
+            else:
+                scored = [(scores[self.titles[i]], i) for i in in_time if self.titles[i] in scores]
+        else:
+            scored = [(1.0, i) for i in (self.events if in_time is None else in_time)]
+
+        if times:
+            minutes = {minute for _, minute in times}
+            # Right hour, different minute
+            scored = [
+                (score if local_datetime(self.starts[i]).minute in minutes else score - 0.05, i)
+                for score, i in scored
+            ]
+
+        starts = self.starts
+        scored.sort(key=lambda item: (-item[0], abs(starts[item[1]] - now)))
+        return [(round(score, 3), self.events[i]) for score, i in scored]
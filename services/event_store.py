@@ -0,0 +1,268 @@
+"""
+Per-user local mirror of Calendar events
+
+The first request for a user does one full sync of a window around today;
+after that the mirror is kept current with incremental syncs using the
+nextSyncToken the Calendar API hands back. Conflict checks and delete
+matching read from the mirror, so most requests make no events().list call.
+
+- The full sync covers EVENT_SYNC_PAST_DAYS back to EVENT_SYNC_FUTURE_DAYS
+  ahead; ranges outside that window go to the API
+- A sync happens at most once per EVENT_SYNC_INTERVAL seconds per user
+- A 410 Gone on the sync token triggers a full resync
+- Writes made by our own handlers are applied to the mirror immediately
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+from googleapiclient.errors import HttpError
+
+from services import metrics
+from services.event_matcher import EventMatcher
+from services.interval_index import IntervalIndex
+from services.log import get_logger
+
+logger = get_logger(__name__)
+
+EVENT_SYNC_INTERVAL = float(os.getenv("EVENT_SYNC_INTERVAL", "30"))
+EVENT_SYNC_PAST_DAYS = int(os.getenv("EVENT_SYNC_PAST_DAYS", "30"))
+EVENT_SYNC_FUTURE_DAYS = int(os.getenv("EVENT_SYNC_FUTURE_DAYS", "365"))
+EVENT_STORE_MAX_USERS = int(os.getenv("EVENT_STORE_MAX_USERS", "256"))
+SYNC_PAGE_SIZE = 250
+# Partial-response mask: everything the mirror's readers use (conflict checks,
+# delete matching), none of the descriptions, attendees or conference data
+EVENT_FIELDS = "id,status,summary,transparency,start,end"
+
+
+class CalendarMirror:
+    """Events for one user, keyed by event id"""
+
+    def __init__(self):
+        self.events = {}
+        self.sync_token = None
+        self.last_sync = None
+        self.window_start = None
+        self.window_end = None
+        # Bumped on every change so derived indexes know when to rebuild
+        self.version = 0
+        self.lock = threading.RLock()
+        self._index = None
+        self._index_version = None
+        self._matcher = None
+        self._matcher_version = None
+
+    def apply(self, event):
+        """Insert, update or (for cancelled events) remove one event"""
+        event_id = event.get("id")
+        if not event_id:
+            return
+        if event.get("status") == "cancelled":
+            if self.events.pop(event_id, None) is not None:
+                self.version += 1
+        else:
+            self.events[event_id] = event
+            self.version += 1
+
+    def index(self):
+        """Interval index over the current events (rebuilt after changes)"""
+        if self._index is None or self._index_version != self.version:
+            self._index = IntervalIndex.from_events(self.events.values())
+            self._index_version = self.version
+        return self._index
+
+    def matcher(self):
+        """Title/date/hour index for delete requests (rebuilt after changes)"""
+        if self._matcher is None or self._matcher_version != self.version:
+            self._matcher = EventMatcher(self.events.values())
+            self._matcher_version = self.version
+        return self._matcher
+
+    def between(self, start_ts, end_ts):
+        """Events overlapping [start_ts, end_ts), sorted by start time"""
+        return self.index().overlaps(start_ts, end_ts)
+
+
+def _is_gone(error):
+    return isinstance(error, HttpError) and getattr(error.resp, "status", None) == 410
+
+
+class EventStore:
+    """
+    Args:
+        sync_interval: Seconds a mirror is trusted before checking for changes
+        past_days: How far back the full sync reaches
+        future_days: How far ahead the full sync reaches
+        max_users: Mirrors kept in memory (least recently used dropped first)
+    """
+
+    def __init__(self, sync_interval=EVENT_SYNC_INTERVAL, past_days=EVENT_SYNC_PAST_DAYS,
+                 future_days=EVENT_SYNC_FUTURE_DAYS, max_users=EVENT_STORE_MAX_USERS):
+        self.sync_interval = sync_interval
+        self.past_days = past_days
+        self.future_days = future_days
+        self.max_users = max_users
+        self._mirrors = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _mirror(self, user_id):
+        with self._lock:
+            mirror = self._mirrors.get(user_id)
+            if mirror is None:
+                mirror = self._mirrors[user_id] = CalendarMirror()
+                while len(self._mirrors) > self.max_users:
+                    self._mirrors.popitem(last=False)
+            self._mirrors.move_to_end(user_id)
+            return mirror
+
+    def forget(self, user_id):
+        with self._lock:
+            self._mirrors.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._mirrors.clear()
+
+    def _list_all(self, service, **params):
+        """Page through events().list; returns (items, nextSyncToken)"""
+        items = []
+        page_token = None
+        while True:
+            metrics.incr("events.api_calls")
+            response = service.events().list(
+                calendarId="primary",
+                singleEvents=True,
+                maxResults=SYNC_PAGE_SIZE,
+                pageToken=page_token,
+                fields=f"nextPageToken,nextSyncToken,items({EVENT_FIELDS})",
+                **params
+            ).execute()
+            items.extend(response.get("items", []))
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                return items, response.get("nextSyncToken")
+
+    def _full_sync(self, mirror, service):
+        now = datetime.now(timezone.utc)
+        window_start = now - timedelta(days=self.past_days)
+        window_end = now + timedelta(days=self.future_days)
+        items, sync_token = self._list_all(
+            service,
+            timeMin=window_start.isoformat().replace("+00:00", "Z"),
+            timeMax=window_end.isoformat().replace("+00:00", "Z"),
+        )
+
+        mirror.events = {}
+        for event in items:
+            mirror.apply(event)
+        mirror.version += 1
+        mirror.sync_token = sync_token
+        mirror.window_start = window_start.timestamp()
+        mirror.window_end = window_end.timestamp()
+        metrics.incr("events.full_syncs")
+
+    def _incremental_sync(self, mirror, service):
+        items, sync_token = self._list_all(service, syncToken=mirror.sync_token)
+        for event in items:
+            mirror.apply(event)
+        mirror.sync_token = sync_token or mirror.sync_token
+        metrics.incr("events.incremental_syncs")
+
+    def sync(self, user_id, service, force=False):
+        """
+        Bring the user's mirror up to date
+
+        Returns:
+            The CalendarMirror (callers read it under mirror.lock)
+        """
+        mirror = self._mirror(user_id)
+        with mirror.lock:
+            now = time.time()
+            if not force and mirror.last_sync is not None and now - mirror.last_sync < self.sync_interval:
+                metrics.incr("events.calls_saved")
+                return mirror
+
+            start = time.monotonic()
+            try:
+                if mirror.sync_token:
+                    try:
+                        self._incremental_sync(mirror, service)
+                    except HttpError as e:
+                        if not _is_gone(e):
+                            raise
+                        logger.info("Sync token expired for %s, doing a full resync", user_id)
+                        metrics.incr("events.resync_410")
+                        mirror.sync_token = None
+                        self._full_sync(mirror, service)
+                else:
+                    self._full_sync(mirror, service)
+            finally:
+                metrics.observe("events.sync", (time.monotonic() - start) * 1000)
+
+            mirror.last_sync = time.time()
+            return mirror
+
+    def prefetch(self, user_id, service):
+        """sync() for warm-up callers: failures are logged, not raised"""
+        try:
+            self.sync(user_id, service)
+        except Exception as e:
+            logger.warning("Prefetch failed for %s: %s", user_id, e)
+
+    def events_between(self, user_id, service, start_ts, end_ts):
+        """
+        Events overlapping [start_ts, end_ts) from the (synced) mirror
+
+        Returns:
+            Sorted list of events, or None if the range reaches outside the
+            synced window (the caller should ask the API directly)
+        """
+        mirror = self.sync(user_id, service)
+        with mirror.lock:
+            if (mirror.window_start is not None and start_ts < mirror.window_start) or (
+                    mirror.window_end is not None and end_ts > mirror.window_end):
+                metrics.incr("events.outside_window")
+                return None
+            return mirror.between(start_ts, end_ts)
+
+    def matcher(self, user_id, service):
+        """EventMatcher over the user's whole (synced) mirror"""
+        mirror = self.sync(user_id, service)
+        with mirror.lock:
+            return mirror.matcher()
+
+    def record_created(self, user_id, event):
+        """Apply an event our own handler just inserted"""
+        mirror = self._mirrors.get(user_id)
+        if mirror is not None:
+            with mirror.lock:
+                mirror.apply(event)
+
+    def record_deleted(self, user_id, event_id):
+        """Drop an event our own handler just deleted"""
+        mirror = self._mirrors.get(user_id)
+        if mirror is not None:
+            with mirror.lock:
+                mirror.apply({"id": event_id, "status": "cancelled"})
+
+    def get_stats(self):
+        """Sync counters plus how stale the mirrors currently are"""
+        now = time.time()
+        with self._lock:
+            mirrors = list(self._mirrors.values())
+        ages = [now - m.last_sync for m in mirrors if m.last_sync is not None]
+
+        stats = metrics.snapshot("events.")
+        stats["users"] = len(mirrors)
+        stats["events"] = sum(len(m.events) for m in mirrors)
+        stats["sync_interval_seconds"] = self.sync_interval
+        stats["staleness_seconds"] = {
+            "max": round(max(ages), 2) if ages else 0.0,
+            "mean": round(sum(ages) / len(ages), 2) if ages else 0.0,
+        }
+        return stats
+
+
+event_store = EventStore()
@@ -0,0 +1,59 @@
+"""
+Timezone-correct parsing of Calendar event times
+"""
+from datetime import date, datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from config import CALENDAR_TIMEZONE
+
+LOCAL_TZ = ZoneInfo(CALENDAR_TIMEZONE)
+
+
+def parse_datetime(value):
+    """
+    Parse an ISO string (or datetime) into an aware datetime
+
+    Naive values are treated as UTC, which is how create_event sends them.
+    """
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def to_epoch(value):
+    return parse_datetime(value).timestamp()
+
+
+def _day_start(day):
+    return datetime.combine(day, time.min, tzinfo=LOCAL_TZ).timestamp()
+
+
+def event_bounds(event):
+    """
+    Return (start_epoch, end_epoch) for a Calendar event resource
+
+    All-day events ({"date": "YYYY-MM-DD"}) span local midnight to local
+    midnight of their exclusive end date. Returns None if the event has no
+    usable times.
+    """
+    start = event.get("start", {})
+    end = event.get("end", {})
+    try:
+        if start.get("dateTime"):
+            start_ts = to_epoch(start["dateTime"])
+            end_ts = to_epoch(end["dateTime"]) if end.get("dateTime") else start_ts
+            return start_ts, max(start_ts, end_ts)
+        if start.get("date"):
+            start_day = date.fromisoformat(start["date"])
+            end_day = date.fromisoformat(end["date"]) if end.get("date") else start_day + timedelta(days=1)
+            return _day_start(start_day), _day_start(max(end_day, start_day + timedelta(days=1)))
+    except (ValueError, TypeError):
+        return None
+    return None
+
+
+def local_datetime(epoch):
+    """Epoch seconds as an aware datetime in CALENDAR_TIMEZONE"""
+    return datetime.fromtimestamp(epoch, LOCAL_TZ)
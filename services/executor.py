@@ -0,0 +1,145 @@
+"""
+Bounded thread pool for fanning out independent I/O inside a request
+
+Handlers use run_parallel() to overlap an LLM call with a Calendar call.
+Each stage's duration is recorded as stage.<flow>.<name>, the wall time of
+the whole fan-out as stage.<flow>.parallel, and the time saved compared to
+running the stages one after another goes to the stage.<flow>.saved_ms
+counter.
+
+Stages run on pool threads, so they must not touch the Flask session or
+request - resolve anything request-bound before calling run_parallel().
+Context variables (such as the log request id) are copied to each stage.
+
+Async callers use run_io() and gather_stages() instead, which copy the
+caller's context to the pool thread and record the same metrics.
+"""
+import asyncio
+import contextvars
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from services import metrics
+
+IO_POOL_SIZE = int(os.getenv("IO_POOL_SIZE", "16"))
+STAGE_DEADLINE_SECONDS = float(os.getenv("STAGE_DEADLINE_SECONDS", "25"))
+
+_pool = ThreadPoolExecutor(max_workers=IO_POOL_SIZE, thread_name_prefix="io")
+
+
+class StageTimeoutError(TimeoutError):
+    """Raised when stages are still running at the request deadline"""
+
+
+def _timed(flow, name, fn, durations):
+    def run():
+        start = time.monotonic()
+        try:
+            return fn()
+        finally:
+            elapsed_ms = (time.monotonic() - start) * 1000
+            durations[name] = elapsed_ms
+            metrics.observe(f"stage.{flow}.{name}", elapsed_ms)
+    return run
+
+
+def run_parallel(flow, stages, deadline=None):
+    """
+    Run independent stages concurrently and wait for all of them
+
+    Args:
+        flow: Name used for metrics ("delete", "create", ...)
+        stages: Dict of stage name -> zero-argument callable
+        deadline: Seconds to wait for every stage (default STAGE_DEADLINE_SECONDS)
+
+    Returns:
+        Dict of stage name -> result
+
+    Raises:
+        StageTimeoutError: if any stage is still running at the deadline
+        Exception: the first exception raised by a stage
+    """
+    deadline = STAGE_DEADLINE_SECONDS if deadline is None else deadline
+    durations = {}
+    start = time.monotonic()
+
+    # One context copy per stage - a context can't be entered by two threads at once
+    futures = {
+        name: _pool.submit(contextvars.copy_context().run, _timed(flow, name, fn, durations))
+        for name, fn in stages.items()
+    }
+    done, not_done = wait(futures.values(), timeout=deadline)
+
+    wall_ms = (time.monotonic() - start) * 1000
+    metrics.observe(f"stage.{flow}.parallel", wall_ms)
+
+    if not_done:
+        for future in not_done:
+            future.cancel()
+        late = [name for name, future in futures.items() if future in not_done]
+        metrics.incr(f"stage.{flow}.deadline_exceeded")
+        raise StageTimeoutError(f"Stages {late} of '{flow}' did not finish within {deadline}s")
+
+    metrics.incr(f"stage.{flow}.saved_ms", max(0, round(sum(durations.values()) - wall_ms)))
+    return {name: future.result() for name, future in futures.items()}
+
+
+def submit(flow, name, fn):
+    """Start one timed stage in the background and return its Future"""
+    return _pool.submit(contextvars.copy_context().run, _timed(flow, name, fn, {}))
+
+
+async def run_io(fn, *args, **kwargs):
+    """
+    Await a blocking call (Calendar, Gemini parser) on the I/O pool
+
+    The caller's context variables (including Flask's request context) are
+    copied to the pool thread, and the event loop stays free meanwhile.
+    """
+    context = contextvars.copy_context()
+    return await asyncio.wrap_future(_pool.submit(context.run, fn, *args, **kwargs))
+
+
+async def gather_stages(flow, stages, deadline=None):
+    """
+    Async counterpart of run_parallel()
+
+    Args:
+        flow: Name used for metrics
+        stages: Dict of stage name -> awaitable
+        deadline: Seconds to wait for every stage (default STAGE_DEADLINE_SECONDS)
+
+    Returns:
+        Dict of stage name -> result
+    """
+    deadline = STAGE_DEADLINE_SECONDS if deadline is None else deadline
+    durations = {}
+    start = time.monotonic()
+
+    async def timed(name, awaitable):
+        stage_start = time.monotonic()
+        try:
+            return await awaitable
+        finally:
+            durations[name] = (time.monotonic() - stage_start) * 1000
+            metrics.observe(f"stage.{flow}.{name}", durations[name])
+
+    names = list(stages)
+    try:
+        results = await asyncio.wait_for(
+            asyncio.gather(*(timed(name, stages[name]) for name in names)), deadline
+        )
+    except asyncio.TimeoutError:
+        metrics.incr(f"stage.{flow}.deadline_exceeded")
+        raise StageTimeoutError(f"Stages of '{flow}' did not finish within {deadline}s")
+    finally:
+        wall_ms = (time.monotonic() - start) * 1000
+        metrics.observe(f"stage.{flow}.parallel", wall_ms)
+
+    metrics.incr(f"stage.{flow}.saved_ms", max(0, round(sum(durations.values()) - wall_ms)))
+    return dict(zip(names, results))
+
+
+def get_stats():
+    return metrics.snapshot("stage.")
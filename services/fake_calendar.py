@@ -0,0 +1,282 @@
+"""
+In-memory stand-in for the Google Calendar v3 service object
+
+Implements the subset of events() the app uses, including pagination, sync
+tokens, partial responses (`fields`), batch requests, freebusy queries and
+several calendars per account, so the event store and handlers can be
+tested offline. Every execute() (a batch counts once) is
+one API call and can sleep to simulate network latency; response_bytes adds
+up the JSON size of every list response.
+"""
+import copy
+import json
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+from services.event_time import event_bounds, to_epoch
+
+
+def _http_error(status, message):
+    return HttpError(httplib2.Response({"status": status}), json.dumps({"error": {"message": message}}).encode())
+
+
+def _rfc3339(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _parse_fields(mask):
+    """"a,b(c,d/e)" -> {"a": None, "b": {"c": None, "d": {"e": None}}}"""
+    selection, i = {}, 0
+    while i < len(mask):
+        j = i
+        while j < len(mask) and mask[j] not in ",()":
+            j += 1
+        path = mask[i:j].strip().split("/")
+        node = selection
+        for name in path[:-1]:
+            node = node.setdefault(name, {})
+        if j < len(mask) and mask[j] == "(":
+            depth, k = 1, j + 1
+            while depth:
+                depth += {"(": 1, ")": -1}.get(mask[k], 0)
+                k += 1
+            node[path[-1]] = _parse_fields(mask[j + 1:k - 1])
+            j = k
+        else:
+            node[path[-1]] = None
+        i = j + 1
+    return selection
+
+
+def _select(value, selection):
+    if selection is None:
+        return value
+    if isinstance(value, list):
+        return [_select(item, selection) for item in value]
+    return {key: _select(value[key], sub) for key, sub in selection.items() if key in value}
+
+
+class _Request:
+    def __init__(self, service, fn):
+        self._service = service
+        self._fn = fn
+
+    def execute(self, http=None, num_retries=0):
+        self._service.api_calls += 1
+        if self._service.latency:
+            time.sleep(self._service.latency)
+        return self._fn()
+
+
+class _Batch:
+    """Mimics BatchHttpRequest: all added requests go out as one call"""
+
+    def __init__(self, service, callback=None):
+        self._service = service
+        self._callback = callback
+        self._requests = []
+
+    def add(self, request, callback=None, request_id=None):
+        request_id = request_id or str(len(self._requests) + 1)
+        self._requests.append((request_id, request, callback or self._callback))
+
+    def execute(self, http=None):
+        self._service.api_calls += 1
+        self._service.batch_calls += 1
+        if self._service.latency:
+            time.sleep(self._service.latency)
+        for request_id, request, callback in self._requests:
+            response, exception = None, None
+            try:
+                response = request._fn()
+            except HttpError as e:
+                exception = e
+            if callback:
+                callback(request_id, response, exception)
+
+
+class _Events:
+    def __init__(self, service):
+        self._service = service
+
+    def list(self, calendarId="primary", **kwargs):
+        return _Request(self._service, lambda: self._service._list(dict(kwargs, calendarId=calendarId)))
+
+    def insert(self, calendarId="primary", body=None):
+        return _Request(self._service, lambda: self._service._insert(body, calendarId))
+
+    def delete(self, calendarId="primary", eventId=None):
+        return _Request(self._service, lambda: self._service._delete(eventId, calendarId))
+
+    def get(self, calendarId="primary", eventId=None):
+        return _Request(self._service, lambda: self._service._get(eventId, calendarId))
+
+
+class _Freebusy:
+    def __init__(self, service):
+        self._service = service
+
+    def query(self, body=None):
+        return _Request(self._service, lambda: self._service._freebusy(body))
+
+
+class FakeCalendarService:
+    """
+    Args:
+        latency: Seconds each execute() sleeps, to simulate a round trip
+        page_size: Largest page the fake returns (smaller maxResults wins)
+    """
+
+    def __init__(self, latency=0.0, page_size=250):
+        self.latency = latency
+        self.page_size = page_size
+        self.api_calls = 0
+        self.batch_calls = 0
+        self.response_bytes = 0
+        self._events = {}
+        # event id -> calendar id it lives in
+        self._calendars = {}
+        # event id -> version of its last change; cancelled events stay here
+        self._changes = {}
+        self._version = 0
+        self._oldest_valid_token = 0
+        self._lock = threading.Lock()
+
+    # ---- test helpers ----
+
+    def add_event(self, summary, start, end, all_day=False, calendar_id="primary", **extra):
+        """Insert an event directly (not counted as an API call)"""
+        key = "date" if all_day else "dateTime"
+        body = dict({"summary": summary, "start": {key: start}, "end": {key: end}}, **extra)
+        return self._insert(body, calendar_id)
+
+    def invalidate_sync_tokens(self):
+        """Make every outstanding sync token fail with 410 Gone"""
+        with self._lock:
+            self._oldest_valid_token = self._version + 1
+
+    def events(self):
+        return _Events(self)
+
+    def freebusy(self):
+        return _Freebusy(self)
+
+    def new_batch_http_request(self, callback=None):
+        return _Batch(self, callback)
+
+    # ---- API behaviour ----
+
+    def _bump(self, event_id):
+        self._version += 1
+        self._changes[event_id] = self._version
+
+    def _insert(self, body, calendar_id="primary"):
+        with self._lock:
+            event = copy.deepcopy(body)
+            event.setdefault("id", uuid.uuid4().hex)
+            event["status"] = "confirmed"
+            self._events[event["id"]] = event
+            self._calendars[event["id"]] = calendar_id
+            self._bump(event["id"])
+            return copy.deepcopy(event)
+
+    def _lookup(self, event_id, calendar_id):
+        event = self._events.get(event_id)
+        if event is None or self._calendars[event_id] != calendar_id:
+            raise _http_error(404, "Not Found")
+        return event
+
+    def _delete(self, event_id, calendar_id="primary"):
+        with self._lock:
+            event = self._lookup(event_id, calendar_id)
+            if event["status"] == "cancelled":
+                raise _http_error(410, "Resource has been deleted")
+            event["status"] = "cancelled"
+            self._bump(event_id)
+            return ""
+
+    def _get(self, event_id, calendar_id="primary"):
+        with self._lock:
+            return copy.deepcopy(self._lookup(event_id, calendar_id))
+
+    def _in_calendar(self, calendar_id):
+        return [e for event_id, e in self._events.items() if self._calendars[event_id] == calendar_id]
+
+    def _list(self, params):
+        with self._lock:
+            calendar_id = params.get("calendarId", "primary")
+            sync_token = params.get("syncToken")
+            if sync_token is not None:
+                since = int(sync_token)
+                if since < self._oldest_valid_token:
+                    raise _http_error(410, "Sync token is no longer valid, a full sync is required.")
+                items = [
+                    self._events[event_id] for event_id, version in self._changes.items()
+                    if version > since and self._calendars[event_id] == calendar_id
+                ]
+            else:
+                items = [e for e in self._in_calendar(calendar_id) if e["status"] != "cancelled"]
+                items = self._filter_window(items, params.get("timeMin"), params.get("timeMax"))
+                if params.get("orderBy") == "startTime":
+                    items.sort(key=lambda e: (event_bounds(e) or (0, 0))[0])
+
+            offset = int(params.get("pageToken") or 0)
+            # Like the real API, maxResults is an upper bound the server may lower
+            page_size = min(params.get("maxResults") or self.page_size, self.page_size)
+            page = items[offset:offset + page_size]
+
+            response = {"kind": "calendar#events", "summary": calendar_id, "items": copy.deepcopy(page)}
+            if offset + page_size < len(items):
+                response["nextPageToken"] = str(offset + page_size)
+            else:
+                response["nextSyncToken"] = str(self._version)
+            if params.get("fields"):
+                response = _select(response, _parse_fields(params["fields"]))
+            self.response_bytes += len(json.dumps(response))
+            return response
+
+    def _freebusy(self, body):
+        """Busy intervals per calendar, merged and clipped to the query window"""
+        with self._lock:
+            lower, upper = to_epoch(body["timeMin"]), to_epoch(body["timeMax"])
+            known = set(self._calendars.values()) | {"primary"}
+            calendars = {}
+            for item in body.get("items", []):
+                calendar_id = item["id"]
+                if calendar_id not in known:
+                    calendars[calendar_id] = {"errors": [{"domain": "global", "reason": "notFound"}], "busy": []}
+                    continue
+                spans = sorted(
+                    (max(bounds[0], lower), min(bounds[1], upper))
+                    for bounds in (event_bounds(e) for e in self._in_calendar(calendar_id)
+                                   if e["status"] != "cancelled" and e.get("transparency") != "transparent")
+                    if bounds and bounds[0] < upper and bounds[1] > lower
+                )
+                merged = []
+                for start, end in spans:
+                    if merged and start <= merged[-1][1]:
+                        merged[-1][1] = max(merged[-1][1], end)
+                    else:
+                        merged.append([start, end])
+                calendars[calendar_id] = {"busy": [{"start": _rfc3339(a), "end": _rfc3339(b)} for a, b in merged]}
+
+            response = {"kind": "calendar#freeBusy", "timeMin": body["timeMin"], "timeMax": body["timeMax"],
+                        "calendars": calendars}
+            self.response_bytes += len(json.dumps(response))
+            return response
+
+    @staticmethod
+    def _filter_window(items, time_min, time_max):
+        lower = to_epoch(time_min) if time_min else float("-inf")
+        upper = to_epoch(time_max) if time_max else float("inf")
+        selected = []
+        for event in items:
+            bounds = event_bounds(event)
+            if bounds and bounds[0] < upper and bounds[1] > lower:
+                selected.append(event)
+        return selected
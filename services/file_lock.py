@@ -0,0 +1,70 @@
+"""
+Cross-process file locks for POSIX (fcntl.flock) and Windows (msvcrt)
+
+msvcrt only has exclusive locks, so on Windows a shared lock excludes other
+shared holders too - correct, just less concurrent.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# How often a blocking msvcrt lock is retried
+_RETRY_SECONDS = 0.05
+
+
+def lock_file(lock_file, exclusive=True, blocking=True):
+    """
+    Lock an open file
+
+    Returns:
+        True, or False if blocking=False and another holder has it
+    """
+    if fcntl is not None:
+        flags = (fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH) | (0 if blocking else fcntl.LOCK_NB)
+        try:
+            fcntl.flock(lock_file, flags)
+        except BlockingIOError:
+            return False
+        return True
+
+    while True:
+        # msvcrt locks a byte range from the current position
+        lock_file.seek(0)
+        try:
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            if not blocking:
+                return False
+            time.sleep(_RETRY_SECONDS)
+
+
+def unlock_file(lock_file):
+    if fcntl is not None:
+        fcntl.flock(lock_file, fcntl.LOCK_UN)
+    else:
+        lock_file.seek(0)
+        msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def open_lock_file(path):
+    """Open (creating if needed) a file used only for locking"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    return open(path, "a+")
+
+
+@contextmanager
+def locked(path, exclusive=True):
+    """Hold a lock on the file at path for the duration of the block"""
+    with open_lock_file(path) as f:
+        lock_file(f, exclusive)
+        try:
+            yield
+        finally:
+            unlock_file(f)
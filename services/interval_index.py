@@ -0,0 +1,135 @@
+"""
+Static interval index for calendar overlap queries
+
+Intervals are half-open [start, end) epoch seconds, sorted by start and laid
+out as an implicit balanced BST: the node for range [lo, hi) sits at
+(lo + hi) // 2 and stores the largest end in its subtree. An overlap query
+prunes every subtree that starts too late or ends too early, so it costs
+O(log n + k) for k results. The index is rebuilt (O(n log n)) when the
+underlying events change - reads vastly outnumber writes here.
+"""
+import heapq
+from bisect import bisect_left
+
+from services.event_time import event_bounds
+
+# overlaps_many() jumps over longer gaps between slots with one tree query
+# instead of pushing every skipped interval through the heap
+SWEEP_MAX_STEP = 64
+
+
+class IntervalIndex:
+    """
+    Args:
+        items: Iterable of (start, end, value) tuples
+    """
+
+    def __init__(self, items=()):
+        items = sorted(items, key=lambda item: (item[0], item[1]))
+        self._starts = [item[0] for item in items]
+        self._ends = [item[1] for item in items]
+        self._values = [item[2] for item in items]
+        self._max_end = list(self._ends)
+        self._build()
+
+    @classmethod
+    def from_events(cls, events):
+        """Index Calendar event resources by their timezone-normalized bounds"""
+        items = []
+        for event in events:
+            bounds = event_bounds(event)
+            if bounds:
+                items.append((bounds[0], bounds[1], event))
+        return cls(items)
+
+    def __len__(self):
+        return len(self._starts)
+
+    def _build(self):
+        # Post-order over the implicit tree: children before parents
+        if not self._starts:
+            return
+        stack = [(0, len(self._starts), False)]
+        while stack:
+            lo, hi, children_done = stack.pop()
+            mid = (lo + hi) // 2
+            if not children_done:
+                stack.append((lo, hi, True))
+                if lo < mid:
+                    stack.append((lo, mid, False))
+                if mid + 1 < hi:
+                    stack.append((mid + 1, hi, False))
+                continue
+            best = self._ends[mid]
+            if lo < mid:
+                best = max(best, self._max_end[(lo + mid) // 2])
+            if mid + 1 < hi:
+                best = max(best, self._max_end[(mid + 1 + hi) // 2])
+            self._max_end[mid] = best
+
+    def _overlapping_positions(self, start, end):
+        starts, ends, max_end = self._starts, self._ends, self._max_end
+        found = []
+        stack = [(0, len(starts))]
+        while stack:
+            lo, hi = stack.pop()
+            if lo >= hi or starts[lo] >= end:
+                continue
+            mid = (lo + hi) // 2
+            if max_end[mid] <= start:
+                continue
+            if mid + 1 < hi:
+                stack.append((mid + 1, hi))
+            if starts[mid] < end and ends[mid] > start:
+                found.append(mid)
+            if lo < mid:
+                stack.append((lo, mid))
+        found.sort()
+        return found
+
+    def overlaps(self, start, end):
+        """Values whose interval overlaps [start, end), in start order"""
+        return [self._values[i] for i in self._overlapping_positions(start, end)]
+
+    def has_overlap(self, start, end):
+        return bool(self._overlapping_positions(start, end))
+
+    def overlaps_many(self, slots):
+        """
+        Answer several overlap queries in one sweep
+
+        Slots are visited in start order. Intervals that began before the
+        current slot wait on a heap keyed by end until they finish, so each
+        is pushed and popped once over the whole batch; those that begin
+        inside the slot are a run of the sorted starts found by bisection.
+        Sparse slots skip ahead with a tree query for the intervals still
+        running at the slot's start.
+
+        Args:
+            slots: Iterable of (start, end) candidate slots
+
+        Returns:
+            List with one result list per slot, in the same order
+        """
+        slots = list(slots)
+        starts, ends, values = self._starts, self._ends, self._values
+        results = [None] * len(slots)
+        ongoing = []  # (end, position) of intervals that began before the slot
+        position = 0
+        for query in sorted(range(len(slots)), key=lambda q: slots[q][0]):
+            start, end = slots[query]
+            first_inside = bisect_left(starts, start, lo=position)
+            if first_inside - position > SWEEP_MAX_STEP:
+                ongoing = [(ends[i], i) for i in self._overlapping_positions(start, start)]
+                heapq.heapify(ongoing)
+                position = first_inside
+            while position < first_inside:
+                heapq.heappush(ongoing, (ends[position], position))
+                position += 1
+            while ongoing and ongoing[0][0] <= start:
+                heapq.heappop(ongoing)
+            found = sorted(i for interval_end, i in ongoing if starts[i] < end)
+            # ends > start only rules out zero-length intervals at the slot's start
+            found.extend(i for i in range(position, bisect_left(starts, end, lo=position)) if ends[i] > start)
+            results[query] = [values[i] for i in found]
+        return results
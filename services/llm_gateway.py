@@ -0,0 +1,318 @@
+"""
+Single entry point for every Gemini call
+
+- Clients are created lazily on first use and shared by all chains
+- Every call runs with a timeout and under a process-wide concurrency cap
+- Per-chain latency histograms and token counts go to services.metrics
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from dotenv import load_dotenv
+from langchain_core.callbacks import BaseCallbackHandler
+
+from services import metrics
+
+load_dotenv()
+
+DEFAULT_MODEL = os.getenv("GEMINI_MODEL", "gemini-flash-latest")
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "20"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+
+
+class LLMTimeoutError(TimeoutError):
+    """Raised when a Gemini call (or waiting for a free slot) exceeds its timeout"""
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+_genai_configured = False
+
+# A slot is held until the underlying call really finishes, so a hung call
+# keeps counting against the cap even after its caller has given up on it
+_slots = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+_executor = ThreadPoolExecutor(max_workers=LLM_MAX_CONCURRENCY, thread_name_prefix="llm")
+# Async callers wait for a slot here, so their event loop stays free
+_slot_waiters = ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) + 4), thread_name_prefix="llm-wait")
+
+# Marks the end of a stream read on the LLM pool
+_END = object()
+
+
+def get_chat_model(model=DEFAULT_MODEL, temperature=0):
+    """
+    Return the shared LangChain Gemini client for (model, temperature)
+
+    The client is created on first use; the HTTP-level timeout matches
+    LLM_TIMEOUT_SECONDS so abandoned calls eventually free their slot.
+    """
+    key = ("langchain", model, temperature)
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                from langchain_google_genai import ChatGoogleGenerativeAI
+
+                client = ChatGoogleGenerativeAI(
+                    model=model,
+                    temperature=temperature,
+                    timeout=LLM_TIMEOUT_SECONDS,
+                    max_retries=1,
+                )
+                _clients[key] = client
+    return client
+
+
+def get_genai_model(model=DEFAULT_MODEL):
+    """Return the shared google.generativeai model (used by gemini_parser)"""
+    global _genai_configured
+    key = ("genai", model)
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                import google.generativeai as genai
+
+                if not _genai_configured:
+                    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+                    _genai_configured = True
+                client = _clients[key] = genai.GenerativeModel(model)
+    return client
+
+
+def _record_tokens(chain_name, prompt_tokens, completion_tokens, estimated=False):
+    suffix = ".estimated" if estimated else ""
+    metrics.incr(f"llm.{chain_name}.prompt_tokens{suffix}", prompt_tokens)
+    metrics.incr(f"llm.{chain_name}.completion_tokens{suffix}", completion_tokens)
+
+
+class _UsageHandler(BaseCallbackHandler):
+    """
+    Collects token counts from LangChain chat model runs
+
+    Uses the usage metadata the client reports when available and falls back
+    to a 4-characters-per-token estimate otherwise.
+    """
+
+    def __init__(self, chain_name):
+        self.chain_name = chain_name
+        self.prompt_chars = 0
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.prompt_chars = sum(len(str(m.content)) for batch in messages for m in batch)
+
+    def on_llm_end(self, response, **kwargs):
+        usage = (response.llm_output or {}).get("usage_metadata") or {}
+        completion_chars = 0
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                usage = usage or getattr(message, "usage_metadata", None) or {}
+                completion_chars += len(generation.text or "")
+
+        if usage:
+            _record_tokens(
+                self.chain_name,
+                usage.get("input_tokens", usage.get("prompt_token_count", 0)),
+                usage.get("output_tokens", usage.get("candidates_token_count", 0)),
+            )
+        else:
+            _record_tokens(self.chain_name, self.prompt_chars // 4, completion_chars // 4, estimated=True)
+
+
+def _submit(chain_name, fn):
+    """Run fn on the LLM pool; the slot (already held) is released when it finishes"""
+    try:
+        future = _executor.submit(fn)
+    except Exception:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    metrics.incr(f"llm.{chain_name}.calls")
+    return future
+
+
+def call(chain_name, fn, timeout=None):
+    """
+    Run fn() under the concurrency cap with a timeout
+
+    Args:
+        chain_name: Name used for metrics ("intent", "rag", ...)
+        fn: Zero-argument callable that performs the LLM request
+        timeout: Seconds to wait, including time spent waiting for a slot
+
+    Returns:
+        Whatever fn() returns
+
+    Raises:
+        LLMTimeoutError: if no slot frees up or the call doesn't finish in time
+    """
+    timeout = LLM_TIMEOUT_SECONDS if timeout is None else timeout
+    start = time.monotonic()
+
+    if not _slots.acquire(timeout=timeout):
+        metrics.incr(f"llm.{chain_name}.rejected")
+        raise LLMTimeoutError(f"No free LLM slot for '{chain_name}' within {timeout}s")
+
+    future = _submit(chain_name, fn)
+    try:
+        remaining = max(0.0, timeout - (time.monotonic() - start))
+        return future.result(timeout=remaining)
+    except FutureTimeoutError:
+        metrics.incr(f"llm.{chain_name}.timeouts")
+        raise LLMTimeoutError(f"LLM call '{chain_name}' timed out after {timeout}s")
+    except Exception:
+        metrics.incr(f"llm.{chain_name}.errors")
+        raise
+    finally:
+        metrics.observe(f"llm.{chain_name}", (time.monotonic() - start) * 1000)
+
+
+def _release_if_acquired(waiter):
+    if not waiter.cancelled() and waiter.exception() is None and waiter.result():
+        _slots.release()
+
+
+async def _acquire_slot(timeout):
+    """
+    Wait up to timeout seconds for a slot without blocking the event loop
+
+    If the waiting task is cancelled, a slot the waiter thread still gets
+    afterwards is handed back instead of being leaked.
+    """
+    if _slots.acquire(blocking=False):
+        return True
+    waiter = _slot_waiters.submit(_slots.acquire, timeout=timeout)
+    try:
+        return await asyncio.wrap_future(waiter)
+    except asyncio.CancelledError:
+        waiter.add_done_callback(_release_if_acquired)
+        raise
+
+
+async def acall(chain_name, fn, timeout=None):
+    """
+    Async variant of call()
+
+    The blocking client still runs on the LLM pool, but the caller's event
+    loop is free while it waits, so one loop can have many calls in flight.
+    """
+    timeout = LLM_TIMEOUT_SECONDS if timeout is None else timeout
+    start = time.monotonic()
+
+    if not await _acquire_slot(timeout):
+        metrics.incr(f"llm.{chain_name}.rejected")
+        raise LLMTimeoutError(f"No free LLM slot for '{chain_name}' within {timeout}s")
+
+    future = _submit(chain_name, fn)
+    try:
+        remaining = max(0.0, timeout - (time.monotonic() - start))
+        return await asyncio.wait_for(asyncio.wrap_future(future), remaining)
+    except asyncio.TimeoutError:
+        metrics.incr(f"llm.{chain_name}.timeouts")
+        raise LLMTimeoutError(f"LLM call '{chain_name}' timed out after {timeout}s")
+    except Exception:
+        metrics.incr(f"llm.{chain_name}.errors")
+        raise
+    finally:
+        metrics.observe(f"llm.{chain_name}", (time.monotonic() - start) * 1000)
+
+
+def invoke(chain_name, runnable, inputs, timeout=None):
+    """Invoke a LangChain runnable through the gateway"""
+    config = {"callbacks": [_UsageHandler(chain_name)], "run_name": chain_name}
+    return call(chain_name, lambda: runnable.invoke(inputs, config=config), timeout)
+
+
+async def ainvoke(chain_name, runnable, inputs, timeout=None):
+    """Async variant of invoke()"""
+    config = {"callbacks": [_UsageHandler(chain_name)], "run_name": chain_name}
+    return await acall(chain_name, lambda: runnable.invoke(inputs, config=config), timeout)
+
+
+def _close_stream(chunks):
+    """Close a finished or abandoned stream and free its slot"""
+    try:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+    finally:
+        _slots.release()
+
+
+def stream(chain_name, runnable, inputs, timeout=None):
+    """
+    Stream chunks from a LangChain runnable through the gateway
+
+    Like call(), the whole stream has to finish within timeout (including
+    the wait for a slot), otherwise LLMTimeoutError is raised. Chunks are
+    read on the LLM pool, and the slot is held until the underlying stream
+    is exhausted or closed. Time to first token is recorded as
+    llm.<chain>.ttft next to the total latency.
+    """
+    timeout = LLM_TIMEOUT_SECONDS if timeout is None else timeout
+    start = time.monotonic()
+
+    if not _slots.acquire(timeout=timeout):
+        metrics.incr(f"llm.{chain_name}.rejected")
+        raise LLMTimeoutError(f"No free LLM slot for '{chain_name}' within {timeout}s")
+
+    metrics.incr(f"llm.{chain_name}.calls")
+    config = {"callbacks": [_UsageHandler(chain_name)], "run_name": chain_name}
+    chunks = iter(runnable.stream(inputs, config=config))
+    pending = None
+    first_chunk = True
+    try:
+        while True:
+            pending = _executor.submit(next, chunks, _END)
+            try:
+                chunk = pending.result(timeout=max(0.0, timeout - (time.monotonic() - start)))
+            except FutureTimeoutError:
+                metrics.incr(f"llm.{chain_name}.timeouts")
+                raise LLMTimeoutError(f"LLM stream '{chain_name}' timed out after {timeout}s") from None
+            except Exception:
+                metrics.incr(f"llm.{chain_name}.errors")
+                raise
+            pending = None
+            if chunk is _END:
+                break
+            if first_chunk:
+                metrics.observe(f"llm.{chain_name}.ttft", (time.monotonic() - start) * 1000)
+                first_chunk = False
+            yield chunk
+    finally:
+        if pending is None:
+            _close_stream(chunks)
+        else:
+            # A read is still running on the pool: the slot stays taken until it returns
+            pending.add_done_callback(lambda _: _close_stream(chunks))
+        metrics.observe(f"llm.{chain_name}", (time.monotonic() - start) * 1000)
+
+
+def generate_content(chain_name, prompt, timeout=None, **kwargs):
+    """Call the google.generativeai model through the gateway"""
+    timeout = LLM_TIMEOUT_SECONDS if timeout is None else timeout
+    model = get_genai_model()
+    response = call(
+        chain_name,
+        lambda: model.generate_content(prompt, request_options={"timeout": timeout}, **kwargs),
+        timeout,
+    )
+
+    usage = getattr(response, "usage_metadata", None)
+    if usage is not None:
+        _record_tokens(chain_name, usage.prompt_token_count, usage.candidates_token_count)
+    return response
+
+
+def get_stats():
+    """Latency histograms, call/timeout counters and token counts per chain"""
+    stats = metrics.snapshot("llm.")
+    stats["max_concurrency"] = LLM_MAX_CONCURRENCY
+    stats["timeout_seconds"] = LLM_TIMEOUT_SECONDS
+    return stats
@@ -0,0 +1,188 @@
+"""
+Leveled, non-blocking logging
+
+Callers only format the record and put it on a bounded queue; a background
+listener thread writes it to stdout, so a request never waits on the
+terminal or the log collector. If the queue is full the record is dropped
+and counted (log.dropped) instead of blocking.
+
+Every record carries the id of the request it was logged in (see
+set_request_id), "-" outside requests.
+
+- LOG_LEVEL: default level (INFO)
+- LOG_LEVELS: per-logger levels, e.g. "services.calendar_service=DEBUG,rag=WARNING"
+- LOG_FORMAT: "text" or "json" (one object per line)
+- LOG_SAMPLE_RATE: share of sampled() debug lines that are kept
+- LOG_QUEUE_SIZE: records buffered before new ones are dropped
+"""
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import uuid
+from logging.handlers import QueueHandler, QueueListener
+
+from services import metrics
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.01"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+TEXT_FORMAT = "%(asctime)s %(levelname)-7s %(name)s [%(request_id)s] %(message)s"
+
+_request_id = contextvars.ContextVar("request_id", default="-")
+
+_setup_lock = threading.Lock()
+_handler = None
+_listener = None
+
+# Attributes every LogRecord has; anything else came in through extra=
+_RECORD_FIELDS = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id"}
+
+
+def set_request_id(request_id=None):
+    """
+    Tag records logged in the current context with a request id
+
+    Returns:
+        Token for reset_request_id()
+    """
+    return _request_id.set(request_id or uuid.uuid4().hex[:12])
+
+
+def reset_request_id(token):
+    _request_id.reset(token)
+
+
+def get_request_id():
+    return _request_id.get()
+
+
+class _RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        return True
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that drops records instead of waiting on a full queue"""
+
+    def prepare(self, record):
+        # Only the message and traceback are rendered here, in the caller's
+        # thread (the arguments may change later); the rest is up to the
+        # listener's formatter
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg, record.args, record.exc_info = record.message, None, None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.incr("log.dropped")
+
+
+class _StdoutHandler(logging.StreamHandler):
+    """Writes to whatever sys.stdout is at the time (test runners swap it)"""
+
+    def __init__(self):
+        super().__init__(sys.stdout)
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, including any extra= fields"""
+
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+def _parse_levels(spec):
+    levels = {}
+    for item in spec.split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging(level=None, levels=None, fmt=None, queue_size=None):
+    """
+    Route the root logger through the queue and start the writer thread
+
+    Safe to call more than once; later calls only change levels. Arguments
+    default to the LOG_* settings.
+
+    Args:
+        level: Root level name
+        levels: {logger name: level name} or a LOG_LEVELS style string
+        fmt: "text" or "json"
+        queue_size: Records buffered before new ones are dropped
+    """
+    global _handler, _listener
+    root = logging.getLogger()
+    root.setLevel(level or LOG_LEVEL)
+    levels = levels if levels is not None else LOG_LEVELS
+    for name, name_level in (_parse_levels(levels) if isinstance(levels, str) else levels).items():
+        logging.getLogger(name).setLevel(name_level)
+
+    with _setup_lock:
+        if _handler is not None:
+            return
+        output = _StdoutHandler()
+        output.setFormatter(JsonFormatter() if (fmt or LOG_FORMAT) == "json" else logging.Formatter(TEXT_FORMAT))
+        records = queue.Queue(queue_size or LOG_QUEUE_SIZE)
+        _handler = _NonBlockingQueueHandler(records)
+        _handler.addFilter(_RequestIdFilter())
+        root.addHandler(_handler)
+        _listener = QueueListener(records, output, respect_handler_level=True)
+        _listener.start()
+        # Flush what is still queued when the process exits
+        atexit.register(_listener.stop)
+
+
+def get_logger(name):
+    """logging.getLogger(name), setting up the queue on first use"""
+    if _handler is None:
+        setup_logging()
+    return logging.getLogger(name)
+
+
+def sampled(logger, msg, *args, rate=None):
+    """
+    logger.debug() for lines logged once per item (event, chunk, ...):
+    only `rate` of them (default LOG_SAMPLE_RATE) are kept, and nothing is
+    formatted unless DEBUG is enabled for the logger
+    """
+    if logger.isEnabledFor(logging.DEBUG) and random.random() < (LOG_SAMPLE_RATE if rate is None else rate):
+        logger.debug(msg, *args, stacklevel=2)
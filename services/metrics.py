@@ -0,0 +1,93 @@
+"""
+In-process latency histograms and counters
+
+Every worker keeps its own numbers; app.py exposes them on /metrics.
+"""
+import threading
+
+# Histogram bucket upper bounds in milliseconds
+BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, float("inf"))
+
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+
+
+class Histogram:
+    """Fixed-bucket latency histogram"""
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS_MS)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value_ms):
+        for i, bound in enumerate(BUCKETS_MS):
+            if value_ms <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.total += value_ms
+        self.max = max(self.max, value_ms)
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given percentile"""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        running = 0
+        for bound, count in zip(BUCKETS_MS, self.counts):
+            running += count
+            if running >= target:
+                return min(bound, self.max)
+        return self.max
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count, 2) if self.count else 0.0,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "max_ms": round(self.max, 2),
+            "buckets": {
+                ("+inf" if bound == float("inf") else str(bound)): count
+                for bound, count in zip(BUCKETS_MS, self.counts)
+            },
+        }
+
+
+def observe(name, value_ms):
+    """Record a latency sample (milliseconds) under the given name"""
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = Histogram()
+        histogram.observe(value_ms)
+
+
+def incr(name, amount=1):
+    """Increment a named counter"""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def snapshot(prefix=""):
+    """Return all histograms and counters whose name starts with prefix"""
+    with _lock:
+        return {
+            "latency": {
+                name: histogram.snapshot()
+                for name, histogram in sorted(_histograms.items())
+                if name.startswith(prefix)
+            },
+            "counters": {
+                name: value for name, value in sorted(_counters.items()) if name.startswith(prefix)
+            },
+        }
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
@@ -0,0 +1,25 @@
+"""
+Shared SQLite connection helper for the on-disk stores
+"""
+import os
+import sqlite3
+
+
+def connect(path):
+    """
+    Open a SQLite connection suitable for sharing between threads and processes
+
+    Args:
+        path: Database file path (parent directory is created if needed)
+
+    Returns:
+        sqlite3.Connection in autocommit mode with WAL journaling
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
@@ -0,0 +1,187 @@
+"""
+Short-lived key/value state with TTL expiry (OAuth login state)
+
+Entries are written once at /login and read once at /oauth2callback, so the
+stores only need O(1) put/get/delete plus a cheap sweep of abandoned
+entries. The SQLite backend is shared by every worker process on the host.
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from services.sqlite_db import connect
+
+OAUTH_STATE_TTL_SECONDS = int(os.getenv("OAUTH_STATE_TTL", "600"))
+
+# Sweep expired entries once every this many writes
+SWEEP_EVERY = 64
+
+
+class MemoryStateBackend:
+    """
+    State kept in this process only (single worker or tests)
+
+    Every entry has the same TTL, so insertion order is expiry order and a
+    sweep only has to look at the oldest entries.
+    """
+
+    def __init__(self):
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, key, value, expires_at):
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (value, expires_at)
+
+    def get(self, key, now):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= now:
+                del self._data[key]
+                return None
+            return entry[0]
+
+    def pop(self, key, now):
+        with self._lock:
+            entry = self._data.pop(key, None)
+        if entry is None or entry[1] <= now:
+            return None
+        return entry[0]
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def sweep(self, now):
+        removed = 0
+        with self._lock:
+            while self._data:
+                key, (_, expires_at) = next(iter(self._data.items()))
+                if expires_at > now:
+                    break
+                del self._data[key]
+                removed += 1
+        return removed
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteStateBackend:
+    """State shared by every worker process on the host"""
+
+    def __init__(self, path):
+        self._conn = connect(path)
+        self._lock = threading.Lock()
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS state ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS state_expiry ON state(expires_at)")
+
+    def put(self, key, value, expires_at):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO state (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, expires_at),
+            )
+
+    def get(self, key, now):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM state WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+        return row[0] if row else None
+
+    def pop(self, key, now):
+        # One statement, so two workers can never both consume the same key
+        with self._lock:
+            row = self._conn.execute(
+                "DELETE FROM state WHERE key = ? RETURNING value, expires_at", (key,)
+            ).fetchone()
+        if row is None or row[1] <= now:
+            return None
+        return row[0]
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM state WHERE key = ?", (key,))
+
+    def sweep(self, now):
+        with self._lock:
+            return self._conn.execute("DELETE FROM state WHERE expires_at <= ?", (now,)).rowcount
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM state").fetchone()[0]
+
+
+class StateStore:
+    """
+    JSON values with a fixed time-to-live
+
+    Args:
+        backend: MemoryStateBackend or SQLiteStateBackend
+        ttl: Seconds an entry stays readable
+    """
+
+    def __init__(self, backend, ttl=OAUTH_STATE_TTL_SECONDS):
+        self.backend = backend
+        self.ttl = ttl
+        self._writes = 0
+        self._lock = threading.Lock()
+        self.stats = {"puts": 0, "hits": 0, "misses": 0, "swept": 0}
+
+    def put(self, key, value):
+        self.backend.put(key, json.dumps(value), time.time() + self.ttl)
+        with self._lock:
+            self.stats["puts"] += 1
+            self._writes += 1
+            sweep_now = self._writes % SWEEP_EVERY == 0
+        if sweep_now:
+            self.sweep()
+
+    def _count(self, raw):
+        with self._lock:
+            self.stats["hits" if raw is not None else "misses"] += 1
+        return json.loads(raw) if raw is not None else None
+
+    def get(self, key):
+        return self._count(self.backend.get(key, time.time()))
+
+    def pop(self, key):
+        """Read and delete in one step (single-use state)"""
+        return self._count(self.backend.pop(key, time.time()))
+
+    def delete(self, key):
+        self.backend.delete(key)
+
+    def sweep(self):
+        """Remove expired entries; returns how many were dropped"""
+        removed = self.backend.sweep(time.time())
+        with self._lock:
+            self.stats["swept"] += removed
+        return removed
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats["entries"] = len(self.backend)
+        stats["backend"] = type(self.backend).__name__
+        stats["ttl_seconds"] = self.ttl
+        return stats
+
+
+def _build_default_store():
+    if os.getenv("OAUTH_STATE_BACKEND", "sqlite") == "memory":
+        backend = MemoryStateBackend()
+    else:
+        backend = SQLiteStateBackend(os.getenv("OAUTH_STATE_PATH", "cache/oauth_state.sqlite3"))
+    return StateStore(backend)
+
+
+oauth_state_store = _build_default_store()
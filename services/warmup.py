@@ -0,0 +1,102 @@
+"""
+Opt-in background warm-up of the heavy, lazily loaded components
+
+With WARMUP_ON_START=1 the app starts a daemon thread at import that loads
+the router, the Gemini clients, the embedding model and the vector store,
+so the first user doesn't pay for them. /healthz/ready reports per-component
+status and load time and only returns 200 once everything is loaded.
+"""
+import os
+import threading
+import time
+
+from services import metrics
+from services.log import get_logger
+
+logger = get_logger(__name__)
+
+WARMUP_ON_START = os.getenv("WARMUP_ON_START", "0") == "1"
+
+
+def _load_router():
+    import router  # noqa: F401 - importing pulls in handlers and parsers
+
+
+def _load_llm_clients():
+    from services import llm_gateway
+
+    llm_gateway.get_chat_model()
+    llm_gateway.get_genai_model()
+
+
+def _load_embeddings():
+    from rag.rag_store import get_embeddings
+
+    get_embeddings().embed_query("warm-up")
+
+
+def _load_vectorstore():
+    from rag.rag_pipeline import get_rag_chain
+
+    get_rag_chain()
+
+
+# Loaded in this order; later components reuse what earlier ones loaded
+COMPONENTS = [
+    ("router", _load_router),
+    ("llm_clients", _load_llm_clients),
+    ("embeddings", _load_embeddings),
+    ("vectorstore", _load_vectorstore),
+]
+
+_lock = threading.Lock()
+_status = {name: {"status": "not_started"} for name, _ in COMPONENTS}
+_thread = None
+
+
+def _set(name, **fields):
+    with _lock:
+        _status[name] = fields
+
+
+def _run():
+    for name, load in COMPONENTS:
+        _set(name, status="loading")
+        start = time.monotonic()
+        try:
+            load()
+        except Exception as e:
+            elapsed_ms = (time.monotonic() - start) * 1000
+            logger.error("%s failed after %.0f ms: %s", name, elapsed_ms, e)
+            _set(name, status="failed", load_ms=round(elapsed_ms, 1), error=str(e))
+            continue
+        elapsed_ms = (time.monotonic() - start) * 1000
+        metrics.observe(f"warmup.{name}", elapsed_ms)
+        logger.info("%s ready in %.0f ms", name, elapsed_ms)
+        _set(name, status="ready", load_ms=round(elapsed_ms, 1))
+
+
+def start_warmup():
+    """Start the warm-up thread (no-op if it's already running or done)"""
+    global _thread
+    with _lock:
+        if _thread is not None:
+            return
+        _thread = threading.Thread(target=_run, name="warmup", daemon=True)
+    _thread.start()
+
+
+def readiness():
+    """
+    Returns:
+        {"ready": bool, "warmup_enabled": bool, "components": {name: status}}
+
+    Without warm-up every component loads lazily on first use, so the worker
+    counts as ready straight away. A failed component also counts as done:
+    it will be retried lazily by the first request that needs it.
+    """
+    with _lock:
+        components = {name: dict(status) for name, status in _status.items()}
+        started = _thread is not None
+    ready = not started or all(c["status"] in ("ready", "failed") for c in components.values())
+    return {"ready": ready, "warmup_enabled": started, "components": components}
@@ -86,6 +86,54 @@ document.addEventListener('DOMContentLoaded', () => {
     form.parentNode.insertBefore(quickActionsDiv, form);
   }
 
+  function renderResult(data) {
+    if (data.error) {
+      appendMessage('❌ ' + (data.error || 'An error occurred'), 'assistant');
+    } else if (data.response) {
+      appendMessage(data.response, 'assistant');
+    } else {
+      appendMessage(JSON.stringify(data), 'assistant');
+    }
+  }
+
+  // Read server-sent events from /chat/stream, rendering tokens as they arrive
+  async function readStream(res, typingIndicator) {
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let streamed = null;
+
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      let boundary;
+      while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+        const raw = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+        if (!raw.startsWith('data: ')) continue;
+
+        const frame = JSON.parse(raw.slice(6));
+        if (frame.type === 'token') {
+          if (!streamed) {
+            removeTypingIndicator(typingIndicator);
+            streamed = appendMessage('', 'assistant');
+          }
+          streamed.textContent += frame.text;
+        } else if (frame.type === 'final') {
+          removeTypingIndicator(typingIndicator);
+          if (frame.metrics) {
+            console.debug('[chat] timings', frame.metrics);
+          }
+          if (!streamed || frame.error) {
+            renderResult(frame);
+          }
+        }
+      }
+    }
+  }
+
   async function sendMessage(message) {
     if (isProcessing) return;
     
@@ -95,29 +143,27 @@ document.addEventListener('DOMContentLoaded', () => {
     const typingIndicator = showTypingIndicator();
     
     try {
-      const res = await fetch('/chat', {
+      const res = await fetch('/chat/stream', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ message })
       });
       
-      removeTypingIndicator(typingIndicator);
-      
       if (res.status === 401) {
+        removeTypingIndicator(typingIndicator);
         loginBtn.style.display = 'inline-block';
         appendMessage('🔐 Please login with Google Calendar to manage events. You can still ask general questions!', 'assistant');
         return;
       }
-      
-      const data = await res.json();
-      
-      if (data.error) {
-        appendMessage('❌ ' + (data.error || 'An error occurred'), 'assistant');
-      } else if (data.response) {
-        appendMessage(data.response, 'assistant');
-      } else {
-        appendMessage(JSON.stringify(data), 'assistant');
+
+      const contentType = res.headers.get('Content-Type') || '';
+      if (res.body && contentType.startsWith('text/event-stream')) {
+        await readStream(res, typingIndicator);
+        return;
       }
+
+      removeTypingIndicator(typingIndicator);
+      renderResult(await res.json());
     } catch (e) {
       removeTypingIndicator(typingIndicator);
       appendMessage('⚠️ Network error: ' + e.message, 'assistant');
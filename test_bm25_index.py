@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Checks for the lexical-first retrieval path (rag/bm25_index.py)
+"""
+import os
+import tempfile
+
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from rag.bm25_index import BM25Index, reciprocal_rank_fusion
+from rag.rag_ingest import KnowledgeIngestor
+from rag.rag_pipeline import LockedRetriever
+from rag.rag_store import build_lexical_index
+from services import metrics
+
+TEXTS = [
+    "OAuth tokens are refreshed in the background before they expire.",
+    "Events default to the Asia/Kolkata timezone unless another is given.",
+    "If no duration is given, events last one hour.",
+    "Deleting an event needs explicit confirmation from the user.",
+]
+
+
+class CountingEmbedding(DeterministicFakeEmbedding):
+    queries: int = 0
+
+    def embed_query(self, text):
+        self.queries += 1
+        return super().embed_query(text)
+
+
+def _retriever():
+    embeddings = CountingEmbedding(size=16)
+    store = FAISS.from_texts(TEXTS, embeddings)
+    return LockedRetriever(vectorstore=store, k=2, lexical=build_lexical_index(store)), embeddings
+
+
+def test_bm25_ranks_and_removes():
+    index = BM25Index()
+    for i, text in enumerate(TEXTS):
+        index.add(i, text)
+    assert index.search("timezone")[0][0] == 1
+    assert index.search("how long do events last?")[0][0] == 2
+    assert index.search("calendar sharing") == []
+
+    index.remove(1)
+    assert index.search("timezone") == [] and len(index) == 3
+    assert "kolkata" not in index.postings
+
+
+def test_confidence_needs_short_query_with_known_terms():
+    index = BM25Index()
+    for i, text in enumerate(TEXTS):
+        index.add(i, text)
+    assert index.confident("OAuth", index.search("OAuth"))
+    assert not index.confident("OAuth scopes", index.search("OAuth scopes"))
+    long_question = "how long do events last when nobody says a duration"
+    assert not index.confident(long_question, index.search(long_question))
+
+
+def test_keyword_query_skips_the_embedding_model():
+    metrics.reset()
+    retriever, embeddings = _retriever()
+    docs = retriever.invoke("OAuth")
+    assert docs[0].page_content == TEXTS[0]
+    assert embeddings.queries == 0
+    assert metrics.snapshot("rag.retrieve.")["latency"]["rag.retrieve.lexical"]["count"] == 1
+
+
+def test_long_question_is_fused_with_dense_results():
+    metrics.reset()
+    retriever, embeddings = _retriever()
+    docs = retriever.invoke("how long do events last when nobody says a duration")
+    assert embeddings.queries == 1
+    assert len(docs) == 2 and TEXTS[2] in [d.page_content for d in docs]
+    assert "rag.retrieve.hybrid" in metrics.snapshot("rag.retrieve.")["latency"]
+
+
+def test_rrf_prefers_items_ranked_well_by_both():
+    fused = reciprocal_rank_fusion([["a", "b"], ["b", "c"]])
+    assert fused[0] == "b" and set(fused) == {"a", "b", "c"}
+
+
+def test_ingestion_keeps_the_lexical_index_in_sync():
+    embeddings = DeterministicFakeEmbedding(size=16)
+    store = FAISS.from_texts(TEXTS, embeddings)
+    lexical = build_lexical_index(store)
+    with tempfile.TemporaryDirectory() as kb:
+        ingestor = KnowledgeIngestor(store, directory=kb, embeddings=embeddings, lexical=lexical)
+        with open(os.path.join(kb, "holidays.md"), "w") as f:
+            f.write("The office is closed on Diwali.")
+        ingestor.sync()
+        assert lexical.search("Diwali")[0][0] == "kb:holidays.md#0"
+
+        os.remove(os.path.join(kb, "holidays.md"))
+        ingestor.sync()
+        assert lexical.search("Diwali") == []
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Checks for batched Calendar mutations (calendar_service.batch_mutations /
+replace_events) against FakeCalendarService.
+"""
+from google.oauth2.credentials import Credentials
+
+from services import calendar_service
+from services.calendar_service import batch_mutations, build_calendar_service, replace_events
+from services.fake_calendar import FakeCalendarService
+
+
+def _service_with_conflicts(count):
+    service = FakeCalendarService()
+    ids = [
+        service.add_event(f"Conflict {i}", "2030-01-01T10:00:00Z", "2030-01-01T11:00:00Z")["id"]
+        for i in range(count)
+    ]
+    return service, ids
+
+
+def test_replace_events_is_one_round_trip():
+    service, ids = _service_with_conflicts(3)
+
+    report = replace_events(service, ids, "New", "2030-01-01T10:00:00", "2030-01-01T11:00:00")
+
+    assert service.api_calls == 1
+    assert sorted(report["deleted"]) == sorted(ids)
+    assert report["created"]["summary"] == "New"
+    assert report["delete_errors"] == {} and report["create_error"] is None
+
+
+def test_partial_failure_is_reported_per_item():
+    service, ids = _service_with_conflicts(2)
+    service.events().delete(eventId=ids[0]).execute()
+
+    report = replace_events(service, ids + ["missing"], "New", "2030-01-01T10:00:00", "2030-01-01T11:00:00")
+
+    assert report["deleted"] == [ids[1]]
+    assert set(report["delete_errors"]) == {ids[0], "missing"}
+    assert report["created"] is not None
+
+
+def test_large_batches_are_split():
+    service = FakeCalendarService()
+    requests = [
+        (str(i), service.events().insert(calendarId="primary", body={"summary": str(i)}))
+        for i in range(calendar_service.BATCH_LIMIT * 2 + 1)
+    ]
+    report = batch_mutations(service, requests)
+    assert len(report["results"]) == len(requests)
+    assert service.batch_calls == 3
+
+
+def test_conflict_resolution_uses_batch(monkeypatch):
+    from handlers import conflict_resolution
+
+    service, ids = _service_with_conflicts(2)
+    monkeypatch.setattr(conflict_resolution, "get_service_for_session", lambda session: service)
+    monkeypatch.setattr(conflict_resolution, "session_user_id", lambda session: "u1")
+
+    result = conflict_resolution.handle_conflict_resolution(
+        "delete and create",
+        {"title": "New", "start": "2030-01-01T10:00:00", "end": "2030-01-01T11:00:00"},
+        [{"id": event_id} for event_id in ids],
+        session={},
+    )
+
+    assert "Deleted 2 conflicting event(s)" in result["response"]
+    assert service.api_calls == 1
+
+
+def test_real_service_builds_batches():
+    service = build_calendar_service(Credentials(token="dummy"))
+    batch = service.new_batch_http_request()
+    assert batch._batch_uri.endswith("batch/calendar/v3")
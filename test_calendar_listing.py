@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Checks for the streaming, field-masked event listing (services/calendar_service.py)
+
+Events carry the descriptions, attendees and conference data real calendars
+have, so FakeCalendarService.response_bytes shows what the masks save.
+"""
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+
+from services.calendar_service import MATCH_FIELDS, check_conflicts, event_matcher, iter_events, list_events
+from services.fake_calendar import FakeCalendarService
+
+
+def _iso(moment):
+    return moment.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _busy_calendar(count=600, page_size=250):
+    service = FakeCalendarService(page_size=page_size)
+    base = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+    for i in range(count):
+        start = base + timedelta(minutes=30 * i)
+        service.add_event(
+            f"Meeting {i}", _iso(start), _iso(start + timedelta(minutes=30)),
+            description="Agenda: " + "discuss the roadmap and open questions. " * 12,
+            attendees=[{"email": f"person{j}@example.com", "responseStatus": "accepted"} for j in range(8)],
+            conferenceData={"entryPoints": [{"entryPointType": "video", "uri": f"https://meet.example.com/{i}"}]},
+            htmlLink=f"https://calendar.example.com/event?eid={i}",
+        )
+    return service
+
+
+def test_iter_events_follows_every_page():
+    service = _busy_calendar()
+    events = list(iter_events(service))
+    assert len(events) == 600
+    assert service.api_calls == 3
+    assert set(events[0]) <= {"id", "status", "summary", "transparency", "start", "end"}
+
+
+def test_list_events_is_no_longer_truncated_at_one_page():
+    service = _busy_calendar(count=300)
+    assert len(list_events(service, max_results=None)) == 300
+    assert len(list_events(service, max_results=50)) == 50
+
+
+def test_field_masks_shrink_the_payload():
+    full = _busy_calendar()
+    list(iter_events(full, fields=None))
+    masked = _busy_calendar()
+    list(iter_events(masked, fields=MATCH_FIELDS))
+
+    reduction = 1 - masked.response_bytes / full.response_bytes
+    assert reduction > 0.8
+
+
+def test_stopping_early_skips_the_remaining_pages():
+    service = _busy_calendar()
+    first = list(islice(iter_events(service), 10))
+    assert [e["summary"] for e in first] == [f"Meeting {i}" for i in range(10)]
+    assert service.api_calls == 1
+
+
+def test_api_fallbacks_use_masked_pages():
+    service = _busy_calendar(count=400, page_size=100)
+    base = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+
+    conflicts = check_conflicts(service, _iso(base + timedelta(hours=2)), _iso(base + timedelta(hours=3)))
+    assert [e["summary"] for e in conflicts] == ["Meeting 4", "Meeting 5"]
+    assert "description" not in conflicts[0]
+
+    # Events beyond the first page are still found without a local mirror
+    ranked = event_matcher(service).match("meeting 350")
+    assert ranked[0][1]["summary"] == "Meeting 350"
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Checks for the per-user credential store (services/credential_store.py)
+
+A fake refresher stands in for Google's token endpoint.
+"""
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from services import metrics
+from services.credential_store import (
+    CredentialStore,
+    MemoryCredentialBackend,
+    SQLiteCredentialBackend,
+)
+
+
+def _credentials(expires_in, token="old-token"):
+    return {
+        "token": token,
+        "refresh_token": "refresh",
+        "token_uri": "https://oauth2.googleapis.com/token",
+        "client_id": "client",
+        "client_secret": "secret",
+        "expiry": (datetime.utcnow() + timedelta(seconds=expires_in)).isoformat(),
+    }
+
+
+def _fake_refresher(calls, delay=0.0):
+    def refresher(credentials_dict):
+        calls.append(credentials_dict["token"])
+        time.sleep(delay)
+        return _credentials(3600, token=f"new-token-{len(calls)}")
+    return refresher
+
+
+def test_fresh_token_is_returned_without_refresh():
+    calls = []
+    store = CredentialStore(MemoryCredentialBackend(), refresher=_fake_refresher(calls))
+    creds = store.ensure_fresh("u1", _credentials(3600))
+    assert creds["token"] == "old-token"
+    assert calls == []
+
+
+def test_expired_token_blocks_once_and_is_written_back():
+    metrics.reset()
+    calls = []
+    store = CredentialStore(MemoryCredentialBackend(), refresher=_fake_refresher(calls))
+    session_creds = _credentials(-10)
+
+    first = store.ensure_fresh("u1", session_creds)
+    # The next request still carries the stale session token; the store wins
+    second = store.ensure_fresh("u1", session_creds)
+
+    assert first["token"] == second["token"] == "new-token-1"
+    assert len(calls) == 1
+    counters = metrics.snapshot("credentials.")["counters"]
+    assert counters["credentials.blocked_requests"] == 1
+    assert counters["credentials.refresh.blocking"] == 1
+
+
+def test_near_expiry_token_refreshes_in_background():
+    calls = []
+    store = CredentialStore(MemoryCredentialBackend(), refresher=_fake_refresher(calls, delay=0.05))
+    creds = store.ensure_fresh("u1", _credentials(120))
+    # Request isn't held up by the refresh
+    assert creds["token"] == "old-token"
+
+    deadline = time.time() + 2
+    while store.get("u1")["token"] == "old-token" and time.time() < deadline:
+        time.sleep(0.01)
+    assert store.get("u1")["token"] == "new-token-1"
+    assert len(calls) == 1
+
+
+def test_refresh_expiring_sweeps_the_store():
+    calls = []
+    store = CredentialStore(MemoryCredentialBackend(), refresher=_fake_refresher(calls))
+    store.save("soon", _credentials(60))
+    store.save("later", _credentials(7200))
+    store.refresh_expiring()
+    store._executor.shutdown(wait=True)
+    assert store.get("soon")["token"].startswith("new-token")
+    assert store.get("later")["token"] == "old-token"
+
+
+def test_sqlite_backend_persists_refreshed_tokens():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "credentials.sqlite3")
+        calls = []
+        CredentialStore(SQLiteCredentialBackend(path), refresher=_fake_refresher(calls)).ensure_fresh(
+            "u1", _credentials(-10)
+        )
+        reopened = CredentialStore(SQLiteCredentialBackend(path))
+        assert reopened.get("u1")["token"] == "new-token-1"
+        assert [u for u, _ in reopened.backend.expiring_before(time.time() + 7200)] == ["u1"]
+
+
+def test_idle_users_are_skipped_and_purged():
+    backends = [
+        lambda tmp: MemoryCredentialBackend(),
+        lambda tmp: SQLiteCredentialBackend(os.path.join(tmp, "credentials.sqlite3")),
+    ]
+    for make_backend in backends:
+        with tempfile.TemporaryDirectory() as tmp:
+            backend = make_backend(tmp)
+            calls = []
+            store = CredentialStore(backend, refresher=_fake_refresher(calls), idle_ttl=3600)
+            store.save("idle", _credentials(60))
+            store.save("active", _credentials(60))
+            store.backend.touch("idle", when=time.time() - 7200)
+            # A background refresh doesn't count as use
+            store.refresh("idle", store.get("idle"), background=True)
+
+            store.refresh_expiring()
+            store._executor.shutdown(wait=True)
+            assert store.get("idle") is None
+            assert store.get("active")["token"].startswith("new-token")
+
+
+def test_sqlite_store_from_before_last_used_is_upgraded():
+    import sqlite3
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "credentials.sqlite3")
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE credentials (user_id TEXT PRIMARY KEY, data TEXT NOT NULL,"
+                     " expires_at REAL, updated_at REAL NOT NULL)")
+        conn.execute("INSERT INTO credentials VALUES ('u1', '{}', 0, 0)")
+        conn.commit()
+        conn.close()
+
+        backend = SQLiteCredentialBackend(path)
+        assert [u for u, _ in backend.expiring_before(time.time(), used_since=time.time() - 60)] == ["u1"]
+
+
+def test_login_without_refresh_token_keeps_the_stored_one():
+    store = CredentialStore(MemoryCredentialBackend())
+    store.save("u1", _credentials(3600))
+    relogin = dict(_credentials(3600, token="second-login"), refresh_token=None)
+    saved = store.save("u1", relogin)
+    assert saved["token"] == "second-login"
+    assert store.get("u1")["refresh_token"] == "refresh"
+
+
+def test_locks_stay_bounded():
+    store = CredentialStore(MemoryCredentialBackend())
+    locks = {id(store._lock_for(f"user-{i}")) for i in range(5000)}
+    assert len(locks) <= 64
+    assert store._lock_for("user-1") is store._lock_for("user-1")
+
+
+def test_session_gets_refreshed_token(monkeypatch):
+    from services import calendar_service, credential_store as module
+
+    calls = []
+    store = CredentialStore(MemoryCredentialBackend(), refresher=_fake_refresher(calls))
+    monkeypatch.setattr(module, "credential_store", store)
+
+    session = {"user_id": "u1", "credentials": _credentials(-10)}
+    service = calendar_service.get_service_for_session(session)
+    assert session["credentials"]["token"] == "new-token-1"
+    assert service is calendar_service.get_service_for_session(session)
+    assert len(calls) == 1
+
+
+if __name__ == "__main__":
+    import pytest
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Checks for the batched embed pipeline (rag/embed_pipeline.py)
+"""
+import os
+import random
+import tempfile
+import threading
+import time
+
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from rag.embed_pipeline import embed_chunks, iter_chunks
+
+
+class SlowEmbedding(DeterministicFakeEmbedding):
+    """Random per-batch latency, tracking the largest batch and concurrency"""
+
+    largest_batch: int = 0
+    active: int = 0
+    peak_active: int = 0
+
+    def embed_documents(self, texts):
+        with _lock:
+            self.active += 1
+            self.peak_active = max(self.peak_active, self.active)
+            self.largest_batch = max(self.largest_batch, len(texts))
+        time.sleep(random.uniform(0, 0.01))
+        with _lock:
+            self.active -= 1
+        return super().embed_documents(texts)
+
+
+_lock = threading.Lock()
+
+
+def _chunks(n):
+    return (Document(page_content=f"chunk number {i}", metadata={"n": i}) for i in range(n))
+
+
+def test_same_index_as_from_documents():
+    random.seed(7)
+    embeddings = SlowEmbedding(size=16)
+    store = embed_chunks(_chunks(203), embeddings, batch_size=10, workers=4)
+    reference = FAISS.from_documents(list(_chunks(203)), DeterministicFakeEmbedding(size=16))
+
+    assert store.index.ntotal == 203
+    # Batches finish out of order but are added in order
+    ordered = [store.docstore.search(store.index_to_docstore_id[i]).metadata["n"] for i in range(203)]
+    assert ordered == list(range(203))
+    assert embeddings.largest_batch == 10 and embeddings.peak_active > 1
+
+    query = "chunk number 42"
+    assert [d.page_content for d in store.similarity_search(query, k=3)] == \
+        [d.page_content for d in reference.similarity_search(query, k=3)]
+
+
+def test_chunks_are_consumed_lazily():
+    pulled, lead = [], []
+
+    def chunks():
+        for doc in _chunks(100):
+            pulled.append(doc)
+            yield doc
+
+    class Watching(DeterministicFakeEmbedding):
+        def embed_documents(self, texts):
+            # How far the reader is ahead of this batch
+            lead.append(len(pulled) - int(texts[0].split()[-1]))
+            return super().embed_documents(texts)
+
+    store = embed_chunks(chunks(), Watching(size=8), batch_size=5, workers=2)
+    assert store.index.ntotal == 100
+    # At most workers * 2 batches in flight
+    assert max(lead) <= 2 * 2 * 5
+
+
+def test_empty_input_and_existing_store():
+    embeddings = DeterministicFakeEmbedding(size=8)
+    assert embed_chunks(iter([]), embeddings) is None
+
+    store = FAISS.from_texts(["existing"], embeddings)
+    assert embed_chunks(_chunks(7), embeddings, batch_size=3, vectorstore=store) is store
+    assert store.index.ntotal == 8
+
+
+def test_iter_chunks_splits_each_file():
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(3):
+            path = os.path.join(tmp, f"{i}.txt")
+            with open(path, "w") as f:
+                f.write(f"File {i}. " * 200)
+            paths.append(path)
+        chunks = list(iter_chunks(paths, chunk_size=500, chunk_overlap=50))
+        assert {c.metadata["source"] for c in chunks} == set(paths)
+        assert all(len(c.page_content) <= 500 for c in chunks)
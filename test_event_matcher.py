@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Checks for the indexed delete matcher (services/event_matcher.py)
+"""
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from services import event_time
+from services.event_matcher import EventMatcher, parse_day, parse_time_of_day, unresolved_parts
+from services.event_store import EventStore
+from services.fake_calendar import FakeCalendarService
+
+IST = ZoneInfo("Asia/Kolkata")
+NOW = datetime(2026, 10, 19, 9, 0, tzinfo=IST).timestamp()  # a Monday
+
+
+def _event(event_id, summary, start, minutes=60):
+    end = start + timedelta(minutes=minutes)
+    return {"id": event_id, "summary": summary,
+            "start": {"dateTime": start.isoformat()}, "end": {"dateTime": end.isoformat()}}
+
+
+def _titles(ranked):
+    return [event["summary"] for _, event in ranked]
+
+
+def test_time_and_day_parsing():
+    assert parse_time_of_day("3pm") == [(15, 0)]
+    assert parse_time_of_day("3:30 PM") == [(15, 30)]
+    assert parse_time_of_day("12am") == [(0, 0)]
+    assert parse_time_of_day("15:00") == [(15, 0)]
+    assert parse_time_of_day("3") == [(3, 0), (15, 0)]
+    assert parse_time_of_day("soon") == []
+
+    monday = datetime(2026, 10, 19).date()
+    assert parse_day("tomorrow", monday) == monday + timedelta(days=1)
+    assert parse_day("on friday", monday) == monday + timedelta(days=4)
+    assert parse_day("monday", monday) == monday
+    assert parse_day("2026-11-02", monday).isoformat() == "2026-11-02"
+    assert parse_day("someday", monday) is None
+
+
+def test_month_names_weekday_abbreviations_and_last_next():
+    monday = datetime(2026, 10, 19).date()
+    assert parse_day("5th march", monday).isoformat() == "2027-03-05"
+    assert parse_day("Oct 20", monday).isoformat() == "2026-10-20"
+    assert parse_day("september 30", monday).isoformat() == "2026-09-30"
+    assert parse_day("1 jan 2025", monday).isoformat() == "2025-01-01"
+    assert parse_day("31 feb", monday) is None
+    assert parse_day("fri", monday).isoformat() == "2026-10-23"
+    assert parse_day("last monday", monday).isoformat() == "2026-10-12"
+    assert parse_day("last friday", monday).isoformat() == "2026-10-16"
+    assert parse_day("next monday", monday).isoformat() == "2026-10-26"
+    # Said on a Sunday, "next monday" is not tomorrow
+    assert parse_day("next monday", monday - timedelta(days=1)).isoformat() == "2026-10-26"
+    assert parse_day("monthly", monday) is None
+
+    assert parse_time_of_day("around 4") == [(4, 0), (16, 0)]
+    assert unresolved_parts("next week", "around 4") == ["next week"]
+    assert unresolved_parts("tomorrow", "sometime") == ["sometime"]
+    assert unresolved_parts("", "") == []
+
+
+def test_3pm_matches_events_stored_with_another_offset(monkeypatch):
+    monkeypatch.setattr(event_time, "LOCAL_TZ", IST)
+    # 15:00 in Kolkata, stored in UTC - the old "T15:" check missed this
+    utc_start = datetime(2026, 10, 19, 9, 30, tzinfo=timezone.utc)
+    matcher = EventMatcher([
+        _event("a", "Design review", utc_start),
+        _event("b", "Design review", utc_start + timedelta(days=1)),
+    ])
+    ranked = matcher.match(time_reference="today", time_of_day="3pm", now=NOW)
+    assert [e["id"] for _, e in ranked] == ["a"]
+    assert _titles(matcher.match("design review", "tomorrow", "3:30pm", now=NOW)) == ["Design review"]
+
+
+def test_fuzzy_titles_are_ranked():
+    start = datetime(2026, 10, 20, 10, 0, tzinfo=IST)
+    matcher = EventMatcher([
+        _event("1", "Group discussion meet", start),
+        _event("2", "Group lunch", start + timedelta(hours=3)),
+        _event("3", "Dentist", start + timedelta(hours=5)),
+    ])
+    # Typo and partial title
+    assert _titles(matcher.match("grup discusion", now=NOW))[0] == "Group discussion meet"
+    ranked = matcher.match("group", now=NOW)
+    assert set(_titles(ranked)) == {"Group discussion meet", "Group lunch"}
+    assert "Dentist" not in _titles(matcher.match("dinner", now=NOW))
+
+
+def test_all_day_events_match_every_day_they_cover(monkeypatch):
+    monkeypatch.setattr(event_time, "LOCAL_TZ", IST)
+    offsite = {"id": "x", "summary": "Offsite", "start": {"date": "2026-10-20"}, "end": {"date": "2026-10-22"}}
+    matcher = EventMatcher([offsite])
+    assert _titles(matcher.match("offsite", "wednesday", now=NOW)) == ["Offsite"]
+    assert matcher.match("offsite", "thursday", now=NOW) == []
+    # No hour bucket for all-day events
+    assert matcher.match("offsite", "tuesday", "10am", now=NOW) == []
+
+
+def test_delete_handler_finds_events_beyond_the_first_50(monkeypatch):
+    from handlers import calendar_delete
+    from services import calendar_service
+
+    service = FakeCalendarService()
+    base = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) + timedelta(days=1)
+    for i in range(120):
+        start = base + timedelta(hours=i)
+        service.add_event(f"Focus block {i}", start.isoformat(), (start + timedelta(minutes=30)).isoformat())
+    late = base + timedelta(days=20)
+    service.add_event("Quarterly planning", late.isoformat(), (late + timedelta(hours=1)).isoformat())
+
+    monkeypatch.setattr(calendar_service, "event_store", EventStore(sync_interval=60))
+    monkeypatch.setattr(calendar_delete, "get_service_for_session", lambda session: service)
+    monkeypatch.setattr(calendar_delete, "session_user_id", lambda session: "u1")
+
+    info = {"event_title": "quarterly planing", "time_reference": "", "time": ""}
+    result = calendar_delete.handle_delete_event("x", session={"credentials": {}}, delete_info=info)
+    assert result["response"] == "✅ Deleted event: Quarterly planning"
+
+    info = {"event_title": "focus block", "time_reference": "", "time": ""}
+    result = calendar_delete.handle_delete_event("x", session={"credentials": {}}, delete_info=info)
+    assert result["response"].startswith("⚠️ Found 120 matching events")
+
+
+def _delete(monkeypatch, service, info):
+    from handlers import calendar_delete
+    from services import calendar_service
+
+    monkeypatch.setattr(calendar_service, "event_store", EventStore(sync_interval=60))
+    monkeypatch.setattr(calendar_delete, "get_service_for_session", lambda session: service)
+    monkeypatch.setattr(calendar_delete, "session_user_id", lambda session: "u1")
+    return calendar_delete.handle_delete_event("x", session={"credentials": {}}, delete_info=info)
+
+
+def _local_noon(days_from_today):
+    today = datetime.now(event_time.LOCAL_TZ).date()
+    return datetime.combine(today + timedelta(days=days_from_today), datetime.min.time(),
+                            tzinfo=event_time.LOCAL_TZ).replace(hour=12)
+
+
+def test_unparsed_date_or_time_is_never_auto_deleted(monkeypatch):
+    cases = [
+        {"event_title": "dentist", "time_reference": "next week", "time": ""},
+        {"event_title": "dentist", "time_reference": "", "time": "after lunch"},
+        {"event_title": "dentist", "time_reference": "the 3rd", "time": ""},
+    ]
+    for info in cases:
+        service = FakeCalendarService()
+        start = _local_noon(15)
+        service.add_event("Dentist", start.isoformat(), (start + timedelta(hours=1)).isoformat())
+
+        result = _delete(monkeypatch, service, info)
+        assert result["response"].startswith("⚠️ I couldn't work out when"), info
+        assert "Dentist" in result["response"]
+        assert [e["summary"] for e in service._events.values() if e["status"] != "cancelled"] == ["Dentist"]
+
+
+def test_date_on_another_day_does_not_delete(monkeypatch):
+    service = FakeCalendarService()
+    start = _local_noon(15)
+    service.add_event("Dentist", start.isoformat(), (start + timedelta(hours=1)).isoformat())
+    other_day = (start + timedelta(days=40)).strftime("%d %B").lstrip("0").lower()
+
+    result = _delete(monkeypatch, service, {"event_title": "dentist", "time_reference": other_day, "time": ""})
+    assert result["response"].startswith("❌ No matching events")
+    assert service.api_calls and all(e["status"] != "cancelled" for e in service._events.values())
+
+
+def test_last_weekday_deletes_the_past_one(monkeypatch):
+    service = FakeCalendarService()
+    past, upcoming = _local_noon(-3), _local_noon(4)
+    for start in (past, upcoming):
+        service.add_event("Yoga", start.isoformat(), (start + timedelta(hours=1)).isoformat())
+    weekday = past.strftime("%A").lower()
+
+    result = _delete(monkeypatch, service, {"event_title": "yoga", "time_reference": f"last {weekday}", "time": ""})
+    assert result["response"] == "✅ Deleted event: Yoga"
+    remaining = [e for e in service._events.values() if e["status"] != "cancelled"]
+    assert [e["start"]["dateTime"] for e in remaining] == [upcoming.isoformat()]
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Checks for the per-user event mirror (services/event_store.py)
+
+FakeCalendarService stands in for the Calendar API and counts every call.
+"""
+from datetime import datetime, timedelta, timezone
+
+from services.calendar_service import check_conflicts, create_event, delete_event, list_events
+from services.event_store import EventStore
+from services.fake_calendar import FakeCalendarService
+
+
+def _iso(hours_from_now):
+    moment = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    return (moment + timedelta(hours=hours_from_now)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _ts(hours_from_now):
+    return datetime.fromisoformat(_iso(hours_from_now).replace("Z", "+00:00")).timestamp()
+
+
+def _calendar():
+    service = FakeCalendarService(page_size=2)
+    service.add_event("Standup", _iso(2), _iso(3))
+    service.add_event("Lunch", _iso(5), _iso(6))
+    service.add_event("Review", _iso(26), _iso(27))
+    return service
+
+
+def test_full_sync_then_served_locally():
+    service = _calendar()
+    store = EventStore(sync_interval=60)
+
+    events = store.events_between("u1", service, _ts(0), _ts(48))
+    assert [e["summary"] for e in events] == ["Standup", "Lunch", "Review"]
+    calls_after_sync = service.api_calls
+    assert calls_after_sync == 2  # page_size=2 -> two pages
+
+    for _ in range(5):
+        store.events_between("u1", service, _ts(0), _ts(4))
+    assert service.api_calls == calls_after_sync
+
+
+def test_incremental_sync_picks_up_outside_changes():
+    service = _calendar()
+    store = EventStore(sync_interval=0)
+    store.sync("u1", service)
+
+    lunch = next(e for e in service._events.values() if e["summary"] == "Lunch")
+    service.events().delete(eventId=lunch["id"]).execute()
+    service.add_event("Dinner", _iso(8), _iso(9))
+    calls = service.api_calls
+
+    events = store.events_between("u1", service, _ts(0), _ts(24))
+    assert [e["summary"] for e in events] == ["Standup", "Dinner"]
+    assert service.api_calls == calls + 1  # one incremental page, not a full listing
+
+
+def test_expired_sync_token_triggers_full_resync():
+    service = _calendar()
+    store = EventStore(sync_interval=0)
+    store.sync("u1", service)
+
+    service.add_event("Late addition", _iso(10), _iso(11))
+    service.invalidate_sync_tokens()
+
+    events = store.events_between("u1", service, _ts(0), _ts(24))
+    assert "Late addition" in [e["summary"] for e in events]
+    assert store._mirrors["u1"].sync_token is not None
+
+
+def test_ranges_past_the_window_go_to_the_api(monkeypatch):
+    from services import calendar_service
+
+    service = _calendar()
+    service.add_event("Far off", _iso(24 * 10), _iso(24 * 10 + 1))
+    store = EventStore(sync_interval=3600, future_days=5)
+    monkeypatch.setattr(calendar_service, "event_store", store)
+
+    assert [e["summary"] for e in store.events_between("u1", service, _ts(0), _ts(48))] == [
+        "Standup", "Lunch", "Review",
+    ]
+    assert "Far off" not in [e["summary"] for e in store._mirrors["u1"].events.values()]
+    assert store.events_between("u1", service, _ts(24 * 9), _ts(24 * 11)) is None
+
+    conflicts = check_conflicts(service, _iso(24 * 10), _iso(24 * 10 + 1), user_id="u1")
+    assert [e["summary"] for e in conflicts] == ["Far off"]
+
+
+def test_own_writes_update_the_mirror(monkeypatch):
+    from services import calendar_service
+
+    service = _calendar()
+    store = EventStore(sync_interval=3600)
+    monkeypatch.setattr(calendar_service, "event_store", store)
+
+    assert check_conflicts(service, _iso(12), _iso(13), user_id="u1") == []
+    ok, created = create_event(service, "Focus", _iso(12), _iso(13), user_id="u1")
+    assert ok
+    conflicts = check_conflicts(service, _iso(12), _iso(13), user_id="u1")
+    assert [e["summary"] for e in conflicts] == ["Focus"]
+
+    ok, _ = delete_event(service, created["id"], user_id="u1")
+    assert ok
+    assert check_conflicts(service, _iso(12), _iso(13), user_id="u1") == []
+    assert "Focus" not in [e["summary"] for e in list_events(service, user_id="u1")]
+
+
+def test_conflicts_use_timestamps_not_strings():
+    service = FakeCalendarService()
+    # 10:00-11:00 UTC written with a +05:30 offset
+    service.add_event("Offset call", "2030-01-01T15:30:00+05:30", "2030-01-01T16:30:00+05:30")
+    service.add_event("Holiday", "2030-01-01", "2030-01-02", all_day=True, transparency="transparent")
+    service.add_event("Offsite", "2029-12-31", "2030-01-02", all_day=True)
+
+    conflicts = check_conflicts(service, "2030-01-01T10:30:00", "2030-01-01T11:30:00")
+    assert [e["summary"] for e in conflicts] == ["Offsite", "Offset call"]
+
+
+def test_stats_report_staleness_and_saved_calls():
+    service = _calendar()
+    store = EventStore(sync_interval=60)
+    store.sync("u1", service)
+    store.sync("u1", service)
+
+    stats = store.get_stats()
+    assert stats["users"] == 1
+    assert stats["events"] == 3
+    assert stats["counters"]["events.calls_saved"] >= 1
+    assert stats["staleness_seconds"]["max"] < 60
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Checks for services/executor.py and the parallel delete/create stages
+"""
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from services import metrics
+from services.event_store import EventStore
+from services.executor import StageTimeoutError, run_parallel
+from services.fake_calendar import FakeCalendarService
+
+
+def test_stages_run_concurrently():
+    start = time.monotonic()
+    results = run_parallel("test", {
+        "a": lambda: time.sleep(0.2) or "a",
+        "b": lambda: time.sleep(0.2) or "b",
+    })
+    assert results == {"a": "a", "b": "b"}
+    assert time.monotonic() - start < 0.35
+
+    stats = metrics.snapshot("stage.test.")
+    assert stats["latency"]["stage.test.a"]["count"] >= 1
+    assert stats["counters"]["stage.test.saved_ms"] > 100
+
+
+def test_deadline_and_errors():
+    with pytest.raises(StageTimeoutError):
+        run_parallel("test_deadline", {"slow": lambda: time.sleep(0.5)}, deadline=0.05)
+
+    def boom():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        run_parallel("test_error", {"ok": lambda: 1, "bad": boom})
+
+
+def test_delete_overlaps_parse_with_fetch(monkeypatch):
+    from handlers import calendar_delete
+    from services import calendar_service
+
+    service = FakeCalendarService(latency=0.2)
+    soon = datetime.now(timezone.utc) + timedelta(hours=1)
+    service.add_event("Standup", soon.isoformat(), (soon + timedelta(minutes=30)).isoformat())
+    store = EventStore(sync_interval=60)
+
+    def slow_parse(message):
+        time.sleep(0.2)
+        return {"event_title": "standup", "time_reference": "", "time": ""}
+
+    monkeypatch.setattr(calendar_service, "event_store", store)
+    monkeypatch.setattr(calendar_delete, "parse_delete_request", slow_parse)
+    monkeypatch.setattr(calendar_delete, "get_service_for_session", lambda session: service)
+    monkeypatch.setattr(calendar_delete, "session_user_id", lambda session: "u1")
+
+    start = time.monotonic()
+    result = calendar_delete.handle_delete_event("delete standup", session={"credentials": {}})
+    elapsed = time.monotonic() - start
+
+    assert result["response"] == "✅ Deleted event: Standup"
+    # parse (0.2s) and the sync (0.2s) overlap; the delete itself is another 0.2s
+    assert elapsed < 0.55
+
+
+def test_gather_stages_overlaps_blocking_calls():
+    import asyncio
+
+    from services.executor import gather_stages, run_io
+
+    async def main():
+        return await gather_stages("test_async", {
+            "a": run_io(time.sleep, 0.2),
+            "b": run_io(lambda: time.sleep(0.2) or "b"),
+        })
+
+    start = time.monotonic()
+    results = asyncio.run(main())
+    assert results == {"a": None, "b": "b"}
+    assert time.monotonic() - start < 0.35
+
+
+def test_route_message_async_creates_event(monkeypatch):
+    import asyncio
+
+    from langchain_core.runnables import RunnableLambda
+
+    import intent_detector
+    import router
+    from handlers import calendar_create
+    from services import calendar_service, event_store as event_store_module
+    from services.cache import response_cache
+
+    service = FakeCalendarService()
+    store = EventStore(sync_interval=60)
+    unified = {"intent": "create_event",
+               "event": {"title": "Sync", "start": "2030-01-01T10:00:00", "end": "2030-01-01T10:30:00"}}
+
+    monkeypatch.setattr(response_cache, "get", lambda chain, message, version=None: None)
+    monkeypatch.setattr(intent_detector, "get_unified_chain", lambda: RunnableLambda(lambda inputs: unified))
+    monkeypatch.setattr(router, "get_service_for_user", lambda user_id, credentials: (service, credentials))
+    for module in (calendar_service, router, calendar_create, event_store_module):
+        monkeypatch.setattr(module, "event_store", store)
+
+    session = {"credentials": {"token": "x"}, "user_id": "u1"}
+    result = asyncio.run(router.route_message_async("plan the offsite thing", session))
+
+    assert result["response"] == "✅ Created event: Sync"
+    assert [e["summary"] for e in service._events.values()] == ["Sync"]
+
+
+def test_route_message_async_keeps_the_session_on_the_request_thread(monkeypatch):
+    import asyncio
+    import threading
+
+    import router
+
+    class WatchedSession(dict):
+        threads = set()
+
+        def _seen(self):
+            self.threads.add(threading.current_thread())
+
+        def __getitem__(self, key):
+            self._seen()
+            return super().__getitem__(key)
+
+        def __setitem__(self, key, value):
+            self._seen()
+            super().__setitem__(key, value)
+
+        def __contains__(self, key):
+            self._seen()
+            return super().__contains__(key)
+
+        def get(self, key, default=None):
+            self._seen()
+            return super().get(key, default)
+
+        def pop(self, key, *default):
+            self._seen()
+            return super().pop(key, *default)
+
+    refreshed = {"token": "refreshed"}
+    monkeypatch.setattr(router, "get_service_for_user", lambda user_id, credentials: (FakeCalendarService(), refreshed))
+
+    session = WatchedSession(credentials={"token": "x"}, user_id="u1", pending_event={"title": "Sync"}, conflicts=[])
+    result = asyncio.run(router.route_message_async("cancel", session))
+
+    assert result["response"].startswith("❌ Event creation cancelled")
+    assert session["credentials"] == refreshed
+    assert "pending_event" not in session
+    assert WatchedSession.threads == {threading.current_thread()}
+
+
+def test_route_message_stream_goes_through_the_async_router(monkeypatch):
+    import asyncio
+
+    import router
+
+    frames = [{"type": "token", "text": "RAG is"}, {"type": "final", "response": "RAG is retrieval"}]
+    monkeypatch.setattr(router, "stream_query", lambda message: iter(frames))
+    monkeypatch.setattr(router, "get_service_for_user", lambda user_id, credentials: (FakeCalendarService(), credentials))
+
+    monkeypatch.setenv("TEST_INTENT", "query")
+    assert list(asyncio.run(router.route_message_stream("what is rag", {}))) == frames
+
+    monkeypatch.setenv("TEST_INTENT", "update_event")
+    session = {"credentials": {"token": "x"}, "user_id": "u1"}
+    assert list(asyncio.run(router.route_message_stream("move my call", session))) == [
+        {"type": "final", "error": "Intent not supported yet"}
+    ]
+
+
+def test_only_create_and_delete_messages_prefetch_events(monkeypatch):
+    import asyncio
+
+    import router
+
+    synced = []
+    monkeypatch.setattr(router, "get_service_for_user", lambda user_id, credentials: (FakeCalendarService(), credentials))
+    monkeypatch.setattr(router, "submit", lambda stage, name, fn: synced.append(name))
+    monkeypatch.setattr(router, "handle_rag_query", lambda message: {"response": "answer"})
+    monkeypatch.setattr(router, "handle_delete_event_async", lambda *args, **kwargs: asyncio.sleep(0, {"response": "ok"}))
+
+    session = {"credentials": {"token": "x"}, "user_id": "u1"}
+    monkeypatch.setenv("TEST_INTENT", "query")
+    asyncio.run(router.route_message_async("What is RAG?", session))
+    assert synced == []
+
+    monkeypatch.setenv("TEST_INTENT", "delete_event")
+    asyncio.run(router.route_message_async("delete my 3pm", session))
+    assert synced == ["prefetch_events"]
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Checks for the free/busy conflict check (services/calendar_service.py)
+"""
+import random
+from datetime import datetime, timedelta, timezone
+
+from services import metrics
+from services.calendar_service import check_conflicts
+from services.fake_calendar import FakeCalendarService
+
+BASE = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) + timedelta(days=1)
+
+
+def _iso(hours):
+    return (BASE + timedelta(hours=hours)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _calendar():
+    service = FakeCalendarService()
+    service.add_event("Standup", _iso(1), _iso(1.5), description="x" * 2000)
+    service.add_event("Holiday", _iso(-10), _iso(30), transparency="transparent")
+    service.add_event("Team offsite", _iso(1), _iso(3), calendar_id="team@example.com")
+    return service
+
+
+def test_free_slot_costs_one_small_call():
+    service = _calendar()
+    assert check_conflicts(service, _iso(5), _iso(6), mode="freebusy") == []
+    assert service.api_calls == 1
+    assert service.response_bytes < 300
+
+
+def test_busy_slot_lists_only_the_overlapping_events():
+    service = _calendar()
+    conflicts = check_conflicts(service, _iso(0), _iso(2), mode="freebusy")
+    assert [e["summary"] for e in conflicts] == ["Standup"]
+    assert "description" not in conflicts[0]
+    assert service.api_calls == 2
+
+
+def test_several_calendars_in_one_query():
+    service = _calendar()
+    calendars = ["primary", "team@example.com", "missing@example.com"]
+    conflicts = check_conflicts(service, _iso(1), _iso(2), calendars=calendars, mode="freebusy")
+    assert [(e["summary"], e.get("calendarId")) for e in conflicts] == [
+        ("Standup", None), ("Team offsite", "team@example.com"),
+    ]
+    # One freebusy query plus one batch listing both busy calendars
+    assert service.api_calls == 2
+    assert service.batch_calls == 1
+
+
+def test_auto_mode_uses_freebusy_only_for_several_calendars():
+    service = _calendar()
+    metrics.reset()
+    check_conflicts(service, _iso(5), _iso(6), calendars=["primary"], mode="auto")
+    assert list(metrics.snapshot("events.conflicts.")["latency"]) == ["events.conflicts.list"]
+
+    metrics.reset()
+    check_conflicts(service, _iso(5), _iso(6), calendars=["primary", "team@example.com"], mode="auto")
+    assert list(metrics.snapshot("events.conflicts.")["latency"]) == ["events.conflicts.freebusy"]
+
+
+def test_freebusy_and_list_modes_agree():
+    rng = random.Random(7)
+    service = FakeCalendarService(page_size=20)
+    for i in range(300):
+        start = rng.randrange(0, 24 * 14 * 4) / 4
+        service.add_event(f"Event {i}", _iso(start), _iso(start + rng.choice([0.25, 0.5, 1, 2])),
+                          transparency=rng.choice(["opaque", "opaque", "transparent"]))
+    for _ in range(50):
+        start = rng.randrange(0, 24 * 14)
+        found = {
+            mode: [e["id"] for e in check_conflicts(service, _iso(start), _iso(start + 1), mode=mode)]
+            for mode in ("list", "freebusy")
+        }
+        assert found["freebusy"] == found["list"]
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Labelled benchmark for the local intent classifier in intent_detector.
+
+Run with pytest for the accuracy checks, or directly to print accuracy and
+latency. Pass --llm to also time the Gemini path on the same set.
+"""
+import sys
+import time
+
+from intent_detector import classify_intent_local, is_confident, LOCAL_INTENT_THRESHOLD, LOCAL_DELETE_THRESHOLD
+
+LABELLED_SET = [
+    ("delete my 3pm", "delete_event"),
+    ("Delete my 3pm event today", "delete_event"),
+    ("delete the meeting tomorrow", "delete_event"),
+    ("Delete group discussion meet", "delete_event"),
+    ("remove the standup on friday", "delete_event"),
+    ("cancel my dentist appointment tomorrow", "delete_event"),
+    ("please delete the 10am call", "delete_event"),
+    ("kal ki meeting hatao", "delete_event"),
+    ("create a meeting tomorrow", "create_event"),
+    ("create a meeting tomorrow 9pm", "create_event"),
+    ("Create a meeting tomorrow at 3pm for 30 minutes", "create_event"),
+    ("Create a team meeting tomorrow at 2pm", "create_event"),
+    ("schedule a call today at 3pm", "create_event"),
+    ("Schedule lunch next Monday at 12pm", "create_event"),
+    ("tomorrow at 2pm meeting with john", "create_event"),
+    ("book an interview on thursday at 11am", "create_event"),
+    ("add a review session friday 4pm", "create_event"),
+    ("set up a sync with the design team tomorrow", "create_event"),
+    ("Kal 5 baje project meeting 1 ghante ki", "create_event"),
+    ("Kal 5 baje se 6 baje tak team meeting schedule karo", "create_event"),
+    ("reschedule my 3pm meeting to 5pm", "update_event"),
+    ("move the standup to tomorrow", "update_event"),
+    ("postpone the demo to next week", "update_event"),
+    ("What is RAG?", "query"),
+    ("what is RAG", "query"),
+    ("How does OAuth work?", "query"),
+    ("explain vector databases", "query"),
+    ("Why do we use FAISS?", "query"),
+    ("What's on my calendar?", "query"),
+    ("tell me about LangChain", "query"),
+    ("Hello, what is 2+2?", "query"),
+    ("RAG", "query"),
+    ("OAuth", "query"),
+    # Negations and verbs with non-calendar meanings must not be answered locally
+    ("don't delete my meeting tomorrow", "query"),
+    ("do not cancel the standup on friday", "query"),
+    ("never remove my 3pm call", "query"),
+    ("drop me a reminder for the call at 5pm", "create_event"),
+    ("clear my calendar friday", "delete_event"),
+    ("make sure the meeting tomorrow has an agenda", "query"),
+]
+
+
+def run_local():
+    """Classify the labelled set locally, returning per-message results"""
+    results = []
+    for message, expected in LABELLED_SET:
+        start = time.perf_counter()
+        intent, confidence = classify_intent_local(message)
+        elapsed_us = (time.perf_counter() - start) * 1e6
+        results.append((message, expected, intent, confidence, elapsed_us))
+    return results
+
+
+def test_confident_predictions_are_correct():
+    """Anything above the threshold skips the LLM, so it must be right"""
+    wrong = [
+        (message, expected, intent, confidence)
+        for message, expected, intent, confidence, _ in run_local()
+        if is_confident(intent, confidence) and intent != expected
+    ]
+    assert not wrong, wrong
+
+
+def test_local_path_covers_most_messages():
+    confident = [r for r in run_local() if is_confident(r[2], r[3])]
+    assert len(confident) / len(LABELLED_SET) >= 0.6
+
+
+def test_conflicting_signals_defer_to_llm():
+    _, confidence = classify_intent_local("delete and create")
+    assert confidence < LOCAL_INTENT_THRESHOLD
+
+
+def test_negated_and_ambiguous_messages_defer_to_llm():
+    for message in (
+        "don't delete my meeting tomorrow",
+        "please don\u2019t cancel dinner tonight",
+        "drop me a reminder for the call at 5pm",
+        "clear my calendar friday",
+        "make sure the meeting tomorrow has an agenda",
+    ):
+        intent, confidence = classify_intent_local(message)
+        assert not is_confident(intent, confidence), (message, intent, confidence)
+
+
+def test_delete_needs_a_higher_bar():
+    intent, confidence = classify_intent_local("delete my 3pm")
+    assert intent == "delete_event" and LOCAL_INTENT_THRESHOLD <= confidence < LOCAL_DELETE_THRESHOLD
+    assert not is_confident(intent, confidence)
+    assert is_confident(*classify_intent_local("delete the meeting tomorrow"))
+
+
+def run_llm():
+    from intent_detector import get_intent_chain
+
+    intent_chain = get_intent_chain()
+
+    results = []
+    for message, expected in LABELLED_SET:
+        start = time.perf_counter()
+        try:
+            intent = intent_chain.invoke({"input": message}).get("intent")
+        except Exception as e:
+            intent = f"error: {e}"
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        results.append((message, expected, intent, elapsed_ms))
+    return results
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Local Intent Classifier Benchmark")
+    print("=" * 60)
+
+    local = run_local()
+    confident = [r for r in local if is_confident(r[2], r[3])]
+    correct = [r for r in confident if r[1] == r[2]]
+    latencies = sorted(r[4] for r in local)
+
+    for message, expected, intent, confidence, elapsed_us in local:
+        path = "local" if is_confident(intent, confidence) else "llm"
+        mark = "✅" if intent == expected else ("↪️" if path == "llm" else "❌")
+        print(f"{mark} [{path:5}] {confidence:.2f} {intent:13} '{message}'")
+
+    print("-" * 60)
+    print(f"Threshold:          {LOCAL_INTENT_THRESHOLD} (delete {LOCAL_DELETE_THRESHOLD})")
+    print(f"Local hit rate:     {len(confident)}/{len(local)} ({len(confident) / len(local):.0%})")
+    print(f"Local precision:    {len(correct)}/{len(confident)}")
+    print(f"Local latency p50:  {latencies[len(latencies) // 2]:.1f} µs")
+    print(f"Local latency max:  {latencies[-1]:.1f} µs")
+
+    if "--llm" in sys.argv:
+        llm = run_llm()
+        llm_correct = sum(1 for r in llm if r[1] == r[2])
+        llm_latencies = sorted(r[3] for r in llm)
+        print("-" * 60)
+        print(f"LLM accuracy:       {llm_correct}/{len(llm)}")
+        print(f"LLM latency p50:    {llm_latencies[len(llm_latencies) // 2]:.0f} ms")
+        print(f"LLM latency max:    {llm_latencies[-1]:.0f} ms")
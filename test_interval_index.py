@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Property checks for services/interval_index.py
+
+Random interval sets (seeded, so failures reproduce) are queried through the
+index and through a brute-force scan; the answers must match exactly.
+"""
+import random
+
+from services.interval_index import IntervalIndex
+
+SEEDS = range(25)
+
+
+def _random_intervals(rng, count):
+    intervals = []
+    for i in range(count):
+        start = rng.randint(0, 10_000)
+        # Mix of zero-length, short and very long (multi-day style) intervals
+        length = rng.choice([0, rng.randint(1, 60), rng.randint(60, 600), rng.randint(600, 5_000)])
+        intervals.append((start, start + length, i))
+    return intervals
+
+
+def _brute_force(intervals, start, end):
+    return sorted(
+        (s, e, v) for s, e, v in intervals if s < end and e > start
+    )
+
+
+def _random_query(rng):
+    start = rng.randint(-500, 10_500)
+    return start, start + rng.choice([0, 1, rng.randint(1, 120), rng.randint(120, 3_000)])
+
+
+def test_overlaps_match_brute_force():
+    for seed in SEEDS:
+        rng = random.Random(seed)
+        intervals = _random_intervals(rng, rng.randint(0, 400))
+        index = IntervalIndex(intervals)
+        by_value = {v: (s, e, v) for s, e, v in intervals}
+
+        for _ in range(200):
+            start, end = _random_query(rng)
+            got = sorted(by_value[v] for v in index.overlaps(start, end))
+            assert got == _brute_force(intervals, start, end), (seed, start, end)
+
+
+def test_results_come_back_in_start_order():
+    rng = random.Random(7)
+    intervals = _random_intervals(rng, 500)
+    index = IntervalIndex(intervals)
+    starts = {v: s for s, _, v in intervals}
+    for _ in range(100):
+        values = index.overlaps(*_random_query(rng))
+        assert [starts[v] for v in values] == sorted(starts[v] for v in values)
+
+
+def test_overlaps_many_matches_single_queries():
+    for seed in SEEDS:
+        rng = random.Random(seed)
+        index = IntervalIndex(_random_intervals(rng, rng.randint(0, 1_000)))
+        # Few slots (the sweep skips ahead) and many (it steps through)
+        for count in (5, 50, 500):
+            slots = [_random_query(rng) for _ in range(count)]
+            slots.append(slots[0])
+            assert index.overlaps_many(slots) == [index.overlaps(s, e) for s, e in slots], (seed, count)
+
+
+def test_half_open_edges_do_not_overlap():
+    index = IntervalIndex([(10, 20, "a")])
+    assert index.overlaps(20, 30) == []
+    assert index.overlaps(0, 10) == []
+    assert index.overlaps(19, 21) == ["a"]
+    assert not IntervalIndex().has_overlap(0, 100)
+
+
+def test_events_across_timezones_and_all_day():
+    index = IntervalIndex.from_events([
+        {"summary": "IST call", "start": {"dateTime": "2030-01-01T15:30:00+05:30"},
+         "end": {"dateTime": "2030-01-01T16:30:00+05:30"}},
+        {"summary": "Trip", "start": {"date": "2029-12-30"}, "end": {"date": "2030-01-03"}},
+        {"summary": "Broken", "start": {}, "end": {}},
+    ])
+    assert len(index) == 2
+
+    def ts(value):
+        from services.event_time import to_epoch
+        return to_epoch(value)
+
+    found = index.overlaps(ts("2030-01-01T10:30:00Z"), ts("2030-01-01T11:00:00Z"))
+    assert [e["summary"] for e in found] == ["Trip", "IST call"]
+    found = index.overlaps(ts("2030-01-02T10:00:00Z"), ts("2030-01-02T11:00:00Z"))
+    assert [e["summary"] for e in found] == ["Trip"]
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Checks for the shared LLM response cache (services/cache.py)
+"""
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from unittest import mock
+
+from services.cache import LRUCache, SQLiteCache, ResponseCache
+
+
+def test_lru_eviction_and_counters():
+    cache = LRUCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now least recently used
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert cache.stats["evictions"] == 1
+    assert cache.stats["hits"] == 2
+    assert cache.stats["misses"] == 1
+
+
+def test_expired_entries_miss():
+    cache = LRUCache()
+    cache.set("a", 1, expires_at=time.time() - 1)
+    assert cache.get("a") is None
+    assert cache.stats["expirations"] == 1
+
+
+def test_normalized_messages_share_an_entry():
+    cache = ResponseCache(LRUCache())
+    calls = []
+    compute = lambda: calls.append(1) or {"intent": "query"}
+    cache.cached("intent", "What is RAG?", compute)
+    cache.cached("intent", "  what is   rag ", compute)
+    assert len(calls) == 1
+
+
+def test_errors_are_not_cached():
+    cache = ResponseCache(LRUCache())
+    cache.cached("event_parse", "x", lambda: {"error": "boom"})
+    assert cache.get("event_parse", "x") is None
+
+
+def test_callers_get_independent_copies():
+    cache = ResponseCache(LRUCache())
+    first = cache.cached("intent", "cancel", lambda: {"intent": "delete_event"})
+    first["source"] = "llm"
+    assert "source" not in cache.get("intent", "cancel")
+
+
+def test_versioned_answers_are_not_served_after_a_change():
+    cache = ResponseCache(LRUCache())
+    assert cache.cached("rag", "what is rag", lambda: "old", version=1) == "old"
+    assert cache.cached("rag", "what is rag", lambda: "new", version=2) == "new"
+    assert cache.get("rag", "what is rag", version=2) == "new"
+
+
+def test_acached_versions_like_cached():
+    import asyncio
+
+    cache = ResponseCache(LRUCache())
+
+    async def answer(value):
+        return value
+
+    async def main():
+        assert await cache.acached("rag", "what is rag", lambda: answer("old"), version=1) == "old"
+        assert await cache.acached("rag", "what is rag", lambda: answer("new"), version=2) == "new"
+        assert await cache.acached("rag", "what is rag", lambda: answer("newer"), version=2) == "new"
+
+    asyncio.run(main())
+    assert cache.get("rag", "what is rag", version=1) == "old"
+    assert cache.cached("rag", "what is rag", lambda: "unused", version=2) == "new"
+
+
+def test_date_sensitive_chains_expire_at_midnight():
+    cache = ResponseCache(LRUCache())
+    late = datetime(2026, 10, 18, 23, 59)
+    with mock.patch("services.cache.datetime") as fake:
+        fake.now.return_value = late
+        fake.combine = datetime.combine
+        fake.min = datetime.min
+        cache.set("event_parse", "meeting tomorrow 3pm", {"start": "2026-10-19T15:00:00"})
+        cache.set("intent", "meeting tomorrow 3pm", {"intent": "create_event"})
+        assert cache.get("event_parse", "meeting tomorrow 3pm") is not None
+
+        fake.now.return_value = late + timedelta(minutes=2)
+        assert cache.get("event_parse", "meeting tomorrow 3pm") is None
+        assert cache.get("intent", "meeting tomorrow 3pm") is not None
+
+
+def test_sqlite_backend_survives_reopen():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cache.sqlite3")
+        ResponseCache(SQLiteCache(path)).set("rag", "what is rag", "Retrieval augmented generation")
+        reopened = ResponseCache(SQLiteCache(path))
+        assert reopened.get("rag", "What is RAG?") == "Retrieval augmented generation"
+
+
+def test_sqlite_backend_evicts_least_recently_used():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = SQLiteCache(os.path.join(tmp, "cache.sqlite3"), max_entries=20)
+        for i in range(40):
+            cache.set(f"k{i}", str(i))
+        assert len(cache) <= 20
+        assert cache.get("k39") == "39"
+        assert cache.get("k0") is None
+
+
+if __name__ == "__main__":
+    import pytest
+    raise SystemExit(pytest.main([__file__, "-q"]))
+
+
+def test_clear_chain_leaves_other_chains():
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in (LRUCache(), SQLiteCache(os.path.join(tmp, "c.sqlite3"))):
+            cache = ResponseCache(backend)
+            cache.set("rag", "what is rag", "answer", version=1)
+            cache.set("intent", "what is rag", {"intent": "rag_query"})
+            cache.clear_chain("rag")
+            assert cache.get("rag", "what is rag", version=1) is None
+            assert cache.get("intent", "what is rag") == {"intent": "rag_query"}
+
+
+def test_detect_intent_leaves_the_cached_answer_alone():
+    import intent_detector
+
+    answer = {"intent": "query"}
+    with mock.patch.object(intent_detector, "response_cache", ResponseCache(LRUCache())) as cache, \
+            mock.patch.object(intent_detector, "get_intent_chain", lambda: None), \
+            mock.patch.object(intent_detector.llm_gateway, "invoke", lambda *args: answer), \
+            mock.patch.dict(os.environ, {"TEST_INTENT": ""}):
+        first = intent_detector.detect_intent("RAG")
+        second = intent_detector.detect_intent("RAG")
+        assert first["source"] == second["source"] == "llm"
+        assert answer == {"intent": "query"}
+        assert cache.get("intent", "RAG") == {"intent": "query"}
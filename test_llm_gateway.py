@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Checks for the concurrency cap and timeouts of services/llm_gateway.py
+
+No Gemini calls are made; plain callables and a fake runnable stand in.
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from services import llm_gateway, metrics
+
+
+class _SlowStream:
+    """Runnable whose stream yields a chunk every `delay` seconds"""
+
+    def __init__(self, chunks, delay):
+        self.chunks = chunks
+        self.delay = delay
+
+    def stream(self, inputs, config=None):
+        for chunk in self.chunks:
+            time.sleep(self.delay)
+            yield chunk
+
+
+def _wait_for_slot(slots, seconds=2):
+    deadline = time.time() + seconds
+    while time.time() < deadline:
+        if slots.acquire(blocking=False):
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_calls_never_exceed_the_concurrency_cap(monkeypatch):
+    monkeypatch.setattr(llm_gateway, "_slots", threading.BoundedSemaphore(2))
+    lock = threading.Lock()
+    running = []
+    peak = []
+
+    def fn():
+        with lock:
+            running.append(1)
+            peak.append(len(running))
+        time.sleep(0.05)
+        with lock:
+            running.pop()
+        return "ok"
+
+    threads = [threading.Thread(target=llm_gateway.call, args=("test", fn, 5)) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(peak) == 6
+    assert max(peak) == 2
+
+
+def test_call_times_out_but_holds_the_slot_until_fn_returns(monkeypatch):
+    slots = threading.BoundedSemaphore(1)
+    monkeypatch.setattr(llm_gateway, "_slots", slots)
+    before = metrics.snapshot("llm.test.")["counters"].get("llm.test.timeouts", 0)
+
+    start = time.monotonic()
+    with pytest.raises(llm_gateway.LLMTimeoutError):
+        llm_gateway.call("test", lambda: time.sleep(0.3), timeout=0.1)
+    assert time.monotonic() - start < 0.25
+    assert metrics.snapshot("llm.test.")["counters"]["llm.test.timeouts"] == before + 1
+
+    # The abandoned call still counts against the cap until it finishes
+    assert not slots.acquire(blocking=False)
+    assert _wait_for_slot(slots)
+
+
+def test_call_is_rejected_when_no_slot_frees_up(monkeypatch):
+    slots = threading.BoundedSemaphore(1)
+    monkeypatch.setattr(llm_gateway, "_slots", slots)
+    slots.acquire()
+    ran = []
+
+    with pytest.raises(llm_gateway.LLMTimeoutError, match="No free LLM slot"):
+        llm_gateway.call("test", lambda: ran.append(1), timeout=0.1)
+
+    async def main():
+        with pytest.raises(llm_gateway.LLMTimeoutError, match="No free LLM slot"):
+            await llm_gateway.acall("test", lambda: ran.append(1), timeout=0.1)
+
+    asyncio.run(main())
+    assert not ran
+    assert metrics.snapshot("llm.test.")["counters"]["llm.test.rejected"] >= 2
+
+
+def test_acall_times_out_like_call(monkeypatch):
+    slots = threading.BoundedSemaphore(1)
+    monkeypatch.setattr(llm_gateway, "_slots", slots)
+
+    async def main():
+        assert await llm_gateway.acall("test", lambda: "fast", timeout=1) == "fast"
+        with pytest.raises(llm_gateway.LLMTimeoutError):
+            await llm_gateway.acall("test", lambda: time.sleep(0.3), timeout=0.1)
+
+    asyncio.run(main())
+    assert _wait_for_slot(slots)
+
+
+def test_cancelled_acall_does_not_leak_its_slot(monkeypatch):
+    slots = threading.BoundedSemaphore(1)
+    monkeypatch.setattr(llm_gateway, "_slots", slots)
+    slots.acquire()
+
+    async def main():
+        task = asyncio.create_task(llm_gateway.acall("test", lambda: "never", timeout=5))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # The waiter thread is still blocked: it gets this slot and must hand it back
+        slots.release()
+
+    asyncio.run(main())
+    assert _wait_for_slot(slots)
+
+
+def test_stream_times_out_like_call(monkeypatch):
+    slots = threading.BoundedSemaphore(1)
+    monkeypatch.setattr(llm_gateway, "_slots", slots)
+
+    chunks = llm_gateway.stream("test", _SlowStream(["a", "b", "c"], delay=0.15), {}, timeout=0.25)
+    assert next(chunks) == "a"
+    start = time.monotonic()
+    with pytest.raises(llm_gateway.LLMTimeoutError):
+        list(chunks)
+    assert time.monotonic() - start < 0.2
+
+    # Freed once the read still running on the pool returns
+    assert _wait_for_slot(slots)
+
+
+def test_closing_a_stream_early_frees_the_slot(monkeypatch):
+    slots = threading.BoundedSemaphore(1)
+    monkeypatch.setattr(llm_gateway, "_slots", slots)
+
+    chunks = llm_gateway.stream("test", _SlowStream(["a", "b"], delay=0), {})
+    assert next(chunks) == "a"
+    chunks.close()
+    assert slots.acquire(blocking=False)
+
+
+def test_finished_or_failed_streams_free_the_slot(monkeypatch):
+    slots = threading.BoundedSemaphore(1)
+    monkeypatch.setattr(llm_gateway, "_slots", slots)
+
+    assert list(llm_gateway.stream("test", _SlowStream(["a", "b"], delay=0), {})) == ["a", "b"]
+    assert slots.acquire(blocking=False)
+    slots.release()
+
+    class _Broken:
+        def stream(self, inputs, config=None):
+            yield "a"
+            raise RuntimeError("connection reset")
+
+    with pytest.raises(RuntimeError):
+        list(llm_gateway.stream("test", _Broken(), {}))
+    assert slots.acquire(blocking=False)
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
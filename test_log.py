@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Checks for the queued, leveled logging layer (services/log.py)
+"""
+import json
+import logging
+import queue
+
+from services import log, metrics
+from services.executor import run_parallel
+
+
+def _capture(name, maxsize=0):
+    """Logger whose records land on a queue through the app's queue handler"""
+    records = queue.Queue(maxsize)
+    handler = log._NonBlockingQueueHandler(records)
+    handler.addFilter(log._RequestIdFilter())
+    logger = logging.getLogger(name)
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    return logger, records
+
+
+def _drain(records):
+    out = []
+    while not records.empty():
+        out.append(records.get_nowait())
+    return out
+
+
+def test_request_id_follows_the_request_into_stages():
+    logger, records = _capture("test.log.request_id")
+    token = log.set_request_id("req-1")
+    try:
+        logger.info("in the view")
+        run_parallel("test", {"a": lambda: logger.info("in stage a"), "b": lambda: logger.info("in stage b")})
+    finally:
+        log.reset_request_id(token)
+    logger.info("after the request")
+
+    ids = {record.getMessage(): record.request_id for record in _drain(records)}
+    assert ids == {"in the view": "req-1", "in stage a": "req-1", "in stage b": "req-1", "after the request": "-"}
+
+
+def test_sampled_lines_keep_only_a_share():
+    logger, records = _capture("test.log.sampled")
+    for i in range(2000):
+        log.sampled(logger, "event %d", i, rate=0.1)
+    kept = len(_drain(records))
+    assert 100 < kept < 300
+
+    logger.setLevel(logging.INFO)
+    for i in range(100):
+        log.sampled(logger, "event %d", i, rate=1.0)
+    assert records.empty()
+
+
+def test_full_queue_drops_instead_of_blocking():
+    metrics.reset()
+    logger, records = _capture("test.log.full", maxsize=5)
+    for i in range(20):
+        logger.info("line %d", i)
+    assert records.qsize() == 5
+    assert metrics.snapshot("log.")["counters"]["log.dropped"] == 15
+
+
+def test_per_module_levels_and_json_format():
+    log.setup_logging(levels="test.log.quiet=WARNING,test.log.loud=DEBUG")
+    assert not logging.getLogger("test.log.quiet.child").isEnabledFor(logging.INFO)
+    assert logging.getLogger("test.log.loud").isEnabledFor(logging.DEBUG)
+
+    logger, records = _capture("test.log.json")
+    token = log.set_request_id("req-2")
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("failed for %s", "u1", extra={"user_id": "u1"})
+    finally:
+        log.reset_request_id(token)
+
+    entry = json.loads(log.JsonFormatter().format(_drain(records)[0]))
+    assert entry["message"] == "failed for u1"
+    assert entry["request_id"] == "req-2"
+    assert entry["user_id"] == "u1"
+    assert "ValueError: boom" in entry["exc"]
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Checks for the saved FAISS index in rag/rag_store.py
+
+DeterministicFakeEmbedding stands in for FastEmbed, so this runs offline.
+"""
+import os
+import shutil
+import tempfile
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from rag.rag_store import get_index_info, load_rag
+
+EMBEDDINGS = DeterministicFakeEmbedding(size=32)
+
+
+def _setup(tmp):
+    source = os.path.join(tmp, "knowledge.txt")
+    shutil.copy("rag/rag.txt", source)
+    return source, os.path.join(tmp, "index")
+
+
+def _load(source, index_dir, model="fake-32"):
+    return load_rag([source], index_dir=index_dir, embeddings=EMBEDDINGS, embedding_model=model)
+
+
+def test_second_start_loads_from_disk():
+    with tempfile.TemporaryDirectory() as tmp:
+        source, index_dir = _setup(tmp)
+
+        built = _load(source, index_dir)
+        assert get_index_info()["source"] == "built"
+
+        loaded = _load(source, index_dir)
+        assert get_index_info()["source"] == "disk"
+        assert loaded.index.ntotal == built.index.ntotal
+
+        query = "What is RAG?"
+        assert [d.page_content for d in loaded.similarity_search(query, k=3)] == \
+            [d.page_content for d in built.similarity_search(query, k=3)]
+
+
+def test_changed_inputs_trigger_a_rebuild():
+    with tempfile.TemporaryDirectory() as tmp:
+        source, index_dir = _setup(tmp)
+        _load(source, index_dir)
+
+        with open(source, "a") as f:
+            f.write("\nFAISS stands for Facebook AI Similarity Search.\n")
+        _load(source, index_dir)
+        assert get_index_info()["source"] == "built"
+        # The index for the old contents is pruned
+        assert len(os.listdir(index_dir)) == 1
+
+        _load(source, index_dir, model="another-model")
+        assert get_index_info()["source"] == "built"
+
+        _load(source, index_dir, model="another-model")
+        assert get_index_info()["source"] == "disk"
+
+
+def test_manifest_is_saved_next_to_the_index():
+    import json
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source, index_dir = _setup(tmp)
+        _load(source, index_dir)
+
+        (saved,) = os.listdir(index_dir)
+        with open(os.path.join(index_dir, saved, "manifest.json")) as f:
+            manifest = json.load(f)
+        assert set(manifest["sources"]) == {source}
+        assert manifest["chunk_size"] == 500 and manifest["embedding_model"] == "fake-32"
+
+
+def test_compact_index_type_is_saved_and_reloaded():
+    import numpy as np
+    from rag.vector_index import build_faiss_index
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source, index_dir = _setup(tmp)
+        flat = _load(source, index_dir)
+        compact = load_rag([source], index_dir=index_dir, embeddings=EMBEDDINGS,
+                           embedding_model="fake-32", index_type="sqfp16")
+        assert get_index_info()["index"] == "IndexScalarQuantizer"
+        assert len(os.listdir(index_dir)) == 1
+
+        loaded = load_rag([source], index_dir=index_dir, embeddings=EMBEDDINGS,
+                          embedding_model="fake-32", index_type="sqfp16")
+        assert get_index_info()["source"] == "disk"
+        assert get_index_info()["index"] == "IndexScalarQuantizer"
+        query = "What is RAG?"
+        assert [d.page_content for d in loaded.similarity_search(query, k=3)] == \
+            [d.page_content for d in flat.similarity_search(query, k=3)]
+
+    # A handful of chunks can't train IVF-PQ; it falls back to exact search
+    index, spec = build_faiss_index(np.random.rand(20, 32), "ivfpq")
+    assert spec == "Flat" and index.ntotal == 20
+
+
+def test_ivf_recall_against_flat():
+    import numpy as np
+    from rag.vector_index import build_faiss_index
+
+    rng = np.random.default_rng(3)
+    centers = rng.normal(size=(20, 32))
+    vectors = (centers[rng.integers(0, 20, 4000)] + rng.normal(scale=0.3, size=(4000, 32))).astype("float32")
+    queries = vectors[:50] + 0.01
+
+    flat, _ = build_faiss_index(vectors, "flat")
+    ivf, spec = build_faiss_index(vectors, "ivf")
+    assert spec.startswith("IVF")
+    _, truth = flat.search(queries, 10)
+    _, found = ivf.search(queries, 10)
+    recall = np.mean([len(set(t) & set(f)) / 10 for t, f in zip(truth, found)])
+    assert recall > 0.8
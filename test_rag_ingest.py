@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Checks for incremental knowledge-base ingestion (rag/rag_ingest.py)
+
+DeterministicFakeEmbedding stands in for FastEmbed, so this runs offline.
+"""
+import os
+import tempfile
+import threading
+
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from rag.rag_ingest import KnowledgeIngestor
+from rag.rag_pipeline import LockedRetriever
+from rag.rag_store import build_lexical_index, index_dir_lock
+
+
+class CountingEmbedding(DeterministicFakeEmbedding):
+    embedded: int = 0
+
+    def embed_documents(self, texts):
+        self.embedded += len(texts)
+        return super().embed_documents(texts)
+
+
+def _write(directory, name, text):
+    path = os.path.join(directory, name)
+    with open(path, "w") as f:
+        f.write(text)
+    # Same-second rewrites would otherwise keep the old mtime
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+def _store(embeddings):
+    return FAISS.from_texts(["Base knowledge about calendars."], embeddings)
+
+
+def _ids(store):
+    return sorted(store.index_to_docstore_id.values())
+
+
+def test_add_change_delete_only_touch_that_document():
+    embeddings = CountingEmbedding(size=16)
+    with tempfile.TemporaryDirectory() as kb:
+        store = _store(embeddings)
+        ingestor = KnowledgeIngestor(store, directory=kb, embeddings=embeddings)
+
+        _write(kb, "a.md", "Alpha document.")
+        _write(kb, "b.txt", "Beta document. " * 100)
+        report = ingestor.sync()
+        assert report["added"] == 2 and store.index.ntotal == 1 + report["chunks_embedded"]
+
+        embeddings.embedded = 0
+        assert ingestor.sync()["unchanged"] == 2
+        assert embeddings.embedded == 0
+
+        _write(kb, "a.md", "Alpha document, revised.")
+        report = ingestor.sync()
+        assert report["updated"] == 1 and embeddings.embedded == 1
+        assert store.docstore.search("kb:a.md#0").page_content == "Alpha document, revised."
+
+        os.remove(os.path.join(kb, "b.txt"))
+        report = ingestor.sync()
+        assert report["deleted"] == 1
+        assert [i for i in _ids(store) if i.startswith("kb:")] == ["kb:a.md#0"]
+        assert store.index.ntotal == 2
+
+
+def test_touched_but_unchanged_file_is_not_reembedded():
+    embeddings = CountingEmbedding(size=16)
+    with tempfile.TemporaryDirectory() as kb:
+        ingestor = KnowledgeIngestor(_store(embeddings), directory=kb, embeddings=embeddings)
+        _write(kb, "a.md", "Alpha document.")
+        ingestor.sync()
+
+        embeddings.embedded = 0
+        _write(kb, "a.md", "Alpha document.")
+        assert ingestor.sync()["unchanged"] == 1
+        assert embeddings.embedded == 0
+
+
+def test_running_retriever_sees_new_documents():
+    embeddings = DeterministicFakeEmbedding(size=16)
+    with tempfile.TemporaryDirectory() as kb:
+        store = _store(embeddings)
+        retriever = LockedRetriever(vectorstore=store, k=1)
+        ingestor = KnowledgeIngestor(store, directory=kb, embeddings=embeddings, lock=threading.RLock())
+
+        text = "The office closes early on Fridays."
+        assert retriever.invoke(text)[0].page_content != text
+        _write(kb, "hours.md", text)
+        ingestor.sync()
+        assert retriever.invoke(text)[0].page_content == text
+
+
+def test_restart_resumes_from_saved_state():
+    embeddings = CountingEmbedding(size=16)
+    with tempfile.TemporaryDirectory() as kb, tempfile.TemporaryDirectory() as state_dir:
+        ingestor = KnowledgeIngestor(_store(embeddings), directory=kb, embeddings=embeddings, state_dir=state_dir)
+        _write(kb, "a.md", "Alpha document.")
+        _write(kb, "b.md", "Beta document.")
+        ingestor.sync()
+
+        # While "down": one document changes
+        _write(kb, "b.md", "Beta document, revised.")
+        embeddings.embedded = 0
+        store = FAISS.load_local(state_dir, embeddings, allow_dangerous_deserialization=True)
+        report = KnowledgeIngestor(store, directory=kb, embeddings=embeddings, state_dir=state_dir).sync()
+        assert report["unchanged"] == 1 and report["updated"] == 1
+        assert embeddings.embedded == 1
+        assert store.index.ntotal == 3
+
+
+def test_orphan_chunks_are_dropped_on_load():
+    embeddings = DeterministicFakeEmbedding(size=16)
+    with tempfile.TemporaryDirectory() as kb, tempfile.TemporaryDirectory() as state_dir:
+        store = _store(embeddings)
+        store.add_texts(["left over from a crash"], ids=["kb:gone.md#0"])
+        ingestor = KnowledgeIngestor(store, directory=kb, embeddings=embeddings, state_dir=state_dir)
+        assert "kb:gone.md#0" not in _ids(store)
+        assert ingestor.documents == {}
+
+
+def test_loads_never_see_a_half_saved_index():
+    embeddings = DeterministicFakeEmbedding(size=16)
+    with tempfile.TemporaryDirectory() as kb, tempfile.TemporaryDirectory() as index_dir:
+        state_dir = os.path.join(index_dir, "abc123")
+        ingestor = KnowledgeIngestor(_store(embeddings), directory=kb, embeddings=embeddings, state_dir=state_dir)
+        ingestor.save()
+        done = threading.Event()
+
+        def keep_ingesting():
+            for i in range(15):
+                _write(kb, f"doc{i}.md", f"Document number {i}. " * (i + 1))
+                ingestor.sync()
+            done.set()
+
+        writer = threading.Thread(target=keep_ingesting)
+        writer.start()
+        loads = 0
+        while not done.is_set() or not loads:
+            with index_dir_lock(index_dir):
+                store = FAISS.load_local(state_dir, embeddings, allow_dangerous_deserialization=True)
+            assert store.index.ntotal == len(store.index_to_docstore_id) == len(store.docstore._dict)
+            loads += 1
+        writer.join()
+        assert sorted(os.listdir(index_dir)) == [".index.lock", "abc123"]
+
+
+def test_one_worker_ingests_and_the_others_follow():
+    embeddings = CountingEmbedding(size=16)
+    with tempfile.TemporaryDirectory() as kb, tempfile.TemporaryDirectory() as index_dir:
+        state_dir = os.path.join(index_dir, "abc123")
+        leader = KnowledgeIngestor(_store(embeddings), directory=kb, embeddings=embeddings, state_dir=state_dir)
+        store = _store(embeddings)
+        lexical = build_lexical_index(store)
+        follower = KnowledgeIngestor(store, directory=kb, embeddings=embeddings, state_dir=state_dir,
+                                     lexical=lexical)
+        assert leader.is_ingesting_worker()
+        assert not follower.is_ingesting_worker()
+
+        _write(kb, "pets.md", "Dogs may come to the office on Fridays.")
+        leader.sync()
+        embedded = embeddings.embedded
+        assert follower.follow()
+        assert not follower.follow()
+        # Loaded, not embedded again
+        assert embeddings.embedded == embedded
+        assert _ids(follower.vectorstore) == _ids(leader.vectorstore)
+        assert [doc_id for doc_id, _ in lexical.search("dogs office")] == ["kb:pets.md#0"]
+
+        # Someone else takes over once the ingesting worker is gone
+        leader.stop()
+        assert follower.is_ingesting_worker()
+        follower.stop()
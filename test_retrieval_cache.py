@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Checks for the RAG retrieval cache (rag/retrieval_cache.py)
+"""
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from rag import rag_pipeline
+from rag.rag_pipeline import LockedRetriever, bump_index_version
+from rag.retrieval_cache import RetrievalCache
+
+
+class CountingEmbedding(DeterministicFakeEmbedding):
+    queries: int = 0
+
+    def embed_query(self, text):
+        self.queries += 1
+        return super().embed_query(text)
+
+
+def _retriever(cache):
+    embeddings = CountingEmbedding(size=16)
+    store = FAISS.from_texts(["Calendars hold events.", "RAG retrieves context."], embeddings)
+    return LockedRetriever(vectorstore=store, k=1, cache=cache), store, embeddings
+
+
+def test_repeated_question_skips_the_embedding_model():
+    cache = RetrievalCache()
+    retriever, _, embeddings = _retriever(cache)
+
+    first = retriever.invoke("What is RAG?")
+    again = retriever.invoke("  what is rag ")
+    assert embeddings.queries == 1
+    assert [d.page_content for d in again] == [d.page_content for d in first]
+
+    stats = cache.get_stats()
+    assert stats["embeddings"]["hit_rate"] == 0.5
+    assert stats["results"]["hits"] == 1
+
+
+def test_index_change_invalidates_results(monkeypatch):
+    cache = RetrievalCache()
+    monkeypatch.setattr(rag_pipeline, "retrieval_cache", cache)
+    retriever, store, _ = _retriever(cache)
+
+    question = "The office closes early on Fridays."
+    assert retriever.invoke(question)[0].page_content != question
+
+    store.add_texts([question])
+    bump_index_version()
+    assert len(cache.results) == 0
+    assert retriever.invoke(question)[0].page_content == question
+    # The embedding itself is still good
+    assert cache.get_stats()["embeddings"]["hits"] == 1
+
+
+def test_cached_documents_are_copies():
+    retriever, _, _ = _retriever(RetrievalCache())
+    retriever.invoke("calendar")[0].metadata["seen"] = True
+    assert "seen" not in retriever.invoke("calendar")[0].metadata
+
+
+def test_memory_is_bounded():
+    cache = RetrievalCache(max_entries=3)
+    retriever, _, _ = _retriever(cache)
+    for i in range(10):
+        retriever.invoke(f"question {i}")
+    assert len(cache.embeddings) == 3 and len(cache.results) == 3
+    assert cache.get_stats()["embeddings"]["evictions"] == 7
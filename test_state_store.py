@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Checks for the OAuth state store (services/state_store.py), including
+hundreds of parallel login flows across threads and processes.
+"""
+import multiprocessing
+import os
+import secrets
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from services.state_store import MemoryStateBackend, SQLiteStateBackend, StateStore
+
+FLOWS = 400
+
+
+def _login_flow(store, n):
+    """What /login and /oauth2callback do with one state"""
+    state = secrets.token_urlsafe(16)
+    data = {"state": state, "flow": n, "redirect_uri": "http://localhost/cb"}
+    store.put(state, data)
+    time.sleep(0.001)  # the user is at Google's consent screen
+    retrieved = store.get(state)
+    store.delete(state)
+    return retrieved == data and store.get(state) is None
+
+
+def _stores(tmp):
+    return [
+        StateStore(MemoryStateBackend()),
+        StateStore(SQLiteStateBackend(os.path.join(tmp, "state.sqlite3"))),
+    ]
+
+
+def test_put_get_delete_and_ttl():
+    with tempfile.TemporaryDirectory() as tmp:
+        for store in _stores(tmp):
+            store.put("a", {"x": 1})
+            assert store.get("a") == {"x": 1}
+            store.delete("a")
+            assert store.get("a") is None
+
+            store.ttl = 0.05
+            store.put("b", {"x": 2})
+            time.sleep(0.1)
+            assert store.sweep() == 1
+            assert store.get("b") is None
+            assert store.get_stats()["entries"] == 0
+
+
+def test_pop_is_single_use():
+    with tempfile.TemporaryDirectory() as tmp:
+        for store in _stores(tmp):
+            store.put("s", {"x": 1})
+            assert store.pop("s") == {"x": 1}
+            assert store.pop("s") is None
+
+
+def test_abandoned_states_are_swept():
+    with tempfile.TemporaryDirectory() as tmp:
+        for store in _stores(tmp):
+            store.ttl = 0.01
+            for i in range(100):
+                store.put(f"abandoned-{i}", {"i": i})
+            time.sleep(0.05)
+            store.ttl = 60
+            for i in range(200):
+                store.put(f"live-{i}", {"i": i})
+            # Sweeps run every SWEEP_EVERY writes, so nothing expired is left
+            assert store.get_stats()["entries"] == 200
+
+
+def test_parallel_logins_threads():
+    with tempfile.TemporaryDirectory() as tmp:
+        for store in _stores(tmp):
+            with ThreadPoolExecutor(max_workers=32) as pool:
+                results = list(pool.map(lambda n: _login_flow(store, n), range(FLOWS)))
+            assert all(results)
+            assert store.get_stats()["entries"] == 0
+
+
+def _worker(path, start, count, queue):
+    store = StateStore(SQLiteStateBackend(path))
+    queue.put(sum(_login_flow(store, n) for n in range(start, start + count)))
+
+
+def test_parallel_logins_processes():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "state.sqlite3")
+        StateStore(SQLiteStateBackend(path))  # create the schema once
+
+        queue = multiprocessing.Queue()
+        workers = [
+            multiprocessing.Process(target=_worker, args=(path, i * 50, 50, queue))
+            for i in range(8)
+        ]
+        for worker in workers:
+            worker.start()
+        succeeded = sum(queue.get(timeout=60) for _ in workers)
+        for worker in workers:
+            worker.join()
+
+        assert succeeded == 400
+        assert len(SQLiteStateBackend(path)) == 0
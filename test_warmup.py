@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Checks for the background warm-up and /healthz/ready (services/warmup.py)
+"""
+import threading
+import time
+
+from services import warmup
+
+
+def _reset(monkeypatch, components):
+    monkeypatch.setattr(warmup, "COMPONENTS", components)
+    monkeypatch.setattr(warmup, "_status", {name: {"status": "not_started"} for name, _ in components})
+    monkeypatch.setattr(warmup, "_thread", None)
+
+
+def _wait_until_ready(timeout=5):
+    deadline = time.monotonic() + timeout
+    while not warmup.readiness()["ready"]:
+        assert time.monotonic() < deadline, warmup.readiness()
+        time.sleep(0.01)
+
+
+def test_ready_without_warmup(monkeypatch):
+    _reset(monkeypatch, [("router", lambda: None)])
+    state = warmup.readiness()
+    assert state["ready"] and not state["warmup_enabled"]
+
+
+def test_not_ready_until_components_load(monkeypatch):
+    release = threading.Event()
+
+    def failing():
+        raise RuntimeError("model download failed")
+
+    _reset(monkeypatch, [
+        ("fast", lambda: None),
+        ("slow", lambda: release.wait(5)),
+        ("broken", failing),
+    ])
+    warmup.start_warmup()
+    time.sleep(0.05)
+
+    state = warmup.readiness()
+    assert not state["ready"]
+    assert state["components"]["fast"]["status"] == "ready"
+    assert state["components"]["slow"]["status"] == "loading"
+
+    release.set()
+    _wait_until_ready()
+    components = warmup.readiness()["components"]
+    assert components["slow"]["load_ms"] >= 40
+    assert components["broken"]["status"] == "failed"
+    assert "model download failed" in components["broken"]["error"]
+
+
+def test_readiness_endpoint(monkeypatch):
+    from app import app
+
+    release = threading.Event()
+    _reset(monkeypatch, [("slow", lambda: release.wait(5))])
+    client = app.test_client()
+
+    assert client.get("/healthz/ready").status_code == 200
+    warmup.start_warmup()
+    assert client.get("/healthz/ready").status_code == 503
+
+    release.set()
+    _wait_until_ready()
+    response = client.get("/healthz/ready")
+    assert response.status_code == 200
+    assert response.get_json()["components"]["slow"]["status"] == "ready"